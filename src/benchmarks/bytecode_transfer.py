@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import argparse
+import time
+from typing import Any, Callable
+
+from ..frontend.parser import get_parser
+from ..yolk.bytecode import decode, encode
+from ..yolk.ir import Fragment, YolkProgram, flatten
+from ..yolk.yolk import FusedYolkGenerator
+
+
+def best_of(repeats: int, function: Callable[[], Any]) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('bytecode_transfer')
+    arg_parser.add_argument('--terms', type=int, default=10000)
+    arg_parser.add_argument('--repeats', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    compiler = get_parser(transformer=FusedYolkGenerator)
+    sources = {
+        'integers': ' + '.join(str(i) for i in range(args.terms)),
+        'floats': ' * '.join(f'{i}.25' for i in range(args.terms)),
+        'strings': ' ++ '.join(['"some text"'] * args.terms),
+        'comparisons': ' < '.join(['1'] * args.terms),
+        'pipeline': ' | '.join(['grep -v "pattern"'] * args.terms),
+    }
+    for name, src in sources.items():
+        fragment: Fragment = compiler.parse(src)   # type: ignore
+        program = flatten(fragment)
+        text = program.to_text().encode('utf-8')
+        data = encode(program)
+        text_seconds = best_of(
+            args.repeats,
+            lambda: YolkProgram.from_text(text.decode('utf-8')),
+        )
+        bytecode_seconds = best_of(args.repeats, lambda: decode(data))
+        print(
+            f'{name}: {len(program)} instructions, '
+            f'text {len(text)} bytes decoded in {text_seconds * 1000:.1f}ms, '
+            f'bytecode {len(data)} bytes decoded in '
+            f'{bytecode_seconds * 1000:.1f}ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+import argparse
+import time
+
+from ..frontend.parser import get_parser
+from ..yolk.ir import Fragment, flatten
+from ..yolk.yolk import FusedYolkGenerator
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('emission_scaling')
+    arg_parser.add_argument(
+        '--terms', type=int, nargs='+', default=[1250, 2500, 5000, 10000]
+    )
+    args = arg_parser.parse_args()
+
+    compiler = get_parser(transformer=FusedYolkGenerator)
+    for operators in [' + ', ' * 2 + ', ' < ']:
+        print(f'1{operators}1{operators}...')
+        for terms in args.terms:
+            src = 'say ' + operators.join(['1'] * terms)
+            start = time.perf_counter()
+            fragment: Fragment = compiler.parse(src)   # type: ignore
+            code = flatten(fragment)
+            seconds = time.perf_counter() - start
+            print(
+                f'  {terms:6} terms: {seconds * 1000:8.1f}ms, '
+                f'{seconds / terms * 1e6:5.1f}us per term, '
+                f'{len(code)} instructions'
+            )
+
+
+if __name__ == '__main__':
+    main()
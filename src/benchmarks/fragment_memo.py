@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import argparse
+import gc
+import pathlib
+import time
+import tracemalloc
+from typing import List, Sequence
+
+import lark.exceptions
+import lark.lexer
+
+from ..cli.cli import CLIMode, EggCLI, ExecutionMode
+from ..yolk import yolk
+from ..yolk.fragment_memo import FragmentMemo
+from ..yolk.ir import Fragment
+
+benchmark_path = (
+    pathlib.Path(__file__).parents[2] / 'examples' / 'large_benchmark.egg'
+)
+
+
+def compile_all(
+    egg_cli: EggCLI, statements: List[Sequence[lark.lexer.Token]]
+) -> List[Fragment]:
+    return [
+        egg_cli.statement_cache.get(statement, egg_cli.compile_statement)
+        for statement in statements
+    ]
+
+
+def measure(
+    statements: List[Sequence[lark.lexer.Token]],
+    memo_size: int,
+    statement_cache_size: int,
+) -> str:
+    mode = CLIMode(
+        ExecutionMode.codegen, statement_cache_size=statement_cache_size
+    )
+    egg_cli = EggCLI(mode, use_profiler=False)
+    egg_cli.compiler   # load the grammar outside the timings
+    yolk.fragment_memo = FragmentMemo(memo_size)
+    gc.collect()
+    start = time.perf_counter()
+    compile_all(egg_cli, statements)
+    seconds = time.perf_counter() - start
+    memo = yolk.fragment_memo.report()
+
+    # Fragments kept by the program, not counting the memo's own table
+    egg_cli = EggCLI(mode, use_profiler=False)
+    egg_cli.compiler
+    yolk.fragment_memo = FragmentMemo(memo_size)
+    gc.collect()
+    tracemalloc.start()
+    fragments = compile_all(egg_cli, statements)
+    yolk.fragment_memo.clear()
+    egg_cli.statement_cache.entries.clear()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del fragments
+    return (
+        f'{seconds * 1000:6.0f}ms, fragments {size / 2**20:5.1f} MiB\n'
+        f'      {memo}'
+    )
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('fragment_memo')
+    arg_parser.add_argument('--lines', type=int, default=100000)
+    args = arg_parser.parse_args()
+
+    # Codegen does not support every statement yet, so only those it does
+    # are compiled
+    egg_cli = EggCLI(CLIMode(ExecutionMode.codegen), use_profiler=False)
+    lines = benchmark_path.read_text('utf-8').splitlines()[: args.lines]
+    statements: List[Sequence[lark.lexer.Token]] = []
+    for statement in egg_cli.statements('\n'.join(lines) + '\n'):
+        try:
+            egg_cli.compile_statement(statement)
+        except (yolk.FeatureUnimplemented, lark.exceptions.LarkError):
+            continue
+        statements.append(statement)
+    print(f'{len(statements)} statements that codegen supports')
+
+    for statement_cache_size in [0, 1024]:
+        print(f'statement cache of {statement_cache_size}:')
+        for memo_size in [0, 4096]:
+            result = measure(statements, memo_size, statement_cache_size)
+            print(f'  memo of {memo_size:4}: {result}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+from ..frontend.parser import get_parser
+from ..yolk.ir import YolkProgram, flatten
+from ..yolk.yolk import FusedYolkGenerator, YolkGenerator
+
+# Codegen does not support multiple statements yet, so each benchmark is one
+# large statement, a flat pipeline and an expression nested as deep as tree
+# codegen allows before it hits the recursion limit
+programs: Dict[str, Callable[[int], str]] = {
+    'pipeline': lambda n: ' | '.join(['echo a "b c" d'] * n),
+    'expression': lambda n: 'say ' + ' + '.join(['1 * 2'] * (n // 200)),
+}
+
+
+def measure(compile_source: Callable[[str], YolkProgram], src: str) -> str:
+    gc.collect()
+    start = time.perf_counter()
+    compile_source(src)
+    seconds = time.perf_counter() - start
+    # Tracing slows everything down, so memory is measured in a second run
+    tracemalloc.start()
+    compile_source(src)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return f'{seconds * 1000:8.1f}ms, peak {peak / 2**20:6.1f} MiB'
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('fused_codegen')
+    arg_parser.add_argument('--size', type=int, default=20000)
+    args = arg_parser.parse_args()
+
+    tree_parser = get_parser()
+    fused_parser = get_parser(transformer=FusedYolkGenerator)
+
+    def tree_codegen(src: str) -> YolkProgram:
+        ast = tree_parser.parse(src)
+        return flatten(YolkGenerator().transform(ast))   # type: ignore
+
+    def fused_codegen(src: str) -> YolkProgram:
+        return flatten(fused_parser.parse(src))   # type: ignore
+
+    for name, make_program in programs.items():
+        src = make_program(args.size)
+        assert tree_codegen(src) == fused_codegen(src)
+        print(f'{name} ({len(src)} chars)')
+        print(f'  parse then generate: {measure(tree_codegen, src)}')
+        print(f'  fused:               {measure(fused_codegen, src)}')
+
+
+if __name__ == '__main__':
+    main()
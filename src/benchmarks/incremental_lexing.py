@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import argparse
+import pathlib
+import random
+import statistics
+import time
+from typing import Dict
+
+from ..frontend.incremental_lexer import IncrementalLexer
+from ..frontend.lexer import EggLexer
+
+default_script = (
+    pathlib.Path(__file__).parents[2] / 'examples' / 'large_benchmark.egg'
+)
+
+
+def measure(src: str, edits: int, seed: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    for _ in EggLexer().lex(src):
+        pass
+    full_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    incremental = IncrementalLexer(src)
+    initial_seconds = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    edit_seconds = []
+    relexed_lines = []
+    for _ in range(edits):
+        line = rng.randrange(len(incremental.lines))
+        start = time.perf_counter()
+        incremental.edit(line, 0, line, 0, ' ')
+        edit_seconds.append(time.perf_counter() - start)
+        relexed_lines.append(incremental.relexed_lines)
+
+    return {
+        'lines': len(incremental.lines),
+        'full_lex_seconds': full_seconds,
+        'initial_incremental_seconds': initial_seconds,
+        'median_edit_ms': statistics.median(edit_seconds) * 1000,
+        'max_edit_ms': max(edit_seconds) * 1000,
+        'mean_relexed_lines': statistics.mean(relexed_lines),
+    }
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('incremental_lexing')
+    arg_parser.add_argument('script', nargs='?', default=str(default_script))
+    arg_parser.add_argument('--edits', type=int, default=1000)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    args = arg_parser.parse_args()
+    src = pathlib.Path(args.script).read_text('utf-8')
+    for name, value in measure(src, args.edits, args.seed).items():
+        print(
+            f'{name}: {value:,.3f}'
+            if isinstance(value, float)
+            else f'{name}: {value:,}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+import argparse
+import pathlib
+import sys
+import time
+from typing import Any, Callable
+
+from lark import Token, Transformer, Tree
+
+from ..frontend.lowering import LoweringTransformer
+from ..frontend.parser import get_parser
+from ..yolk.yolk import YolkGenerator
+
+default_script = (
+    pathlib.Path(__file__).parents[2] / 'examples' / 'large_benchmark.egg'
+)
+
+
+class RecursiveLoweringTransformer(LoweringTransformer):
+    _transform_tree = Transformer._transform_tree
+
+
+class RecursiveYolkGenerator(YolkGenerator):
+    _transform_tree = Transformer._transform_tree
+
+
+def best_of(repeats: int, function: Callable[[], Any]) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def compare(
+    name: str,
+    tree: Tree[Any],
+    recursive: Transformer[Any, Any],
+    iterative: Transformer[Any, Any],
+    repeats: int,
+) -> None:
+    recursive_seconds = best_of(repeats, lambda: recursive.transform(tree))
+    iterative_seconds = best_of(repeats, lambda: iterative.transform(tree))
+    print(
+        f'{name}: recursive {recursive_seconds * 1000:.1f}ms, '
+        f'iterative {iterative_seconds * 1000:.1f}ms'
+    )
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('iterative_transform')
+    arg_parser.add_argument('script', nargs='?', default=str(default_script))
+    arg_parser.add_argument('--repeats', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    src = pathlib.Path(args.script).read_text('utf-8')
+    tree = get_parser(lowering=False).parse(src)
+    compare(
+        f'lowering {pathlib.Path(args.script).name}',
+        tree,
+        RecursiveLoweringTransformer(),
+        LoweringTransformer(),
+        args.repeats,
+    )
+
+    # As deep as the recursive walk can go, repeated to get a larger tree
+    depth = sys.getrecursionlimit() // 4
+    one: Tree[Any] = Tree('integer_literal', [Token('INTEGER', '1')])
+    expression = one
+    for _ in range(depth):
+        expression = Tree('addition', [expression, one])
+    compare(
+        f'codegen of {depth} deep expressions',
+        Tree('pipeline', [expression] * 100),
+        RecursiveYolkGenerator(),
+        YolkGenerator(),
+        args.repeats,
+    )
+
+    deep: Tree[Any] = one
+    for _ in range(100000):
+        deep = Tree('addition', [deep, one])
+    start = time.perf_counter()
+    YolkGenerator().transform(deep)
+    seconds = time.perf_counter() - start
+    print(f'codegen of a 100000 deep expression: {seconds * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
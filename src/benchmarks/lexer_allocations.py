@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import argparse
+import pathlib
+import time
+import tracemalloc
+from typing import Any, Dict
+
+from ..frontend.lexer import EggLexer
+from ..frontend.lexer_util import DFANode
+
+default_script = (
+    pathlib.Path(__file__).parents[2] / 'examples' / 'large_benchmark.egg'
+)
+
+
+def count_node_allocations(src: str) -> int:
+    allocations = 0
+    original_new = DFANode.__new__
+
+    def counting_new(cls: Any, *args: Any, **kwargs: Any) -> Any:
+        nonlocal allocations
+        allocations += 1
+        return original_new(cls)
+
+    DFANode.__new__ = counting_new   # type: ignore[method-assign]
+    try:
+        for _ in EggLexer().lex(src):
+            pass
+    finally:
+        DFANode.__new__ = original_new   # type: ignore[method-assign]
+    return allocations
+
+
+def lex_all(src: str) -> int:
+    token_count = 0
+    for _ in EggLexer().lex(src):
+        token_count += 1
+    return token_count
+
+
+def measure(src: str) -> Dict[str, float]:
+    start = time.perf_counter()
+    token_count = lex_all(src)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    start_memory, _ = tracemalloc.get_traced_memory()
+    lex_all(src)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'tokens': token_count,
+        'node_allocations': count_node_allocations(src),
+        'peak_traced_kib': (peak_memory - start_memory) / 1024,
+        'seconds': elapsed,
+    }
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('lexer_allocations')
+    arg_parser.add_argument('script', nargs='?', default=str(default_script))
+    args = arg_parser.parse_args()
+    src = pathlib.Path(args.script).read_text('utf-8')
+    for name, value in measure(src).items():
+        print(
+            f'{name}: {value:,.2f}'
+            if isinstance(value, float)
+            else f'{name}: {value:,}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import timeit
+from typing import Callable, Dict
+
+from ..frontend.lexer_constants import (
+    ARITHMETIC_OPERATORS,
+    NON_ARITHMETIC_OPERATORS,
+)
+from ..frontend.mm_trie import CompiledMaxMunchTrie, MaxMunchTrie
+
+
+def operator_heavy_input(length: int, seed: int) -> str:
+    rng = random.Random(seed)
+    pieces = [*NON_ARITHMETIC_OPERATORS, *ARITHMETIC_OPERATORS, ' ', 'a']
+    data = ''
+    while len(data) < length:
+        data += rng.choice(pieces)
+    return data
+
+
+def measure(data: str, repeat: int) -> Dict[str, float]:
+    patterns = {**NON_ARITHMETIC_OPERATORS, **ARITHMETIC_OPERATORS}
+    trie = MaxMunchTrie(patterns)
+    compiled = CompiledMaxMunchTrie(patterns)
+    offsets = range(len(data))
+    assert compiled.largest_prefixes(data, offsets) == [
+        trie.largest_prefix(data, offset) for offset in offsets
+    ]
+
+    def best_of(run: Callable[[], object]) -> float:
+        return min(timeit.repeat(run, number=1, repeat=repeat))
+
+    return {
+        'dict_trie_seconds': best_of(
+            lambda: [trie.largest_prefix(data, i) for i in offsets]
+        ),
+        'compiled_seconds': best_of(
+            lambda: [compiled.largest_prefix(data, i) for i in offsets]
+        ),
+        'compiled_batch_seconds': best_of(
+            lambda: compiled.largest_prefixes(data, offsets)
+        ),
+    }
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('operator_matching')
+    arg_parser.add_argument('--length', type=int, default=200_000)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    args = arg_parser.parse_args()
+    data = operator_heavy_input(args.length, args.seed)
+    results = measure(data, args.repeat)
+    for name, value in results.items():
+        print(f'{name}: {value:.4f}')
+    print(
+        'batch speedup: '
+        f"{results['dict_trie_seconds'] / results['compiled_batch_seconds']:.2f}x"
+    )
+
+
+if __name__ == '__main__':
+    main()
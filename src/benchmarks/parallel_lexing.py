@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import pathlib
+import time
+
+from ..frontend.lexer import EggLexer
+from ..frontend.parallel_lexer import ParallelEggLexer
+
+default_script = (
+    pathlib.Path(__file__).parents[2] / 'examples' / 'large_benchmark.egg'
+)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('parallel_lexing')
+    arg_parser.add_argument('script', nargs='?', default=str(default_script))
+    arg_parser.add_argument('--max-jobs', type=int, default=os.cpu_count())
+    args = arg_parser.parse_args()
+    src = pathlib.Path(args.script).read_text('utf-8')
+
+    start = time.perf_counter()
+    expected = list(EggLexer().lex(src))
+    serial_seconds = time.perf_counter() - start
+    print(f'serial: {serial_seconds:.2f}s')
+
+    for jobs in range(1, args.max_jobs + 1):
+        lexer = ParallelEggLexer(jobs)
+        start = time.perf_counter()
+        tokens = list(lexer.lex(src))
+        elapsed = time.perf_counter() - start
+        assert tokens == expected
+        print(
+            f'jobs={jobs}: {elapsed:.2f}s '
+            f'speedup={serial_seconds / elapsed:.2f}x'
+            + (' (fell back to serial)' if lexer.fell_back else '')
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import argparse
+import subprocess
+import tempfile
+import time
+from typing import Callable, List
+
+from ..yolk.pipeline import run_pipeline
+
+
+def sequential(commands: List[List[str]]) -> bytes:
+    # How the VM used to run pipelines: each stage after the last finished
+    data = None
+    for args in commands:
+        data = subprocess.run(
+            args, input=data, stdout=subprocess.PIPE, check=False
+        ).stdout
+    assert data is not None
+    return data
+
+
+def timed(function: Callable[[], bytes], runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - start) / runs
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('pipeline_throughput')
+    arg_parser.add_argument('--megabytes', type=int, default=64)
+    arg_parser.add_argument('--runs', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    with tempfile.NamedTemporaryFile('w') as log:
+        lines = ['info: all is well\n', 'error: x marks the spot\n']
+        line = 0
+        while log.tell() < args.megabytes << 20:
+            log.write(lines[line % 2] * 1000)
+            line += 1
+        log.flush()
+
+        commands = [['cat', log.name], ['grep', 'x'], ['wc', '-l']]
+        shell = ' | '.join(' '.join(c) for c in commands)
+        results = {
+            '/bin/sh': timed(
+                lambda: subprocess.run(
+                    ['/bin/sh', '-c', shell], stdout=subprocess.PIPE
+                ).stdout,
+                args.runs,
+            ),
+            'run_pipeline': timed(
+                lambda: run_pipeline(commands).output, args.runs
+            ),
+            'sequential': timed(lambda: sequential(commands), args.runs),
+        }
+
+    for name, seconds in results.items():
+        print(
+            f'{shell} over {args.megabytes}MB, {name}: '
+            f'{seconds * 1000:.0f}ms, '
+            f'{args.megabytes / seconds:.0f}MB/s'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import argparse
+import pathlib
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from ..frontend.source import read_source
+from ..frontend.table_lexer import TableEggLexer
+from ..frontend.token_stream import TokenStream
+
+default_script = (
+    pathlib.Path(__file__).parents[2] / 'examples' / 'large_benchmark.egg'
+)
+
+
+def peak_rss_kib() -> int:
+    # VmHWM, unlike ru_maxrss, is not inherited from the parent across exec
+    status = pathlib.Path('/proc/self/status').read_text()
+    match = re.search(r'VmHWM:\s+(\d+)', status)
+    assert match is not None
+    return int(match.group(1))
+
+
+def child(variant: str, path: str) -> None:
+    """Loads and lexes a script, then prints its peak RSS and load time."""
+    start = time.perf_counter()
+    if variant == 'read_text':
+        src = pathlib.Path(path).read_text('utf-8')
+        # The copy the lexers made to append their sentinel, which lived as
+        # long as the lexer did
+        lexed = src + ' #'
+    else:
+        src = read_source(path)
+        lexed = src
+    load_seconds = time.perf_counter() - start
+    stream = TokenStream.lex(TableEggLexer(), src)
+    assert len(stream) and lexed
+    print(peak_rss_kib(), load_seconds)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('script_loading')
+    arg_parser.add_argument('script', nargs='?', default=str(default_script))
+    arg_parser.add_argument('--copies', type=int, default=16)
+    arg_parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    src = pathlib.Path(args.script).read_text('utf-8')
+    with tempfile.NamedTemporaryFile('w', suffix='.egg') as generated:
+        generated.write(src * args.copies)
+        generated.flush()
+        size = pathlib.Path(generated.name).stat().st_size
+        print(f'script size: {size / 2**20:.1f} MiB')
+        for variant in ['read_text', 'read_source']:
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    '-m',
+                    __spec__.name,
+                    '--child',
+                    variant,
+                    generated.name,
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout.split()
+            peak_kib, seconds = int(output[0]), float(output[1])
+            print(
+                f'{variant}: peak RSS {peak_kib / 1024:.1f} MiB, '
+                f'load {seconds * 1000:.1f}ms'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import gc
+import io
+import pathlib
+import tempfile
+import time
+import tracemalloc
+from typing import Optional
+
+from ..cli.cli import CLIMode, EggCLI, ExecutionMode
+
+
+class FirstWrite(io.StringIO):
+    """Output that notes when it was first written to."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.first: Optional[float] = None
+
+    def write(self, s: str) -> int:
+        if self.first is None:
+            self.first = time.perf_counter()
+        return super().write(s)
+
+
+def run(script: pathlib.Path, streaming: bool) -> str:
+    # Run in this process, so the VM's memory is measured too
+    mode = CLIMode(ExecutionMode.execute, in_process=True, streaming=streaming)
+    egg_cli = EggCLI(mode)
+    egg_cli.compiler   # compile the grammar outside the timings
+    gc.collect()
+    out = FirstWrite()
+    with contextlib.redirect_stdout(out):
+        start = time.perf_counter()
+        egg_cli.consume_script(str(script))
+        seconds = time.perf_counter() - start
+    assert out.first is not None
+    first_output = out.first - start
+
+    egg_cli = EggCLI(mode)
+    egg_cli.compiler
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        egg_cli.consume_script(str(script))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (
+        f'first output after {first_output * 1000:7.1f}ms, '
+        f'done after {seconds * 1000:6.0f}ms, peak {peak / 2**20:5.1f} MiB'
+    )
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('streaming')
+    arg_parser.add_argument('--lines', type=int, default=100000)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        script = pathlib.Path(temp_dir) / 'script.egg'
+        script.write_text(
+            ''.join(
+                f'say "line {i}: " ++ {i} * 2 ++ " " ++ ({i} > 10)\n'
+                for i in range(args.lines)
+            )
+        )
+        print(f'{args.lines} lines')
+        print(f'  whole:     {run(script, streaming=False)}')
+        print(f'  streaming: {run(script, streaming=True)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+import argparse
+import time
+
+from ..frontend.parser import get_parser
+from ..yolk.ir import Fragment, flatten
+from ..yolk.vm import YolkVM
+from ..yolk.yolk import FusedYolkGenerator
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('vm_dispatch')
+    arg_parser.add_argument('--terms', type=int, default=100000)
+    arg_parser.add_argument('--repeats', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    compiler = get_parser(transformer=FusedYolkGenerator)
+    for operators in [' + ', ' * 1.5 - ', ' < ']:
+        src = 'say ' + operators.join(['1'] * args.terms)
+        fragment: Fragment = compiler.parse(src)   # type: ignore
+        program = flatten(fragment)
+        vm = YolkVM()
+        seconds = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            vm.execute(program)
+            seconds.append(time.perf_counter() - start)
+        print(
+            f'1{operators}1{operators}...: {len(program)} instructions in '
+            f'{min(seconds) * 1000:.1f}ms, '
+            f'{len(program) / min(seconds) / 1e6:.2f}M instructions/s'
+        )
+
+
+if __name__ == '__main__':
+    main()
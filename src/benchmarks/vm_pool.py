@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import itertools
+import sys
+import time
+from typing import Optional
+
+from ..cli.cli import CLIMode, EggCLI, ExecutionMode
+from ..cli.vm_pool import VMPool
+
+# Run with `python -m`, so the stand-in can be found the same way
+standin_vm = [sys.executable, '-m', 'src.yolk.standin_vm']
+mode = CLIMode(ExecutionMode.execute, yolk_command=standin_vm)
+
+
+def run_script(i: int, vm_pool: Optional[VMPool]) -> None:
+    # A short script, run by its own CLI
+    egg_cli = EggCLI(mode, vm_pool=vm_pool)
+    egg_cli.execute(f'{i} * 2')
+    egg_cli.stop_vm()
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('vm_pool')
+    arg_parser.add_argument('--scripts', type=int, default=50)
+    arg_parser.add_argument('--jobs', type=int, default=4)
+    args = arg_parser.parse_args()
+
+    EggCLI(mode).compiler   # compile the grammar once, outside the timings
+    with concurrent.futures.ThreadPoolExecutor(args.jobs) as executor:
+        start = time.perf_counter()
+        list(
+            executor.map(
+                run_script, range(args.scripts), itertools.repeat(None)
+            )
+        )
+        cold_seconds = time.perf_counter() - start
+
+        with VMPool(standin_vm, size=args.jobs) as vm_pool:
+            start = time.perf_counter()
+            list(
+                executor.map(
+                    run_script, range(args.scripts), itertools.repeat(vm_pool)
+                )
+            )
+            warm_seconds = time.perf_counter() - start
+
+    for name, seconds in [
+        ('a VM started per script', cold_seconds),
+        (f'a pool of {args.jobs} VMs', warm_seconds),
+    ]:
+        print(
+            f'{args.scripts} scripts, {args.jobs} at a time, {name}: '
+            f'{seconds * 1000:.0f}ms, '
+            f'{seconds / args.scripts * 1000:.1f}ms per script'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+import time
+from typing import Callable, List
+
+from ..cli.cli import CLIMode, EggCLI, ExecutionMode
+
+# Run with `python -m`, so the stand-in can be found the same way
+standin_vm = [sys.executable, '-m', 'src.yolk.standin_vm']
+
+
+def standin_mode(options: List[str]) -> CLIMode:
+    command = [*standin_vm, *options]
+    return CLIMode(ExecutionMode.execute, yolk_command=command)
+
+
+def timed(
+    name: str,
+    mode: CLIMode,
+    run: Callable[[EggCLI, List[str]], None],
+    sources: List[str],
+) -> None:
+    egg_cli = EggCLI(mode)
+    egg_cli.start_vm()
+    egg_cli.execute(sources[0])   # compile the grammar and warm up the VM
+    start = time.perf_counter()
+    run(egg_cli, sources)
+    seconds = time.perf_counter() - start
+    egg_cli.stop_vm()
+    print(
+        f'  {name}: {seconds * 1000:.1f}ms, '
+        f'{seconds / len(sources) * 1e6:.0f}us per command'
+    )
+
+
+def one_at_a_time(egg_cli: EggCLI, sources: List[str]) -> None:
+    for src in sources:
+        egg_cli.execute(src)
+
+
+def pipelined(egg_cli: EggCLI, sources: List[str]) -> None:
+    egg_cli.execute_many(sources)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('vm_round_trips')
+    arg_parser.add_argument('--commands', type=int, default=2000)
+    arg_parser.add_argument(
+        '--delays',
+        help='Seconds the stand-in VM takes to run each command.',
+        type=float,
+        nargs='+',
+        default=[0, 0.0002, 0.001],
+    )
+    args = arg_parser.parse_args()
+
+    sources = [f'{i} + {i} * 2.5' for i in range(args.commands)]
+    print(f'{args.commands} commands')
+    in_process = CLIMode(ExecutionMode.execute, in_process=True)
+    timed('in process', in_process, one_at_a_time, sources)
+    for delay in args.delays:
+        print(f'{args.commands} commands, {delay * 1e6:.0f}us each in the VM')
+        for name, options, run in [
+            ('unframed, one at a time', ['-unframed'], one_at_a_time),
+            ('framed, one at a time', [], one_at_a_time),
+            ('framed, pipelined', [], pipelined),
+        ]:
+            mode = standin_mode([*options, '-delay', str(delay)])
+            timed(name, mode, run, sources)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,48 @@
+import collections
+import functools
 import pathlib
 import readline
 import sys
+from concurrent.futures import Future
 from enum import Enum
-from subprocess import PIPE, Popen
-from typing import Tuple
+from typing import (
+    IO,
+    Callable,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import lark
+import lark.lexer
 
-from ..frontend.lexer import EggLexer
+from ..frontend.lexer import EggLexer, EggLexerLark
 from ..frontend.lexer_util import LexerError
+from ..frontend.parallel_lexer import ParallelEggLexer
 from ..frontend.parser import get_parser
+from ..frontend.source import read_source
+from ..frontend.statements import statement_tokens, stream_statements
+from ..frontend.table_lexer import TableEggLexer, TableEggLexerLark
 from ..yolk import yolk
+from ..yolk.bytecode import encode
+from ..yolk.ir import Fragment, Instruction, Opcode, YolkProgram, flatten
+from ..yolk.peephole import PeepholeOptimizer
+from ..yolk.vm import YolkVM
+from .compile_cache import CompileCache
 from .profilers import ProfilerConfig, maybe_profile
+from .statement_cache import StatementCache
+from .vm_channel import MAX_CAPTURE, VMError, VMFormat, VMProcess
+from .vm_pool import VMPool
 
 assert readline   # silence pyflakes
 
+# Where an unframed VM's stdout and stderr are passed on to, if anywhere
+Echo = Tuple[Optional[IO[bytes]], Optional[IO[bytes]]]
+
 
 class ExecutionMode(Enum):
     lex = 1
@@ -24,53 +52,177 @@ class ExecutionMode(Enum):
     execute = 5
 
 
+class LexerEngine(Enum):
+    dfa = 1
+    table = 2
+
+
 class CLIMode:
-    def __init__(self, mode: ExecutionMode):
+    def __init__(
+        self,
+        mode: ExecutionMode,
+        lexer_engine: LexerEngine = LexerEngine.dfa,
+        lex_jobs: int = 1,
+        use_compile_cache: bool = False,
+        constant_folding: bool = True,
+        peephole: bool = True,
+        yolk_command: Sequence[str] = ('../yolk/yolk',),
+        in_process: bool = False,
+        max_capture: int = MAX_CAPTURE,
+        statement_cache_size: int = 1024,
+        streaming: bool = False,
+    ):
         self.mode: ExecutionMode = mode
+        self.lexer_engine: LexerEngine = lexer_engine
+        self.lex_jobs: int = lex_jobs
+        self.use_compile_cache: bool = use_compile_cache
+        self.constant_folding: bool = constant_folding
+        self.peephole: bool = peephole
+        self.yolk_command: Sequence[str] = yolk_command
+        self.in_process: bool = in_process
+        self.max_capture: int = max_capture
+        self.statement_cache_size: int = statement_cache_size
+        self.streaming: bool = streaming
 
 
 class EggCLI:
-    def __init__(self, mode: CLIMode, use_profiler: bool = False):
+    def __init__(
+        self,
+        mode: CLIMode,
+        use_profiler: bool = False,
+        vm_pool: Optional[VMPool] = None,
+    ):
         self.mode = mode
         self.profiler_config = ProfilerConfig(use_profiler)
         self.interactive_profiler_counter = 0
+        self.compile_cache = CompileCache(
+            enabled=mode.use_compile_cache,
+            settings=(
+                f'{mode.lexer_engine.name} fold={mode.constant_folding} '
+                f'peephole={mode.peephole}'
+            ),
+        )
+        self.peephole_optimizer = PeepholeOptimizer()
+        self.statement_cache = StatementCache(mode.statement_cache_size)
+        # Programs run in this process if asked to, then on the pool's VMs
+        # if there is one, and otherwise on a VM of this CLI's own, started
+        # when first needed
+        self.vm_pool = vm_pool
+        self.vm: Optional[VMProcess | VMPool | YolkVM] = None
+        # Results of programs sent to the VM but not yet shown, in order
+        self.pending_results: Deque[
+            Future[Tuple[str, str]]
+        ] = collections.deque()
+        self.wait_for_results = True
         self.initialize_transformers()
 
     @maybe_profile(lambda _: 'initialization')
     def initialize_transformers(self) -> None:
+        table_lexer = self.mode.lexer_engine == LexerEngine.table
         if self.mode.mode == ExecutionMode.lex:
-            self.lexer = EggLexer()
-        elif self.mode.mode == ExecutionMode.ast:
-            self.parser = get_parser(lowering=False)
-        elif self.mode.mode == ExecutionMode.sema:
-            self.parser = get_parser()
-        elif self.mode.mode in [ExecutionMode.codegen, ExecutionMode.execute]:
-            self.parser = get_parser()
-            self.codegen = yolk.YolkGenerator()
+            self.lexer: EggLexer | TableEggLexer | ParallelEggLexer
+            if self.mode.lex_jobs > 1:
+                self.lexer = ParallelEggLexer(self.mode.lex_jobs)
+            elif table_lexer:
+                self.lexer = TableEggLexer()
+            else:
+                self.lexer = EggLexer()
+        elif self.mode.mode in [ExecutionMode.ast, ExecutionMode.sema]:
+            assert self.parser
+
+    @functools.cached_property
+    def parser(self) -> lark.Lark:
+        table_lexer = self.mode.lexer_engine == LexerEngine.table
+        return get_parser(
+            lowering=self.mode.mode != ExecutionMode.ast,
+            lexer=TableEggLexerLark if table_lexer else EggLexerLark,
+        )
+
+    @functools.cached_property
+    def compiler(self) -> lark.Lark:
+        # Built on first use, so scripts found in the compile cache never
+        # load the grammar
+        table_lexer = self.mode.lexer_engine == LexerEngine.table
+        return get_parser(
+            lexer=TableEggLexerLark if table_lexer else EggLexerLark,
+            transformer=(
+                yolk.FoldingYolkGenerator
+                if self.mode.constant_folding
+                else yolk.FusedYolkGenerator
+            ),
+        )
+
+    def start_vm(self) -> VMProcess | VMPool | YolkVM:
+        if self.mode.in_process:
+            self.vm = YolkVM()
+        else:
+            self.vm = self.vm_pool or VMProcess(
+                self.mode.yolk_command, max_capture=self.mode.max_capture
+            )
+        return self.vm
+
+    def stop_vm(self) -> None:
+        if isinstance(self.vm, VMProcess):
+            self.vm.close()
+        self.vm = None
 
     def interactive_mode(self) -> None:
-        self.yolk_proc = Popen(
-            ['../yolk/yolk', '-interactive'], stdin=PIPE, stdout=PIPE
+        vm = self.start_vm()
+        # When lines are piped in rather than typed, each one is sent to a
+        # framed VM without waiting for the results of the ones before it
+        self.wait_for_results = (
+            isinstance(vm, YolkVM)
+            or not vm.capabilities.framed
+            or sys.stdin.isatty()
         )
         while True:
-            expression = input('egg> ').strip()
+            try:
+                expression = input('egg> ').strip()
+            except EOFError:
+                expression = 'exit'
             if not expression:
                 continue
             if expression == 'exit':
-                assert self.yolk_proc.stdin is not None
-                self.yolk_proc.stdin.close()
+                self.show_results()
+                self.stop_vm()
                 break
             try:
                 self.consume_interactive(expression)
             except LexerError as e:
+                self.show_results()
                 print(e, file=sys.stderr)
             except lark.exceptions.LarkError as e:
+                self.show_results()
+                print(e, file=sys.stderr)
+            except VMError as e:
                 print(e, file=sys.stderr)
 
     @maybe_profile(lambda self, path: 'script_' + pathlib.Path(path).name)
     def consume_script(self, file_path: str) -> None:
-        script = pathlib.Path(file_path).read_text('utf-8')
-        self.consume_source(script)
+        if self.mode.streaming and self.mode.mode == ExecutionMode.execute:
+            self.stream_script(file_path)
+            return
+        script = read_source(file_path)
+        self.consume_source(script, file_path)
+
+    def stream_script(self, file_path: str) -> None:
+        """Runs a script a statement at a time, each as soon as it is read.
+
+        As when the script is run whole, only the value the last statement
+        leaves is printed, since the VM keeps its stack between programs,
+        and nothing runs after a statement that fails.
+        """
+        self.wait_for_results = True
+        with open(file_path, encoding='utf-8') as script:
+            for statement in stream_statements(script):
+                program = self.compile_statements([statement])
+                if not self.show_submitted(
+                    lambda echo: self.submit_program(program, echo, False)
+                ):
+                    return
+        self.show_submitted(
+            lambda echo: self.submit_program(YolkProgram(), echo)
+        )
 
     @maybe_profile(
         lambda self, _: f'interactive_{self.interactive_profiler_counter}'
@@ -79,7 +231,9 @@ class EggCLI:
         self.consume_source(src)
         self.interactive_profiler_counter += 1
 
-    def consume_source(self, src: str) -> None:
+    def consume_source(
+        self, src: str, script_path: Optional[str] = None
+    ) -> None:
         if not src:
             return
         if self.mode.mode == ExecutionMode.lex:
@@ -87,9 +241,16 @@ class EggCLI:
         elif self.mode.mode in (ExecutionMode.ast, ExecutionMode.sema):
             self.show_ast(src)
         elif self.mode.mode == ExecutionMode.codegen:
-            self.show_codegen(src)
+            self.show_codegen(src, script_path)
+            self.show_statement_cache()
         elif self.mode.mode == ExecutionMode.execute:
-            self.show_execute(src)
+            self.show_execute(src, script_path)
+            self.show_statement_cache()
+
+    def show_statement_cache(self) -> None:
+        if self.profiler_config.enabled:
+            print(f'debug: {self.statement_cache.report()}')
+            print(f'debug: {yolk.fragment_memo.report()}')
 
     def show_lex(self, src: str) -> None:
         tokens = self.lexer.lex(src)
@@ -100,37 +261,168 @@ class EggCLI:
         ast = self.parser.parse(src)
         print(ast.pretty(), end='')
 
-    def get_codegen(self, src: str) -> str:
-        ast = self.parser.parse(src)
-        return '\n'.join(self.codegen.transform(ast))   # type: ignore
-
-    def show_codegen(self, src: str) -> None:
-        print(self.get_codegen(src))
-
-    def show_execute(self, src: str) -> None:
-        out, err = self.execute(src)
-        if out:
-            print(out, end='')
-        if err:
-            print(err, end='', file=sys.stderr)
-
-    def execute(self, src: str) -> Tuple[str, str]:
-        output = self.get_codegen(src)
-        yolk_input = bytes(f'{output}\nPRINT\n', encoding='utf-8')
-
-        assert self.yolk_proc.stdin is not None
-        self.yolk_proc.stdin.write(yolk_input)
-        self.yolk_proc.stdin.flush()
-
-        out = (
-            self.yolk_proc.stdout.readline()
-            if self.yolk_proc.stdout is not None
-            else b''
-        )
-        err = (
-            self.yolk_proc.stderr.readline()
-            if self.yolk_proc.stderr is not None
-            else b''
-        )
+    def get_codegen(self, src: str, script_path: Optional[str] = None) -> str:
+        if script_path is not None:
+            cached = self.compile_cache.load(script_path, src)
+            if cached is not None:
+                return cached
+        code = self.compile(src).to_text()
+        if script_path is not None:
+            self.compile_cache.store(script_path, src, code)
+        return code
+
+    def get_program(
+        self, src: str, script_path: Optional[str] = None
+    ) -> YolkProgram:
+        if script_path is not None:
+            cached = self.compile_cache.load(script_path, src)
+            if cached is not None:
+                return YolkProgram.from_text(cached)
+        program = self.compile(src)
+        if script_path is not None:
+            self.compile_cache.store(script_path, src, program.to_text())
+        return program
+
+    def lex_lark(self, src: str) -> Iterator[lark.lexer.Token]:
+        if self.mode.lexer_engine == LexerEngine.table:
+            return TableEggLexer().lex_lark(src)
+        return EggLexer().lex_lark(src)
+
+    def statements(self, src: str) -> List[List[lark.lexer.Token]]:
+        return list(statement_tokens(self.lex_lark(src)))
+
+    def compile_statement(
+        self, statement: Sequence[lark.lexer.Token]
+    ) -> Fragment:
+        # Parsed from the tokens lexed with the rest of the source, since
+        # lexing the statement alone can tell its tokens apart differently
+        parser = self.compiler.parse_interactive('')
+        for token in statement:
+            parser.feed_token(token)
+        fragment: Fragment = parser.feed_eof(statement[-1])   # type: ignore
+        return fragment
+
+    def compile(self, src: str) -> YolkProgram:
+        return self.compile_statements(self.statements(src))
+
+    def compile_statements(
+        self, statements: Iterable[Sequence[lark.lexer.Token]]
+    ) -> YolkProgram:
+        """Compiles top-level statements into one program.
+
+        Statements compiled before are taken from the statement cache, and
+        the peephole pass runs over the whole program.
+        """
+        fragment: Fragment = [
+            self.statement_cache.get(statement, self.compile_statement)
+            for statement in statements
+        ]
+        program = flatten(fragment)
+        if self.mode.peephole:
+            program = self.peephole_optimizer.optimize(program)
+        return program
+
+    def show_codegen(
+        self, src: str, script_path: Optional[str] = None
+    ) -> None:
+        print(self.get_codegen(src, script_path))
+
+    def show_execute(
+        self, src: str, script_path: Optional[str] = None
+    ) -> None:
+        self.show_submitted(lambda echo: self.submit(src, script_path, echo))
+
+    def show_submitted(
+        self,
+        submit: Callable[[Optional[Echo]], 'Future[Tuple[str, str]]'],
+    ) -> bool:
+        """Shows the results of what submit sends to the VM.
+
+        Returns whether it ran without errors, as far as has been shown.
+        """
+        vm = self.vm or self.start_vm()
+        if isinstance(vm, VMProcess) and not vm.capabilities.framed:
+            # Output is shown as it arrives, since nothing else can be in
+            # flight, and errors once the program is done
+            ok = self.show_results()
+            sys.stdout.flush()
+            _, err = submit((sys.stdout.buffer, None)).result()
+            if err:
+                print(err, end='', file=sys.stderr)
+            return ok and not err
+        self.pending_results.append(submit(None))
+        return self.show_results(wait=self.wait_for_results)
+
+    def show_results(self, wait: bool = True) -> bool:
+        """Shows results in order, waiting for them all if `wait`.
+
+        Returns whether none of those shown had errors.
+        """
+        ok = True
+        while self.pending_results and (
+            wait or self.pending_results[0].done()
+        ):
+            out, err = self.pending_results.popleft().result()
+            if out:
+                print(out, end='')
+            if err:
+                print(err, end='', file=sys.stderr)
+                ok = False
+        return ok
+
+    def execute(
+        self, src: str, script_path: Optional[str] = None
+    ) -> Tuple[str, str]:
+        return self.submit(src, script_path).result()
+
+    def execute_many(self, sources: Iterable[str]) -> List[Tuple[str, str]]:
+        futures = [self.submit(src) for src in sources]
+        return [future.result() for future in futures]
+
+    def submit(
+        self,
+        src: str,
+        script_path: Optional[str] = None,
+        echo: Optional[Echo] = None,
+    ) -> 'Future[Tuple[str, str]]':
+        """Sends a program to the VM, returning its stdout and stderr.
+
+        An unframed VM's output is passed on to `echo` instead, if given.
+        """
+        vm = self.vm or self.start_vm()
+        if (
+            not isinstance(vm, YolkVM)
+            and vm.capabilities.vm_format == VMFormat.text
+        ):
+            # Sent as it comes from the compile cache
+            output = self.get_codegen(src, script_path)
+            yolk_input = bytes(f'{output}\nPRINT\n', encoding='utf-8')
+            return self.send(yolk_input, echo)
+        return self.submit_program(self.get_program(src, script_path), echo)
+
+    def submit_program(
+        self,
+        program: YolkProgram,
+        echo: Optional[Echo] = None,
+        print_value: bool = True,
+    ) -> 'Future[Tuple[str, str]]':
+        """Like submit, printing the value left only if `print_value`."""
+        vm = self.vm or self.start_vm()
+        if print_value:
+            program.append(Instruction(Opcode.PRINT))
+        if isinstance(vm, YolkVM):
+            result: Future[Tuple[str, str]] = Future()
+            result.set_result(vm.execute(program))
+            return result
+        if vm.capabilities.vm_format == VMFormat.bytecode:
+            return self.send(encode(program), echo)
+        return self.send(f'{program.to_text()}\n'.encode('utf-8'), echo)
 
-        return out.decode('utf-8'), err.decode('utf-8')
+    def send(
+        self, yolk_input: bytes, echo: Optional[Echo] = None
+    ) -> 'Future[Tuple[str, str]]':
+        vm = self.vm or self.start_vm()
+        assert not isinstance(vm, YolkVM)
+        if isinstance(vm, VMProcess):
+            return vm.submit(yolk_input, echo)
+        return vm.submit(yolk_input, client=self)
@@ -0,0 +1,96 @@
+import functools
+import hashlib
+import os
+import pathlib
+import shutil
+import tempfile
+from typing import Optional
+
+CACHE_DIR_NAME = '__eggcache__'
+
+# Bump when the layout of cache files changes
+CACHE_FORMAT = 1
+
+_src_root = pathlib.Path(__file__).parents[1]
+
+
+@functools.cache
+def compiler_fingerprint() -> str:
+    """Hashes the grammar and every source file of the lexers and compiler.
+
+    Any change to them, including local edits, invalidates cached code.
+    """
+    digest = hashlib.sha256(f'egg-cache-{CACHE_FORMAT}'.encode())
+    paths = [_src_root / 'frontend' / 'egg.lark']
+    for package in ['frontend', 'yolk']:
+        paths.extend(
+            path
+            for path in (_src_root / package).glob('*.py')
+            if not path.name.endswith('_test.py')
+        )
+    for path in sorted(paths):
+        digest.update(path.relative_to(_src_root).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class CompileCache:
+    """Stores generated Yolk code next to scripts, like __pycache__.
+
+    Each script gets one cache file whose first line is a key hashing the
+    script, the compiler fingerprint and the compilation settings, so a
+    stale entry is simply overwritten.
+    """
+
+    def __init__(self, enabled: bool = True, settings: str = ''):
+        self.enabled = enabled
+        self.settings = settings
+
+    @staticmethod
+    def cache_dir_for(script_path: str) -> pathlib.Path:
+        return pathlib.Path(script_path).resolve().parent / CACHE_DIR_NAME
+
+    def cache_path_for(self, script_path: str) -> pathlib.Path:
+        name = pathlib.Path(script_path).name
+        return self.cache_dir_for(script_path) / f'{name}.yolk'
+
+    def key(self, src: str) -> str:
+        digest = hashlib.sha256(compiler_fingerprint().encode())
+        digest.update(self.settings.encode())
+        digest.update(b'\0')
+        digest.update(src.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def load(self, script_path: str, src: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            cached = self.cache_path_for(script_path).read_text('utf-8')
+        except (OSError, UnicodeDecodeError):
+            return None
+        header, _, code = cached.partition('\n')
+        if header != f'# {self.key(src)}':
+            return None
+        return code
+
+    def store(self, script_path: str, src: str, code: str) -> None:
+        if not self.enabled:
+            return
+        cache_path = self.cache_path_for(script_path)
+        try:
+            cache_path.parent.mkdir(exist_ok=True)
+            # Write then rename, so concurrent runs never read half a file
+            fd, temp_path = tempfile.mkstemp(dir=cache_path.parent)
+        except OSError:
+            # An unwritable script directory just means no caching
+            return
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as temp_file:
+                temp_file.write(f'# {self.key(src)}\n{code}')
+            os.replace(temp_path, cache_path)
+        except OSError:
+            os.unlink(temp_path)
+
+    @classmethod
+    def clear(cls, script_path: str) -> None:
+        shutil.rmtree(cls.cache_dir_for(script_path), ignore_errors=True)
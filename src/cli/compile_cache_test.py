@@ -0,0 +1,78 @@
+import pathlib
+
+import pytest
+
+from .cli import CLIMode, EggCLI, ExecutionMode
+from .compile_cache import CACHE_DIR_NAME, CompileCache
+
+
+@pytest.fixture
+def script(tmp_path: pathlib.Path) -> pathlib.Path:
+    path = tmp_path / 'script.egg'
+    path.write_text('say 1 + 2')
+    return path
+
+
+def test_store_and_load(script: pathlib.Path) -> None:
+    cache = CompileCache()
+    assert cache.load(str(script), 'say 1 + 2') is None
+    cache.store(str(script), 'say 1 + 2', 'PUSH_INT 1\nPUSH_INT 2\nADD')
+    assert (script.parent / CACHE_DIR_NAME / 'script.egg.yolk').exists()
+    assert (
+        cache.load(str(script), 'say 1 + 2') == 'PUSH_INT 1\nPUSH_INT 2\nADD'
+    )
+
+
+def test_source_change_misses(script: pathlib.Path) -> None:
+    cache = CompileCache()
+    cache.store(str(script), 'say 1 + 2', 'code')
+    assert cache.load(str(script), 'say 1 + 3') is None
+
+
+def test_settings_change_misses(script: pathlib.Path) -> None:
+    CompileCache(settings='dfa').store(str(script), 'say 1', 'code')
+    assert CompileCache(settings='table').load(str(script), 'say 1') is None
+    assert CompileCache(settings='dfa').load(str(script), 'say 1') == 'code'
+
+
+def test_disabled(script: pathlib.Path) -> None:
+    CompileCache().store(str(script), 'say 1', 'code')
+    cache = CompileCache(enabled=False)
+    assert cache.load(str(script), 'say 1') is None
+    cache.store(str(script), 'say 2', 'other')
+    assert CompileCache().load(str(script), 'say 1') == 'code'
+
+
+def test_clear(script: pathlib.Path) -> None:
+    cache = CompileCache()
+    cache.store(str(script), 'say 1', 'code')
+    CompileCache.clear(str(script))
+    assert not (script.parent / CACHE_DIR_NAME).exists()
+    assert cache.load(str(script), 'say 1') is None
+    CompileCache.clear(str(script))
+
+
+def test_unwritable_directory(script: pathlib.Path) -> None:
+    # A file where the cache directory should be makes every store fail
+    (script.parent / CACHE_DIR_NAME).write_text('')
+    cache = CompileCache()
+    cache.store(str(script), 'say 1', 'code')
+    assert cache.load(str(script), 'say 1') is None
+
+
+def test_cli_skips_parser_on_hit(
+    script: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    mode = CLIMode(ExecutionMode.codegen, use_compile_cache=True)
+    EggCLI(mode).consume_script(str(script))
+    expected = capsys.readouterr().out
+
+    egg_cli = EggCLI(mode)
+    egg_cli.consume_script(str(script))
+    assert capsys.readouterr().out == expected
+    assert 'compiler' not in vars(egg_cli)
+
+    script.write_text('say 1 + 3')
+    egg_cli.consume_script(str(script))
+    assert capsys.readouterr().out != expected
+    assert 'compiler' in vars(egg_cli)
@@ -8,7 +8,8 @@ class ProfilerConfig:
     def __init__(self, enabled: bool, profiles_root_dir: str = 'profiles'):
         self.enabled = enabled
         self.profiles_root_dir = profiles_root_dir
-        os.makedirs(self.profiles_root_dir, exist_ok=True)
+        if enabled:
+            os.makedirs(self.profiles_root_dir, exist_ok=True)
 
     def get_path_for(self, profile_name: Optional[str] = None) -> str:
         if not profile_name:
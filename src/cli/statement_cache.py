@@ -0,0 +1,55 @@
+import collections
+from typing import Callable, OrderedDict, Sequence, Tuple
+
+import lark.lexer
+
+from ..yolk.ir import Fragment
+
+StatementKey = Tuple[Tuple[str, str], ...]
+
+
+def statement_key(statement: Sequence[lark.lexer.Token]) -> StatementKey:
+    return tuple((token.type, token.value) for token in statement)
+
+
+class StatementCache:
+    """Keeps the Yolk generated for recently compiled top-level statements.
+
+    Entries are keyed by the type and text of the statement's tokens, as
+    lexed along with the rest of its source, and the least recently used
+    one is dropped once there are `max_size`. Fragments are shared by every
+    program they end up in, so they must not be modified.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.entries: OrderedDict[
+            StatementKey, Fragment
+        ] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        statement: Sequence[lark.lexer.Token],
+        compile_statement: Callable[[Sequence[lark.lexer.Token]], Fragment],
+    ) -> Fragment:
+        key = statement_key(statement)
+        fragment = self.entries.get(key)
+        if fragment is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return fragment
+        self.misses += 1
+        fragment = compile_statement(statement)
+        if self.max_size > 0:
+            self.entries[key] = fragment
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return fragment
+
+    def report(self) -> str:
+        return (
+            f'statement cache: {self.hits} hits, {self.misses} misses, '
+            f'{len(self.entries)} of {self.max_size} entries'
+        )
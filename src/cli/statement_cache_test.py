@@ -0,0 +1,101 @@
+import pathlib
+from typing import Iterator, List, Sequence
+
+import pytest
+from lark.lexer import Token
+
+from ..yolk.ir import Fragment, Instruction, Opcode
+from .cli import CLIMode, EggCLI, ExecutionMode
+from .statement_cache import StatementCache, statement_key
+
+
+def test_least_recently_used_is_dropped() -> None:
+    compiled: List[str] = []
+
+    def compile_statement(statement: Sequence[Token]) -> Fragment:
+        compiled.append(statement[0])
+        return [Instruction(Opcode.PUSH_STR, statement[0])]
+
+    cache = StatementCache(max_size=2)
+    for name in ['a', 'b', 'a', 'c', 'a', 'b']:
+        cache.get([Token('NAME', name)], compile_statement)
+    assert compiled == ['a', 'b', 'c', 'b']
+    assert (cache.hits, cache.misses) == (2, 4)
+    assert list(cache.entries) == [(('NAME', 'a'),), (('NAME', 'b'),)]
+    assert cache.report() == (
+        'statement cache: 2 hits, 4 misses, 2 of 2 entries'
+    )
+
+    disabled = StatementCache(max_size=0)
+    disabled.get([Token('NAME', 'a')], compile_statement)
+    disabled.get([Token('NAME', 'a')], compile_statement)
+    assert disabled.misses == 2 and not disabled.entries
+
+
+def test_cli_compiles_each_statement_once() -> None:
+    egg_cli = EggCLI(CLIMode(ExecutionMode.codegen))
+    assert egg_cli.get_codegen('say 1 + 2') == 'PUSH_INT 3\nPRINT'
+    assert egg_cli.get_codegen('  say 1 + 2  ') == 'PUSH_INT 3\nPRINT'
+    assert egg_cli.statement_cache.hits == 1
+    code = egg_cli.get_codegen('say 1 + 2\n# a comment\nsay "a"; say 1 + 2')
+    assert code == 'PUSH_INT 3\nPRINT\nPUSH_STR "a"\nPRINT\nPUSH_INT 3\nPRINT'
+    assert (egg_cli.statement_cache.hits, egg_cli.statement_cache.misses) == (
+        3,
+        2,
+    )
+
+
+def test_statements_keep_their_tokens_from_the_whole_source(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    egg_cli = EggCLI(CLIMode(ExecutionMode.codegen))
+    lexed: List[str] = []
+    lex_lark = egg_cli.lex_lark
+
+    def counting_lex_lark(src: str) -> Iterator[Token]:
+        lexed.append(src)
+        return lex_lark(src)
+
+    monkeypatch.setattr(egg_cli, 'lex_lark', counting_lex_lark)
+    # Alone, hi would be an argument of echo rather than a name
+    src = 'echo hi \n(1)'
+    echo, _ = egg_cli.statements(src)
+    assert [token.type for token in echo] == [
+        token.type for token in lex_lark(src)
+    ][:2]
+    alone = egg_cli.statements('echo hi')[0]
+    assert statement_key(echo) != statement_key(alone)
+
+    # Each source is lexed once, and its statements parsed from its tokens
+    lexed.clear()
+    src = 'say 1 \n(2)'
+    assert egg_cli.get_codegen(src) == 'PUSH_INT 1\nPRINT\nPUSH_INT 2'
+    assert egg_cli.get_codegen(src) == 'PUSH_INT 1\nPRINT\nPUSH_INT 2'
+    assert lexed == [src, src]
+
+
+def test_profiler_output_shows_counters(
+    capsys: pytest.CaptureFixture[str],
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Profiles are written from construction on, under the working directory
+    monkeypatch.chdir(tmp_path)
+    egg_cli = EggCLI(CLIMode(ExecutionMode.codegen), use_profiler=True)
+    egg_cli.consume_interactive('say 1')
+    egg_cli.consume_interactive('say 1')
+    out = capsys.readouterr().out
+    assert 'debug: statement cache: 1 hits, 1 misses, 1 of 1024 entries' in out
+
+
+@pytest.mark.parametrize('mode', [ExecutionMode.lex, ExecutionMode.ast])
+def test_profiler_output_leaves_out_counters_without_compiling(
+    mode: ExecutionMode,
+    capsys: pytest.CaptureFixture[str],
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    egg_cli = EggCLI(CLIMode(mode), use_profiler=True)
+    egg_cli.consume_interactive('say 1')
+    assert 'statement cache' not in capsys.readouterr().out
@@ -0,0 +1,369 @@
+import io
+import os
+import selectors
+import subprocess
+import threading
+import uuid
+from concurrent.futures import Future
+from enum import Enum
+from typing import IO, Dict, FrozenSet, List, NamedTuple, Sequence, Tuple
+
+from ..yolk.bytecode import (
+    CAPABILITY,
+    BytecodeError,
+    encode,
+    read_frame,
+    write_frame,
+)
+from ..yolk.ir import Instruction, Opcode, YolkProgram
+from ..yolk.protocol import (
+    FRAMES_CAPABILITY,
+    decode_response,
+    encode_request,
+)
+
+# Size of each read from and write to an unframed VM
+CHUNK_SIZE = 1 << 16
+
+# Most output kept from one program by default, per stream
+MAX_CAPTURE = 16 << 20
+
+
+class VMFormat(Enum):
+    text = 1
+    bytecode = 2
+
+
+class VMCapabilities(NamedTuple):
+    vm_format: VMFormat
+    framed: bool
+
+
+class VMError(Exception):
+    pass
+
+
+def probe_capabilities(
+    command: Sequence[str], timeout: float = 5
+) -> FrozenSet[str]:
+    """Asks the VM what it supports, one capability per line.
+
+    VMs that predate -capabilities fail, hang or print something else, and
+    all of those mean no capabilities.
+    """
+    try:
+        probe = subprocess.run(
+            [*command, '-capabilities'],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return frozenset()
+    if probe.returncode != 0:
+        return frozenset()
+    return frozenset(probe.stdout.decode('utf-8', 'replace').splitlines())
+
+
+def negotiate(command: Sequence[str], timeout: float = 5) -> VMCapabilities:
+    capabilities = probe_capabilities(command, timeout)
+    return VMCapabilities(
+        VMFormat.bytecode if CAPABILITY in capabilities else VMFormat.text,
+        FRAMES_CAPABILITY in capabilities,
+    )
+
+
+def interactive_command(
+    command: Sequence[str], capabilities: VMCapabilities
+) -> List[str]:
+    arguments = [*command, '-interactive']
+    if capabilities.vm_format == VMFormat.bytecode:
+        arguments.append('-bytecode')
+    if capabilities.framed:
+        arguments.append('-framed')
+    return arguments
+
+
+class FramedConnection:
+    """Sends framed requests to a VM and matches up its responses.
+
+    Requests are written as they are submitted and a thread reads the
+    responses, so any number of programs can be in flight at once.
+    """
+
+    def __init__(self, proc: 'subprocess.Popen[bytes]'):
+        self.proc = proc
+        self.next_id = 0
+        self.pending: Dict[int, Future[Tuple[str, str]]] = {}
+        self.closed = False
+        self.lock = threading.Lock()
+        self.reader = threading.Thread(target=self.read_responses, daemon=True)
+        self.reader.start()
+
+    def submit(self, program: bytes) -> 'Future[Tuple[str, str]]':
+        future: Future[Tuple[str, str]] = Future()
+        with self.lock:
+            if self.closed:
+                future.set_exception(VMError('the VM has exited'))
+                return future
+            request_id = self.next_id
+            self.next_id += 1
+            self.pending[request_id] = future
+        assert self.proc.stdin is not None
+        try:
+            write_frame(self.proc.stdin, encode_request(request_id, program))
+            self.proc.stdin.flush()
+        except OSError as e:
+            with self.lock:
+                self.pending.pop(request_id, None)
+            future.set_exception(VMError(f'could not send to the VM: {e}'))
+        return future
+
+    def read_responses(self) -> None:
+        assert self.proc.stdout is not None
+        try:
+            while (frame := read_frame(self.proc.stdout)) is not None:
+                request_id, out, err = decode_response(frame)
+                with self.lock:
+                    future = self.pending.pop(request_id, None)
+                if future is not None:
+                    future.set_result(
+                        (
+                            out.decode('utf-8', 'replace'),
+                            err.decode('utf-8', 'replace'),
+                        )
+                    )
+        except (BytecodeError, OSError, ValueError):
+            pass
+        finally:
+            with self.lock:
+                self.closed = True
+                unanswered, self.pending = self.pending, {}
+            for future in unanswered.values():
+                future.set_exception(VMError('the VM exited before answering'))
+
+    def alive(self) -> bool:
+        return not self.closed and self.proc.poll() is None
+
+    def close(self) -> None:
+        assert self.proc.stdin is not None
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.reader.join()
+        self.proc.wait()
+
+
+class Capture:
+    """Keeps the first `limit` bytes of a stream, or passes it all on."""
+
+    def __init__(self, limit: int, echo: IO[bytes] | None = None):
+        self.limit = limit
+        self.echo = echo
+        self.data = bytearray()
+        self.dropped = 0
+
+    def write(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        if self.echo is not None:
+            self.echo.write(chunk)
+            self.echo.flush()
+            return
+        room = max(self.limit - len(self.data), 0)
+        self.data += chunk[:room]
+        self.dropped += max(len(chunk) - room, 0)
+
+    def text(self) -> str:
+        text = self.data.decode('utf-8', 'replace')
+        if self.dropped:
+            text += f'[{self.dropped} more bytes not captured]\n'
+        return text
+
+
+class UnframedConnection:
+    """Tells apart the output of programs sent to a VM without framing.
+
+    Each program is followed by one that prints a unique marker, and both
+    streams are drained at once until the marker shows up on stdout, so a
+    VM writing more than a pipe holds never stalls. Programs are written
+    from the same loop, since the VM may answer before reading all of one.
+    """
+
+    def __init__(
+        self,
+        proc: 'subprocess.Popen[bytes]',
+        vm_format: VMFormat,
+        max_capture: int = MAX_CAPTURE,
+    ):
+        self.proc = proc
+        self.vm_format = vm_format
+        self.max_capture = max_capture
+        self.marker = f'-- end of output {uuid.uuid4().hex} --'.encode()
+        self.end = self.marker + b'\n'
+        self.closed = False
+        marker = YolkProgram()
+        marker.append(Instruction(Opcode.PUSH_STR, self.marker.decode()))
+        marker.append(Instruction(Opcode.PRINT))
+        self.marker_program = self.request(marker)
+        for stream in (proc.stdin, proc.stdout, proc.stderr):
+            assert stream is not None
+            os.set_blocking(stream.fileno(), False)
+
+    def request(self, program: YolkProgram) -> bytes:
+        if self.vm_format == VMFormat.text:
+            return f'{program.to_text()}\n'.encode('utf-8')
+        frame = io.BytesIO()
+        write_frame(frame, encode(program))
+        return frame.getvalue()
+
+    def submit(
+        self,
+        program: bytes,
+        echo: Tuple[IO[bytes] | None, IO[bytes] | None] | None = None,
+    ) -> 'Future[Tuple[str, str]]':
+        """Runs a program, passing its output on to `echo` if given.
+
+        Output passed on is not captured, and otherwise at most
+        `max_capture` bytes of each stream are kept.
+        """
+        out_echo, err_echo = echo or (None, None)
+        out = Capture(self.max_capture, out_echo)
+        err = Capture(self.max_capture, err_echo)
+        result: Future[Tuple[str, str]] = Future()
+        if self.closed:
+            result.set_exception(VMError('the VM has exited'))
+            return result
+        if self.vm_format == VMFormat.bytecode:
+            frame = io.BytesIO()
+            write_frame(frame, program)
+            program = frame.getvalue()
+        try:
+            self.exchange(program + self.marker_program, out, err)
+        except OSError as e:
+            self.closed = True
+            result.set_exception(VMError(f'could not send to the VM: {e}'))
+            return result
+        result.set_result((out.text(), err.text()))
+        return result
+
+    def exchange(self, request: bytes, out: Capture, err: Capture) -> None:
+        assert self.proc.stdin and self.proc.stdout and self.proc.stderr
+        stdin = self.proc.stdin.fileno()
+        stdout = self.proc.stdout.fileno()
+        stderr = self.proc.stderr.fileno()
+        remaining = memoryview(request)
+        # Bytes held back in case they start the marker. Output need not
+        # end in a newline, so the marker can come anywhere in a line
+        held = b''
+        with selectors.DefaultSelector() as selector:
+            selector.register(stdin, selectors.EVENT_WRITE)
+            selector.register(stdout, selectors.EVENT_READ)
+            selector.register(stderr, selectors.EVENT_READ)
+            while True:
+                for key, _ in selector.select():
+                    if key.fd == stdin:
+                        try:
+                            written = os.write(stdin, remaining[:CHUNK_SIZE])
+                        except BrokenPipeError:
+                            # Exited, which the read of stdout will see
+                            written = len(remaining)
+                        remaining = remaining[written:]
+                        if not remaining:
+                            selector.unregister(stdin)
+                        continue
+                    chunk = os.read(key.fd, CHUNK_SIZE)
+                    if key.fd == stderr:
+                        err.write(chunk)
+                        if not chunk:
+                            selector.unregister(stderr)
+                        continue
+                    if not chunk:
+                        # The VM exited without finishing the program
+                        out.write(held)
+                        self.closed = True
+                        self.drain(stderr, err)
+                        return
+                    data = held + chunk
+                    found = data.find(self.end)
+                    if found >= 0:
+                        out.write(data[:found])
+                        self.drain(stderr, err)
+                        return
+                    keep = len(data) - min(len(self.end) - 1, len(data))
+                    out.write(data[:keep])
+                    held = data[keep:]
+
+    def drain(self, fd: int, err: Capture) -> None:
+        # Errors are written before the VM moves on, so whatever they are is
+        # already in the pipe
+        try:
+            while chunk := os.read(fd, CHUNK_SIZE):
+                err.write(chunk)
+        except BlockingIOError:
+            pass
+
+    def alive(self) -> bool:
+        return not self.closed and self.proc.poll() is None
+
+    def close(self) -> None:
+        assert self.proc.stdin is not None
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc.wait()
+
+
+class VMProcess:
+    """A VM started in interactive mode, framed if it supports it."""
+
+    def __init__(
+        self,
+        command: Sequence[str],
+        capabilities: VMCapabilities | None = None,
+        max_capture: int = MAX_CAPTURE,
+    ):
+        if capabilities is None:
+            capabilities = negotiate(command)
+        self.capabilities = capabilities
+        # Framed responses carry stderr, so only unframed VMs need it piped
+        self.proc = subprocess.Popen(
+            interactive_command(command, capabilities),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=None if capabilities.framed else subprocess.PIPE,
+        )
+        self.connection: FramedConnection | UnframedConnection = (
+            FramedConnection(self.proc)
+            if capabilities.framed
+            else UnframedConnection(
+                self.proc, capabilities.vm_format, max_capture
+            )
+        )
+
+    def submit(
+        self,
+        program: bytes,
+        echo: Tuple[IO[bytes] | None, IO[bytes] | None] | None = None,
+    ) -> 'Future[Tuple[str, str]]':
+        """Runs a program; output of an unframed VM can be passed on."""
+        if isinstance(self.connection, UnframedConnection):
+            return self.connection.submit(program, echo)
+        return self.connection.submit(program)
+
+    def alive(self) -> bool:
+        return self.connection.alive()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def stop(self, timeout: float) -> None:
+        """Ends the VM even if it is stuck, killing it after timeout."""
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self.close()
@@ -0,0 +1,299 @@
+import io
+import pathlib
+import subprocess
+import sys
+from typing import List
+
+import pytest
+
+from ..yolk.bytecode import encode
+from ..yolk.ir import YolkProgram
+from .cli import CLIMode, EggCLI, ExecutionMode
+from .vm_channel import (
+    FramedConnection,
+    UnframedConnection,
+    VMCapabilities,
+    VMError,
+    VMFormat,
+    VMProcess,
+    negotiate,
+)
+
+standin_vm = [sys.executable, '-m', 'src.yolk.standin_vm']
+
+
+@pytest.fixture(autouse=True)
+def importable_standin(monkeypatch: pytest.MonkeyPatch) -> None:
+    # The stand-in runs as a module of this package
+    monkeypatch.setenv('PYTHONPATH', str(pathlib.Path(__file__).parents[2]))
+
+
+def test_negotiate() -> None:
+    assert negotiate(standin_vm) == VMCapabilities(VMFormat.bytecode, True)
+    assert negotiate([*standin_vm, '-text-only', '-unframed']) == (
+        VMCapabilities(VMFormat.text, False)
+    )
+    assert negotiate(['/nonexistent/yolk']) == VMCapabilities(
+        VMFormat.text, False
+    )
+    assert negotiate([sys.executable, '-c', 'exit(1)']) == VMCapabilities(
+        VMFormat.text, False
+    )
+    hang = [sys.executable, '-c', 'import time; time.sleep(10)']
+    assert negotiate(hang, timeout=0.1) == VMCapabilities(
+        VMFormat.text, False
+    )
+
+
+@pytest.mark.parametrize(
+    'options, capabilities',
+    [
+        ([], VMCapabilities(VMFormat.bytecode, True)),
+        (['-text-only'], VMCapabilities(VMFormat.text, True)),
+        (['-unframed'], VMCapabilities(VMFormat.bytecode, False)),
+        (['-text-only', '-unframed'], VMCapabilities(VMFormat.text, False)),
+    ],
+)
+def test_execute(options: List[str], capabilities: VMCapabilities) -> None:
+    mode = CLIMode(ExecutionMode.execute, yolk_command=standin_vm + options)
+    egg_cli = EggCLI(mode)
+    try:
+        assert egg_cli.execute('1 + 2 * 3') == ('7\n', '')
+        assert isinstance(egg_cli.vm, VMProcess)
+        assert egg_cli.vm.capabilities == capabilities
+        assert egg_cli.execute('"a\\"b" ++ 1') == ('a\\"b1\n', '')
+        assert egg_cli.execute('1 < 2 <= 2.5') == ('true\n', '')
+        assert egg_cli.execute('say -1.5') == ('-1.5\n', '')
+    finally:
+        egg_cli.stop_vm()
+    assert egg_cli.vm is None
+
+
+def test_execute_many() -> None:
+    mode = CLIMode(ExecutionMode.execute, yolk_command=standin_vm)
+    egg_cli = EggCLI(mode)
+    try:
+        sources = [f'{i} * 2' for i in range(200)] + ['"a" - 1']
+        results = egg_cli.execute_many(sources)
+        assert results[:200] == [(f'{i * 2}\n', '') for i in range(200)]
+        out, err = results[200]
+        assert out == '' and err.startswith('error: TypeError')
+    finally:
+        egg_cli.stop_vm()
+
+
+def start_framed(command: List[str]) -> FramedConnection:
+    proc = subprocess.Popen(
+        command, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+    return FramedConnection(proc)
+
+
+def test_multiple_lines_of_output() -> None:
+    connection = start_framed([*standin_vm, '-interactive', '-framed'])
+    result = connection.submit(b'PUSH_INT 1\nPRINT\nPUSH_STR "a"\nPRINT\n')
+    assert result.result() == ('1\na\n', '')
+    connection.close()
+    with pytest.raises(VMError):
+        connection.submit(b'PUSH_INT 1\nPRINT\n').result()
+
+
+# Answers two requests in the opposite order, then exits without answering
+# the third
+reversing_vm = '''
+import sys
+from src.yolk.bytecode import read_frame, write_frame
+from src.yolk.protocol import decode_request, encode_response
+requests = [decode_request(read_frame(sys.stdin.buffer)) for _ in range(3)]
+for request_id, program in reversed(requests[:2]):
+    write_frame(sys.stdout.buffer, encode_response(request_id, program, b''))
+'''
+
+
+def test_responses_out_of_order() -> None:
+    connection = start_framed([sys.executable, '-c', reversing_vm])
+    first = connection.submit(b'first')
+    second = connection.submit(b'second')
+    third = connection.submit(b'third')
+    assert first.result() == ('first', '')
+    assert second.result() == ('second', '')
+    with pytest.raises(VMError):
+        third.result()
+    connection.close()
+
+
+def test_piped_session(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    session = ['1 + 1', 'say "two"', '1 +', '"a" - 1', '3 * 3']
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('\n'.join(session)))
+    mode = CLIMode(ExecutionMode.execute, yolk_command=standin_vm)
+    egg_cli = EggCLI(mode)
+    egg_cli.interactive_mode()
+    assert not egg_cli.wait_for_results
+    assert egg_cli.vm is None
+    captured = capsys.readouterr()
+    assert captured.out.replace('egg> ', '') == '2\ntwo\n9\n'
+    assert captured.err.index('Unexpected') < captured.err.index('TypeError')
+
+
+@pytest.mark.parametrize('options', [['-text-only'], []])
+def test_unframed_output(options: List[str]) -> None:
+    command = [*standin_vm, '-unframed', *options]
+    vm = VMProcess(command)
+    assert isinstance(vm.connection, UnframedConnection)
+
+    def request(text: str) -> bytes:
+        program = YolkProgram.from_text(text)
+        if vm.capabilities.vm_format == VMFormat.bytecode:
+            return encode(program)
+        return f'{program.to_text()}\n'.encode()
+
+    try:
+        # Far more than a pipe holds, on many lines and on one
+        lines = ''.join(f'PUSH_INT {i}\nPRINT\n' for i in range(20_000))
+        out, err = vm.submit(request(lines)).result()
+        assert out == ''.join(f'{i}\n' for i in range(20_000))
+        assert err == ''
+        big = 'x' * (5 << 20)
+        assert vm.submit(request(f'PUSH_STR "{big}"\nPRINT\n')).result() == (
+            f'{big}\n',
+            '',
+        )
+        # Text that looks like the end of output is only part of it
+        marker = vm.connection.marker.decode()
+        assert vm.submit(request(f'PUSH_STR "{marker}!"\nPRINT\n')).result() == (
+            f'{marker}!\n',
+            '',
+        )
+    finally:
+        vm.close()
+
+
+def test_unframed_capture_limit() -> None:
+    command = [*standin_vm, '-unframed', '-text-only']
+    vm = VMProcess(command, max_capture=1000)
+    try:
+        out, _ = vm.submit(f'PUSH_STR "{"y" * 5000}"\nPRINT\n'.encode()).result()
+        assert out == 'y' * 1000 + '[4001 more bytes not captured]\n'
+        # The rest was read all the same
+        assert vm.submit(b'PUSH_INT 2\nPRINT\n').result() == ('2\n', '')
+    finally:
+        vm.close()
+
+
+def test_unframed_echo_and_errors() -> None:
+    vm = VMProcess([*standin_vm, '-unframed', '-text-only'])
+    echo = io.BytesIO(), io.BytesIO()
+    program = b'PUSH_STR "streamed"\nPRINT\n'
+    assert vm.submit(program, echo).result() == ('', '')
+    assert echo[0].getvalue() == b'streamed\n'
+
+    # The stand-in exits on errors, so stderr is read until it closes
+    out, err = vm.submit(b'PUSH_STR "a"\nNEGATE\n').result()
+    assert out == '' and 'TypeError' in err
+    assert not vm.alive()
+    with pytest.raises(VMError):
+        vm.submit(program).result()
+    vm.close()
+
+
+def test_framed_output_not_utf8() -> None:
+    # Answers every request with output that is not UTF-8
+    command = [
+        sys.executable,
+        '-c',
+        'import sys\n'
+        'from src.yolk.bytecode import read_frame, write_frame\n'
+        'from src.yolk.protocol import decode_request, encode_response\n'
+        'while (frame := read_frame(sys.stdin.buffer)) is not None:\n'
+        '    request_id, _ = decode_request(frame)\n'
+        '    response = encode_response(request_id, b"caf\\xe9\\n", b"")\n'
+        '    write_frame(sys.stdout.buffer, response)\n'
+        '    sys.stdout.flush()\n',
+    ]
+    connection = start_framed(command)
+    assert connection.submit(b'').result() == ('caf\ufffd\n', '')
+    assert connection.alive()
+    assert connection.submit(b'').result() == ('caf\ufffd\n', '')
+    connection.close()
+
+
+def test_unframed_output_without_newline() -> None:
+    # Knows one more instruction than PRINT, which leaves the line open
+    command = [
+        sys.executable,
+        '-c',
+        'import sys\n'
+        'for line in sys.stdin:\n'
+        '    op, _, operand = line.rstrip().partition(" ")\n'
+        '    if op == "PUSH_STR":\n'
+        '        value = operand[1:-1]\n'
+        '    elif op in ("PRINT", "WRITE"):\n'
+        '        end = "\\n" if op == "PRINT" else ""\n'
+        '        print(value, end=end, flush=True)\n',
+    ]
+    vm = VMProcess(command, VMCapabilities(VMFormat.text, False))
+    try:
+        program = b'PUSH_STR "no newline"\nWRITE\n'
+        assert vm.submit(program).result() == ('no newline', '')
+        assert vm.submit(program).result() == ('no newline', '')
+        assert vm.submit(b'PUSH_STR "a"\nPRINT\n').result() == ('a\n', '')
+    finally:
+        vm.close()
+
+
+@pytest.mark.parametrize(
+    'in_process, options', [(True, []), (False, []), (False, ['-unframed'])]
+)
+def test_stream_script(
+    in_process: bool,
+    options: List[str],
+    tmp_path: pathlib.Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    script = tmp_path / 'script.egg'
+    script.write_text(
+        ''.join(f'say {i} * 2\n' for i in range(300)) + '1 + 1\n\n"last"\n'
+    )
+    expected = ''.join(f'{i * 2}\n' for i in range(300)) + 'last\n'
+    for streaming in [False, True]:
+        mode = CLIMode(
+            ExecutionMode.execute,
+            yolk_command=standin_vm + options,
+            in_process=in_process,
+            streaming=streaming,
+        )
+        egg_cli = EggCLI(mode)
+        egg_cli.consume_script(str(script))
+        egg_cli.stop_vm()
+        assert capsys.readouterr() == (expected, '')
+
+
+@pytest.mark.parametrize(
+    'in_process, options', [(True, []), (False, []), (False, ['-unframed'])]
+)
+def test_stream_script_stops_at_error(
+    in_process: bool,
+    options: List[str],
+    tmp_path: pathlib.Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    script = tmp_path / 'script.egg'
+    script.write_text('say 1\n"a" - 1\nsay 2\n"last"\n')
+    outputs = []
+    for streaming in [False, True]:
+        mode = CLIMode(
+            ExecutionMode.execute,
+            yolk_command=standin_vm + options,
+            in_process=in_process,
+            streaming=streaming,
+        )
+        egg_cli = EggCLI(mode)
+        egg_cli.consume_script(str(script))
+        egg_cli.stop_vm()
+        outputs.append(capsys.readouterr())
+    whole, streamed = outputs
+    assert whole.out == streamed.out == '1\n'
+    assert whole.err and streamed.err
+
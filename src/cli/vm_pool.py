@@ -0,0 +1,153 @@
+import concurrent.futures
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Sequence, Tuple
+
+from ..yolk.bytecode import encode
+from ..yolk.ir import YolkProgram
+from .vm_channel import (
+    MAX_CAPTURE,
+    VMCapabilities,
+    VMError,
+    VMFormat,
+    VMProcess,
+    negotiate,
+)
+
+
+class VMWorker:
+    def __init__(
+        self,
+        command: Sequence[str],
+        capabilities: VMCapabilities,
+        max_capture: int = MAX_CAPTURE,
+    ):
+        self.vm = VMProcess(command, capabilities, max_capture)
+        self.requests = 0
+        # Who ran the programs whose values may be left on the VM's stack
+        self.client: object = None
+        self.idle_since = time.monotonic()
+
+
+class VMPool:
+    """Keeps VM processes started ahead of time and runs programs on them.
+
+    Programs wait in a queue for an idle worker, so at most size programs
+    run at once. A worker only runs the programs of one client, so that
+    none sees what another's left on the VM's stack, and is replaced when
+    another client would get it. A worker is also replaced after
+    max_requests programs, or when it is found dead, or when it has been
+    idle for check_after seconds and does not answer an empty program within
+    check_timeout. Workers are stopped rather than asked to exit, in case
+    they are stuck, and killed if they have not ended within check_timeout.
+    """
+
+    def __init__(
+        self,
+        command: Sequence[str],
+        size: int = 2,
+        max_requests: int = 1000,
+        check_after: float = 30,
+        check_timeout: float = 5,
+        max_capture: int = MAX_CAPTURE,
+    ):
+        if size < 1:
+            raise ValueError('a VM pool needs at least one worker')
+        self.command = list(command)
+        self.size = size
+        self.max_requests = max_requests
+        self.check_after = check_after
+        self.check_timeout = check_timeout
+        self.max_capture = max_capture
+        self.capabilities = negotiate(self.command)
+        self.started = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self.workers: List[VMWorker] = []
+        self.idle: queue.Queue[VMWorker] = queue.Queue()
+        for _ in range(size):
+            self.idle.put(self.start_worker())
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            size, thread_name_prefix='vm-pool'
+        )
+
+    def start_worker(self) -> VMWorker:
+        worker = VMWorker(self.command, self.capabilities, self.max_capture)
+        with self.lock:
+            self.workers.append(worker)
+            self.started += 1
+        return worker
+
+    def retire(self, worker: VMWorker) -> None:
+        with self.lock:
+            self.workers.remove(worker)
+        worker.vm.stop(self.check_timeout)
+
+    def healthy(self, worker: VMWorker) -> bool:
+        if not worker.vm.alive():
+            return False
+        idle = time.monotonic() - worker.idle_since
+        if not self.capabilities.framed or idle < self.check_after:
+            return True
+        if self.capabilities.vm_format == VMFormat.bytecode:
+            empty = encode(YolkProgram())
+        else:
+            empty = b''
+        try:
+            worker.vm.submit(empty).result(self.check_timeout)
+        except (VMError, concurrent.futures.TimeoutError):
+            return False
+        return True
+
+    def acquire(self, client: object) -> VMWorker:
+        worker = self.idle.get()
+        if not self.healthy(worker) or (
+            worker.requests and worker.client is not client
+        ):
+            self.retire(worker)
+            worker = self.start_worker()
+        worker.client = client
+        return worker
+
+    def release(self, worker: VMWorker) -> None:
+        worker.requests += 1
+        if worker.requests >= self.max_requests or not worker.vm.alive():
+            self.retire(worker)
+            worker = self.start_worker()
+        worker.idle_since = time.monotonic()
+        self.idle.put(worker)
+
+    def run(self, program: bytes, client: object = None) -> Tuple[str, str]:
+        """Runs a program on the next idle worker and waits for it.
+
+        Programs of the same client may share a worker, and with it the
+        VM's state. Those without a client all count as the same one.
+        """
+        worker = self.acquire(client)
+        try:
+            return worker.vm.submit(program).result()
+        finally:
+            self.release(worker)
+
+    def submit(
+        self, program: bytes, client: object = None
+    ) -> 'Future[Tuple[str, str]]':
+        if self.closed:
+            raise VMError('the VM pool is closed')
+        return self.executor.submit(self.run, program, client)
+
+    def close(self) -> None:
+        self.closed = True
+        self.executor.shutdown()
+        with self.lock:
+            workers, self.workers = self.workers, []
+        for worker in workers:
+            worker.vm.stop(self.check_timeout)
+
+    def __enter__(self) -> 'VMPool':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
@@ -0,0 +1,146 @@
+import pathlib
+import signal
+import sys
+import threading
+from typing import List
+
+import pytest
+
+from ..yolk.bytecode import encode
+from ..yolk.ir import YolkProgram
+from ..yolk.protocol import FRAMES_CAPABILITY
+from .cli import CLIMode, EggCLI, ExecutionMode
+from .vm_pool import VMPool, VMWorker
+
+standin_vm = [sys.executable, '-m', 'src.yolk.standin_vm']
+# Claims framed requests, then never answers one and ignores SIGTERM
+hung_vm = [
+    sys.executable,
+    '-c',
+    'import signal, sys, time\n'
+    'if "-capabilities" in sys.argv:\n'
+    f'    print({FRAMES_CAPABILITY!r})\n'
+    'else:\n'
+    '    signal.signal(signal.SIGTERM, signal.SIG_IGN)\n'
+    '    time.sleep(60)\n',
+]
+program = b'PUSH_INT 1\nPRINT\n'
+
+
+@pytest.fixture(autouse=True)
+def importable_standin(monkeypatch: pytest.MonkeyPatch) -> None:
+    # The stand-in runs as a module of this package
+    monkeypatch.setenv('PYTHONPATH', str(pathlib.Path(__file__).parents[2]))
+
+
+def test_runs_programs() -> None:
+    with VMPool([*standin_vm, '-text-only'], size=2) as pool:
+        assert pool.started == 2
+        assert pool.run(program) == ('1\n', '')
+        futures = [pool.submit(program) for _ in range(20)]
+        assert [f.result() for f in futures] == [('1\n', '')] * 20
+        assert pool.started == 2
+    assert pool.workers == []
+
+
+def test_bounded_concurrency(monkeypatch: pytest.MonkeyPatch) -> None:
+    command = [*standin_vm, '-text-only', '-delay', '0.3']
+    running: List[VMWorker] = []
+    most_running = 0
+    lock = threading.Lock()
+    with VMPool(command, size=2) as pool:
+        acquire, release = pool.acquire, pool.release
+
+        def counted_acquire(client: object) -> VMWorker:
+            nonlocal most_running
+            worker = acquire(client)
+            with lock:
+                running.append(worker)
+                most_running = max(most_running, len(running))
+            return worker
+
+        def counted_release(worker: VMWorker) -> None:
+            with lock:
+                running.remove(worker)
+            release(worker)
+
+        monkeypatch.setattr(pool, 'acquire', counted_acquire)
+        monkeypatch.setattr(pool, 'release', counted_release)
+        futures = [pool.submit(program) for _ in range(4)]
+        assert [f.result() for f in futures] == [('1\n', '')] * 4
+    # Each program takes a while, so two run at a time and never more
+    assert most_running == 2
+
+
+def test_recycles_workers() -> None:
+    with VMPool([*standin_vm, '-text-only'], size=1, max_requests=3) as pool:
+        first = pool.workers[0]
+        for _ in range(3):
+            assert pool.run(program) == ('1\n', '')
+        assert pool.started == 2
+        assert pool.workers[0] is not first
+        assert first.vm.proc.returncode is not None
+
+
+def test_replaces_unhealthy_workers() -> None:
+    with VMPool([*standin_vm, '-text-only'], size=1) as pool:
+        pool.workers[0].vm.proc.kill()
+        pool.workers[0].vm.proc.wait()
+        assert pool.run(program) == ('1\n', '')
+        assert pool.started == 2
+
+    # An idle worker is checked by sending it an empty program
+    with VMPool(standin_vm, size=1, check_after=0) as pool:
+        bytecode = encode(YolkProgram.from_text(program.decode('utf-8')))
+        assert pool.run(bytecode) == ('1\n', '')
+        assert pool.run(bytecode) == ('1\n', '')
+        assert pool.started == 1
+
+
+def test_stops_hung_workers() -> None:
+    with VMPool(hung_vm, size=1, check_after=0, check_timeout=0.2) as pool:
+        worker = pool.workers[0]
+        assert not pool.healthy(worker)
+        pool.retire(worker)
+        # It ignores SIGTERM, so it was killed
+        assert worker.vm.proc.returncode == -signal.SIGKILL
+        assert pool.workers == []
+        hung = pool.start_worker()
+    assert hung.vm.proc.returncode is not None
+
+
+def test_passes_on_max_capture() -> None:
+    command = [*standin_vm, '-text-only', '-unframed']
+    with VMPool(command, size=1, max_capture=4) as pool:
+        output, _ = pool.run(b'PUSH_STR "0123456789"\nPRINT\n')
+    assert output == '0123[7 more bytes not captured]\n'
+
+
+def test_shared_by_clis() -> None:
+    with VMPool([*standin_vm, '-text-only'], size=2) as pool:
+        egg_clis = [
+            EggCLI(CLIMode(ExecutionMode.execute), vm_pool=pool)
+            for _ in range(3)
+        ]
+        for i, egg_cli in enumerate(egg_clis):
+            assert egg_cli.execute(f'{i} + 1') == (f'{i + 1}\n', '')
+            egg_cli.stop_vm()
+        # The third client gets a new worker in place of the first's
+        assert pool.started == 3
+        assert pool.run(program) == ('1\n', '')
+
+
+def test_clients_do_not_share_state() -> None:
+    with VMPool([*standin_vm, '-text-only'], size=1) as pool:
+        first, second = [
+            EggCLI(CLIMode(ExecutionMode.execute), vm_pool=pool)
+            for _ in range(2)
+        ]
+        # Leaves 2 on the stack of the VM it ran on
+        assert first.execute('1 + 1\n"last"') == ('last\n', '')
+        assert second.execute('say "hi"') == ('hi\n', '')
+        assert pool.started == 2
+        # A client keeps to its own worker
+        assert second.execute('"again"') == ('again\n', '')
+        assert pool.started == 2
+
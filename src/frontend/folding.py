@@ -0,0 +1,254 @@
+import math
+import operator
+import typing
+from fractions import Fraction
+
+from lark import Tree
+from lark.lexer import Token
+from lark.tree import Meta
+
+from .iterative_transformer import IterativeTransformer
+
+Constant = bool | int | float | str
+
+# Integers are folded only when the result fits the VM's 64 bit integers, so
+# overflow behaves the same with and without folding
+INT_MIN = -(2**63)
+INT_MAX = 2**63 - 1
+
+UNIT_SCALES = {
+    'b': 1,
+    'kb': 10**3,
+    'mb': 10**6,
+    'gb': 10**9,
+    'tb': 10**12,
+    'pb': 10**15,
+    'kib': 2**10,
+    'mib': 2**20,
+    'gib': 2**30,
+    'tib': 2**40,
+    'pib': 2**50,
+    'ns': 1,
+    'us': 10**3,
+    'ms': 10**6,
+    'sec': 10**9,
+    'min': 60 * 10**9,
+    'hr': 3600 * 10**9,
+    'day': 86400 * 10**9,
+    'wk': 604800 * 10**9,
+}
+
+INT_OPERATIONS: typing.Dict[str, typing.Callable[[int, int], int]] = {
+    'addition': operator.add,
+    'subtraction': operator.sub,
+    'multiply': operator.mul,
+    'int_divide': operator.floordiv,
+    'modulus': operator.mod,
+    'raise_power': operator.pow,
+}
+
+FLOAT_OPERATIONS: typing.Dict[str, typing.Callable[[float, float], float]] = {
+    'addition': operator.add,
+    'subtraction': operator.sub,
+    'multiply': operator.mul,
+    'divide': operator.truediv,
+}
+
+BOOL_OPERATIONS: typing.Dict[str, typing.Callable[[bool, bool], bool]] = {
+    'and_expr': operator.and_,
+    'or_expr': operator.or_,
+}
+
+COMPARISONS: typing.Dict[
+    str, typing.Callable[[typing.Any, typing.Any], bool]
+] = {
+    'equal_to': operator.eq,
+    'not_equal_to': operator.ne,
+    'greater_than': operator.gt,
+    'greater_than_or_equal_to': operator.ge,
+    'less_than': operator.lt,
+    'less_than_or_equal_to': operator.le,
+}
+
+LITERAL_TYPES = {
+    'integer_literal': int,
+    'float_literal': float,
+    'string_literal': str,
+    'boolean_literal': bool,
+}
+
+
+def checked(value: Constant) -> Constant | None:
+    """Returns value if it can be written as a literal of its type."""
+    if type(value) is int and not INT_MIN <= value <= INT_MAX:
+        return None
+    if type(value) is float and (
+        not math.isfinite(value) or 'e' in repr(value)
+    ):
+        return None
+    return value
+
+
+def fold_binary(rule: str, a: Constant, b: Constant) -> Constant | None:
+    # Mixed types are left to the VM, as is dividing integers, since the
+    # type of the result is the VM's choice
+    if type(a) is not type(b):
+        return None
+    if type(a) is int and type(b) is int and rule in INT_OPERATIONS:
+        if rule in ('int_divide', 'modulus') and (a < 0 or b <= 0):
+            return None
+        if rule == 'raise_power' and (b < 0 or abs(a) > 1 and b >= 64):
+            return None
+        return checked(INT_OPERATIONS[rule](a, b))
+    if type(a) is float and type(b) is float and rule in FLOAT_OPERATIONS:
+        if rule == 'divide' and b == 0:
+            return None
+        return checked(FLOAT_OPERATIONS[rule](a, b))
+    if type(a) is bool and type(b) is bool and rule in BOOL_OPERATIONS:
+        return BOOL_OPERATIONS[rule](a, b)
+    if type(a) is str and type(b) is str and rule == 'concatenate':
+        # Escapes are left alone, in case joining them changes their meaning
+        if '\\' in a or '\\' in b:
+            return None
+        return a + b
+    return None
+
+
+def fold_unary(rule: str, a: Constant) -> Constant | None:
+    if rule == 'unary_negate' and type(a) in (int, float):
+        return checked(-typing.cast(int | float, a))
+    if rule == 'unary_not' and type(a) is bool:
+        return not a
+    return None
+
+
+def fold_comparison_chain(
+    values: typing.List[Constant], comparisons: typing.List[str]
+) -> bool | None:
+    kind = type(values[0])
+    if any(type(value) is not kind for value in values):
+        return None
+    if kind in (str, bool) and not all(
+        comparison in ('equal_to', 'not_equal_to')
+        for comparison in comparisons
+    ):
+        return None
+    return all(
+        COMPARISONS[comparison](a, b)
+        for a, comparison, b in zip(values, comparisons, values[1:])
+    )
+
+
+def fold_unit(value: str, unit: str) -> int | None:
+    """Converts a size to bytes or a duration to nanoseconds."""
+    scaled = Fraction(value) * UNIT_SCALES[unit]
+    if scaled.denominator != 1:
+        return None
+    result = checked(int(scaled))
+    assert result is None or type(result) is int
+    return result
+
+
+def literal_value(node: typing.Any) -> Constant | None:
+    if not isinstance(node, Tree) or node.data not in LITERAL_TYPES:
+        return None
+    (token,) = node.children
+    if node.data == 'boolean_literal':
+        return str(token) == 'true'
+    if node.data == 'string_literal':
+        return str(token)
+    value: Constant = LITERAL_TYPES[node.data](token)
+    return value
+
+
+def make_literal(value: Constant) -> Tree[Token]:
+    if type(value) is bool:
+        text = 'true' if value else 'false'
+        return Tree('boolean_literal', [Token(text.upper(), text)])
+    if type(value) is int:
+        return Tree('integer_literal', [Token('INTEGER', str(value))])
+    if type(value) is float:
+        return Tree('float_literal', [Token('FLOAT', repr(value))])
+    return Tree('string_literal', [Token('QUOTED_STRING', value)])
+
+
+class ConstantFolder(
+    IterativeTransformer[Token, Tree[Token | int | float | str]]
+):
+    """Replaces constant subexpressions of a lowered tree with literals.
+
+    Only operations whose result does not depend on choices left to the VM
+    are folded, such as integer arithmetic that stays in 64 bits, and unit
+    literals become integers of bytes or nanoseconds.
+    """
+
+    @staticmethod
+    def fold_binary_rule(
+        rule: str,
+    ) -> typing.Callable[[typing.List[typing.Any]], Tree[typing.Any]]:
+        @staticmethod   # type: ignore[misc]
+        def _inner(children: typing.List[typing.Any]) -> Tree[typing.Any]:
+            a, b = map(literal_value, children)
+            if a is not None and b is not None:
+                if (folded := fold_binary(rule, a, b)) is not None:
+                    return make_literal(folded)
+            return Tree(rule, children)
+
+        return _inner
+
+    @staticmethod
+    def fold_unary_rule(
+        rule: str,
+    ) -> typing.Callable[[typing.List[typing.Any]], Tree[typing.Any]]:
+        @staticmethod   # type: ignore[misc]
+        def _inner(children: typing.List[typing.Any]) -> Tree[typing.Any]:
+            (a,) = map(literal_value, children)
+            if a is not None and (folded := fold_unary(rule, a)) is not None:
+                return make_literal(folded)
+            return Tree(rule, children)
+
+        return _inner
+
+    addition = fold_binary_rule('addition')
+    subtraction = fold_binary_rule('subtraction')
+    multiply = fold_binary_rule('multiply')
+    divide = fold_binary_rule('divide')
+    int_divide = fold_binary_rule('int_divide')
+    modulus = fold_binary_rule('modulus')
+    raise_power = fold_binary_rule('raise_power')
+    concatenate = fold_binary_rule('concatenate')
+    and_expr = fold_binary_rule('and_expr')
+    or_expr = fold_binary_rule('or_expr')
+    unary_negate = fold_unary_rule('unary_negate')
+    unary_not = fold_unary_rule('unary_not')
+
+    @staticmethod
+    def comparison_chain(
+        children: typing.List[typing.Any],
+    ) -> Tree[typing.Any]:
+        values = [literal_value(child) for child in children[::2]]
+        if all(value is not None for value in values):
+            folded = fold_comparison_chain(
+                typing.cast(typing.List[Constant], values),
+                [child.data for child in children[1::2]],
+            )
+            if folded is not None:
+                return make_literal(folded)
+        return Tree('comparison_chain', children)
+
+    @staticmethod
+    def unit_literal(children: typing.List[typing.Any]) -> Tree[typing.Any]:
+        unit_type, unit, value = children
+        (unit_name,) = unit.children
+        folded = fold_unit(str(value), unit_name)
+        if folded is None:
+            return Tree('unit_literal', children)
+        return make_literal(folded)
+
+    @staticmethod
+    def __default__(
+        data: str,
+        children: typing.List[typing.Any],
+        meta: Meta,
+    ) -> Tree[typing.Any]:
+        return Tree(data, children, meta)
@@ -0,0 +1,79 @@
+from .folding import ConstantFolder, literal_value
+from .parser import get_parser
+
+parser = get_parser()
+
+
+def fold(src: str) -> str:
+    return ConstantFolder().transform(parser.parse(src)).pretty().strip()
+
+
+def folded_value(src: str) -> object:
+    return literal_value(ConstantFolder().transform(parser.parse(src)))
+
+
+def test_integer_arithmetic() -> None:
+    assert folded_value('1 + 2 * 3 - 4') == 3
+    assert folded_value('-(2 ** 10)') == -1024
+    assert folded_value('7 // 2 + 7 % 2') == 4
+
+
+def test_float_arithmetic() -> None:
+    assert folded_value('1.5 * 2.0 - 0.5') == 2.5
+    assert folded_value('1.0 / 4.0') == 0.25
+
+
+def test_booleans() -> None:
+    assert folded_value('not true or false') is False
+    assert folded_value('true and not false') is True
+
+
+def test_strings() -> None:
+    assert folded_value('"a" ++ "b" ++ "c"') == 'abc'
+
+
+def test_comparison_chains() -> None:
+    assert folded_value('1 < 2 <= 2 != 3') is True
+    assert folded_value('1 < 2 > 3') is False
+    assert folded_value('"a" == "a"') is True
+    # Ordering of strings is the VM's choice
+    assert folded_value('"a" < "b"') is None
+
+
+def test_units() -> None:
+    assert folded_value('10mb') == 10000000
+    assert folded_value('1kib') == 1024
+    assert folded_value('1.5sec') == 1500000000
+    assert folded_value('2min + 1ms') == 120001000000
+    # Fractions of a byte or nanosecond are left to the VM
+    assert folded_value('1.5b') is None
+
+
+def test_left_to_the_vm() -> None:
+    # Integer division, mixed types and xor depend on the VM's semantics
+    assert folded_value('1 / 2') is None
+    assert folded_value('1 + 2.0') is None
+    assert folded_value('true xor false') is None
+    # Floor division and modulus of negative numbers vary between languages
+    assert folded_value('-7 // 2') is None
+    assert folded_value('7 % -2') is None
+    assert folded_value('1 // 0') is None
+    assert folded_value('1.0 / 0.0') is None
+
+
+def test_int64_overflow() -> None:
+    assert folded_value('9223372036854775806 + 1') == 2**63 - 1
+    assert folded_value('9223372036854775807 + 1') is None
+    assert folded_value('2 ** 64') is None
+    assert folded_value('1 ** 100') == 1
+
+
+def test_partial_folding() -> None:
+    expected_ast = (
+        'addition'
+        '\n  divide'
+        '\n    integer_literal\t7'
+        '\n    integer_literal\t2'
+        '\n  float_literal\t0.5'
+    )
+    assert fold('(3 + 4) / 2 + 0.25 * 2.0') == expected_ast
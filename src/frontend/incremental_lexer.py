@@ -0,0 +1,142 @@
+import itertools
+from typing import Iterator, List, Optional, Tuple
+
+from .lexer import EggLexer, comment_node, start_node
+from .lexer_util import (
+    LexerCheckpoint,
+    LexerError,
+    LexerState,
+    Token,
+    make_token,
+)
+
+
+def split_lines(data: str) -> List[str]:
+    lines = data.split('\n')
+    return [line + '\n' for line in lines[:-1]] + [lines[-1]]
+
+
+class IncrementalLexer:
+    """Keeps the tokens of a source buffer up to date across edits.
+
+    Lexer state is checkpointed at the start of every line. An edit is
+    re-lexed from the checkpoint before it and stops as soon as the state at
+    a line boundary matches the one recorded before the edit.
+    """
+
+    def __init__(self, data: str = '') -> None:
+        self.lines: List[str] = ['']
+        self.line_tokens: List[List[Token]] = [[]]
+        self.checkpoints: List[LexerCheckpoint] = [
+            LexerState('', start_node, make_token).checkpoint()
+        ]
+        self.relexed_lines = 0
+        self.replace_lines(0, 1, split_lines(data))
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.lines)
+
+    def tokens(self) -> Iterator[Token]:
+        return itertools.chain.from_iterable(self.line_tokens)
+
+    def edit(
+        self,
+        start_line: int,
+        start_column: int,
+        end_line: int,
+        end_column: int,
+        text: str,
+    ) -> None:
+        """Replaces the text between two (line, column) positions."""
+        prefix = self.lines[start_line][:start_column]
+        suffix = self.lines[end_line][end_column:]
+        new_lines = split_lines(prefix + text + suffix)
+        if end_line + 1 < len(self.lines):
+            # The suffix kept the line's newline, so the split leaves an
+            # empty line that belongs to the next line instead
+            new_lines.pop()
+        self.replace_lines(start_line, end_line + 1, new_lines)
+
+    def replace_lines(
+        self, first: int, last: int, new_lines: List[str]
+    ) -> None:
+        """Replaces self.lines[first:last] with new_lines.
+
+        Every line but the last must end in a newline. If the new source
+        fails to lex, the LexerError propagates and nothing is changed.
+        """
+        delta = len(new_lines) - (last - first)
+        total = len(self.lines) + delta
+
+        def line_at(i: int) -> str:
+            if i < first:
+                return self.lines[i]
+            if i < first + len(new_lines):
+                return new_lines[i - first]
+            return self.lines[i - delta]
+
+        # The unquoted literal lookahead crosses blank lines, so the edit can
+        # change tokens back to the last line with something on it
+        start = first
+        while start > 0:
+            start -= 1
+            if line_at(start).strip():
+                break
+
+        checkpoint = self.checkpoints[start]
+        checkpoints: List[LexerCheckpoint] = []
+        tokens: List[List[Token]] = []
+        i = start
+        while True:
+            checkpoints.append(checkpoint)
+            line = line_at(i)
+            lookahead = ' #'
+            for j in range(i + 1, total):
+                if (next_line := line_at(j)).strip():
+                    lookahead = next_line
+                    break
+            try:
+                line_tokens, next_checkpoint = self.lex_line(
+                    checkpoint, line, lookahead if i + 1 < total else None
+                )
+            except LexerError as e:
+                e.position += sum(map(len, map(line_at, range(i))))
+                e.position -= len(checkpoint.pending)
+                raise
+            tokens.append(line_tokens)
+            i += 1
+            if i == total:
+                break
+            checkpoint = next_checkpoint
+            if (
+                i >= first + len(new_lines)
+                and checkpoint == self.checkpoints[i - delta]
+            ):
+                break
+
+        self.relexed_lines = i - start
+        self.lines[first:last] = new_lines
+        self.line_tokens[start : i - delta] = tokens
+        self.checkpoints[start : i - delta] = checkpoints
+
+    @staticmethod
+    def lex_line(
+        checkpoint: LexerCheckpoint, line: str, lookahead: Optional[str]
+    ) -> Tuple[List[Token], LexerCheckpoint]:
+        """Lexes one line, with lookahead set to None for the last line."""
+        if lookahead is None:
+            state = LexerState.from_checkpoint(
+                checkpoint, line + ' #', make_token
+            )
+            tokens = list(EggLexer.resume(state, state.data_length))
+            if state.state_node is not comment_node:
+                raise LexerError('Read unexpected char', state)
+        else:
+            state = LexerState.from_checkpoint(
+                checkpoint, line + lookahead, make_token
+            )
+            tokens = list(
+                EggLexer.resume(state, len(checkpoint.pending) + len(line))
+            )
+        return tokens, state.checkpoint()
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from .incremental_lexer import IncrementalLexer, split_lines
+from .lexer import EggLexer
+from .lexer_util import LexerError
+
+SOURCE = '''x := 5mb
+fn f(a) {
+  say "a
+b"
+
+  ret a.b
+}
+
+ls -l | wc
+echo `a "b c"`
+f(1,
+  2)
+'''
+
+
+def assert_matches_full_lex(incremental: IncrementalLexer) -> None:
+    assert list(incremental.tokens()) == list(
+        EggLexer().lex(incremental.text)
+    )
+
+
+def test_split_lines() -> None:
+    assert split_lines('') == ['']
+    assert split_lines('a\nb') == ['a\n', 'b']
+    assert split_lines('a\n') == ['a\n', '']
+
+
+def test_initial_tokens() -> None:
+    incremental = IncrementalLexer(SOURCE)
+    assert incremental.text == SOURCE
+    assert_matches_full_lex(incremental)
+
+
+@pytest.mark.parametrize(
+    'edit',
+    [
+        (0, 0, 0, 1, 'y'),
+        (0, 8, 0, 8, ' + 1'),
+        (2, 7, 2, 7, '"'),
+        (5, 9, 5, 9, '.c'),
+        (8, 0, 8, 0, '{\n'),
+        (10, 2, 11, 0, ''),
+        (1, 0, 6, 1, ''),
+        (12, 0, 12, 0, 'a\nb'),
+    ],
+)
+def test_edit(edit: tuple[int, int, int, int, str]) -> None:
+    incremental = IncrementalLexer(SOURCE)
+    incremental.edit(*edit)
+    assert_matches_full_lex(incremental)
+
+
+def test_edit_stops_when_state_matches() -> None:
+    incremental = IncrementalLexer('a := 1\n' * 1000)
+    incremental.edit(500, 5, 500, 6, '2')
+    assert incremental.relexed_lines == 2
+    assert_matches_full_lex(incremental)
+
+
+def test_failed_edit_leaves_lexer_unchanged() -> None:
+    incremental = IncrementalLexer(SOURCE)
+    tokens = list(incremental.tokens())
+    with pytest.raises(LexerError) as e:
+        incremental.edit(5, 2, 5, 2, '?')
+    with pytest.raises(LexerError) as expected:
+        list(EggLexer().lex(SOURCE.replace('  ret', '  ?ret')))
+    assert e.value.position == expected.value.position
+    assert incremental.text == SOURCE
+    assert list(incremental.tokens()) == tokens
+
+
+def test_random_edits() -> None:
+    rng = random.Random(0)
+    snippets = ['x', ' ', '\n', '"', '{', '}', '(', ')', '.', '# c', '5kb']
+    incremental = IncrementalLexer(SOURCE)
+    for _ in range(200):
+        line = rng.randrange(len(incremental.lines))
+        column = rng.randint(0, len(incremental.lines[line].rstrip('\n')))
+        try:
+            incremental.edit(line, column, line, column, rng.choice(snippets))
+        except LexerError:
+            continue
+        assert_matches_full_lex(incremental)
@@ -0,0 +1,39 @@
+from typing import Any, Iterator, List, Tuple, TypeVar
+
+from lark import Discard, Token, Transformer, Tree
+
+_Leaf_T = TypeVar('_Leaf_T')
+_Return_T = TypeVar('_Return_T')
+
+
+class IterativeTransformer(Transformer[_Leaf_T, _Return_T]):
+    """A lark Transformer that walks the tree with an explicit stack.
+
+    Callbacks run in the same order and see the same children as with lark's
+    recursive walk, but trees of any depth can be transformed without
+    reaching the recursion limit.
+    """
+
+    def _transform_tree(self, tree: Tree[_Leaf_T]) -> Any:
+        # Each entry holds a tree, an iterator over its remaining children
+        # and the results for the children visited so far
+        stack: List[Tuple[Tree[_Leaf_T], Iterator[Any], List[Any]]] = [
+            (tree, iter(tree.children), [])
+        ]
+        while True:
+            node, children, results = stack[-1]
+            for child in children:
+                if isinstance(child, Tree):
+                    stack.append((child, iter(child.children), []))
+                    break
+                if self.__visit_tokens__ and isinstance(child, Token):
+                    child = self._call_userfunc_token(child)   # type: ignore
+                if child is not Discard:
+                    results.append(child)
+            else:
+                stack.pop()
+                result = self._call_userfunc(node, results)   # type: ignore
+                if not stack:
+                    return result
+                if result is not Discard:
+                    stack[-1][2].append(result)
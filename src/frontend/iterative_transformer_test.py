@@ -0,0 +1,91 @@
+import ast
+import pathlib
+from typing import Any, List
+
+import pytest
+from lark import Discard, Token, Transformer, Tree
+from lark.exceptions import VisitError
+
+from .iterative_transformer import IterativeTransformer
+from .lowering import LoweringTransformer
+from .parser import get_parser
+
+here = pathlib.Path(__file__).parent
+
+
+def get_test_sources() -> List[str]:
+    sources = []
+    for test_file in ['parser_test.py', 'lowering_test.py']:
+        module = ast.parse((here / test_file).read_text('utf-8'))
+        for node in ast.walk(module):
+            if (
+                isinstance(node, ast.Assign)
+                and isinstance(node.targets[0], ast.Name)
+                and node.targets[0].id == 'src'
+                and isinstance(node.value, ast.Constant)
+                and isinstance(node.value.value, str)
+            ):
+                sources.append(node.value.value)
+    return sources
+
+
+class RecursiveLoweringTransformer(LoweringTransformer):
+    _transform_tree = Transformer._transform_tree
+
+
+def test_lowering_matches_recursive() -> None:
+    parser = get_parser(lowering=False)
+    sources = get_test_sources()
+    assert len(sources) > 50
+    for src in sources:
+        tree = parser.parse(src)
+        expected = RecursiveLoweringTransformer().transform(tree)
+        assert LoweringTransformer().transform(tree) == expected, src
+
+
+class Summer(IterativeTransformer[Token, Any]):
+    @staticmethod
+    def add(children: List[Any]) -> Any:
+        return sum(children)
+
+    @staticmethod
+    def skip(_children: List[Any]) -> Any:
+        return Discard
+
+    @staticmethod
+    def NUMBER(token: Token) -> Any:
+        return int(token)
+
+
+def test_tokens_and_discard() -> None:
+    tree: Tree[Token] = Tree(
+        'add',
+        [
+            Token('NUMBER', '1'),
+            Tree('skip', [Token('NUMBER', '5')]),
+            Tree('add', [Token('NUMBER', '2'), Token('NUMBER', '3')]),
+        ],
+    )
+    assert Summer().transform(tree) == 6
+    untouched: Tree[Token] = Tree('other', [Token('NUMBER', '1')])
+    assert Summer(visit_tokens=False).transform(untouched) == untouched
+    assert Summer().transform(Tree('skip', [])) is None
+
+
+def test_deep_tree() -> None:
+    depth = 100000
+    a, b = Token('NAME', 'a'), Token('NAME', 'b')
+    tree: Tree[Token] = Tree('integer_literal', [Token('INTEGER', '1')])
+    for _ in range(depth):
+        tree = Tree('addition', [tree, Tree('pipe_assign', [a, b])])
+    # A callback can be where the limit is hit, which lark wraps
+    with pytest.raises((RecursionError, VisitError)):
+        RecursiveLoweringTransformer().transform(tree)
+    lowered = LoweringTransformer().transform(tree)
+    for _ in range(depth):
+        assert isinstance(lowered, Tree) and lowered.data == 'addition'
+        assert lowered.children[1] == Tree(
+            'reassign', [a, Tree('pipeline', [a, b])]
+        )
+        lowered = lowered.children[0]
+    assert lowered == Tree('integer_literal', [Token('INTEGER', '1')])
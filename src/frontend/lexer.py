@@ -1,4 +1,4 @@
-from typing import Iterator, Optional, Tuple
+from typing import Any, Iterator, Optional, Tuple
 
 import lark.lexer
 
@@ -8,14 +8,28 @@ from .lexer_constants import (
     all_operators_trie,
     non_arithmetic_ps_trie,
 )
-from .lexer_util import DFANode, LexerError, LexerState, Token
+from .lexer_util import (
+    SENTINEL,
+    DFANode,
+    LarkTokenFactory,
+    LexerError,
+    LexerState,
+    Token,
+    TokenFactory,
+    TokenT,
+    make_token,
+    shift_positions,
+    tail_start,
+)
 
 
 class StartNode(DFANode):
-    def step(self, c: str, state: LexerState) -> Iterator[Token]:
+    in_token = False
+
+    def step(self, c: str, state: LexerState[TokenT]) -> Iterator[TokenT]:
         if c == '\n':
             if state.paren_depth == 0:
-                yield Token('SEMICOLON', '')
+                yield state.make_token('SEMICOLON', '', state.head)
             state.clear_prev()
         elif c.isspace():
             pass
@@ -24,36 +38,44 @@ class StartNode(DFANode):
             and (match := match_operator(state)) is not None
         ):
             state.token_start = state.head
-            state.goto_node(OperatorsNode(match[0], match[1]), step_back=True)
+            state.operator_pattern, state.operator = match
+            state.goto_node(operators_node, step_back=True)
         elif c.isdigit() or (c == '-' and state.next_char().isdigit()):
             state.token_start = state.head
-            state.goto_node(NumberNode(), step_back=True)
+            state.has_decimal = False
+            state.first_char = True
+            state.goto_node(number_node, step_back=True)
         elif c.isalpha() or c in './*+-%_':
             state.token_start = state.head
             state.goto_node(
-                UnquotedLiteral()
+                unquoted_literal_node
                 if not state.in_block()
-                else IdentifierNode(),
+                else identifier_node,
                 step_back=True,
             )
         elif c == '#':
             state.token_start = state.head
-            state.goto_node(CommentNode(), step_back=False)
+            state.goto_node(comment_node, step_back=False)
         elif c == '@':
             state.token_start = state.head + 1
-            state.goto_node(IdentifierNode(), step_back=False)
+            state.goto_node(identifier_node, step_back=False)
         elif c in ('"', "'"):
             state.token_start = state.head + 1
-            state.goto_node(QuotedLiteralNode(c), step_back=False)
+            state.quote_type = c
+            state.escaped = False
+            state.goto_node(quoted_literal_node, step_back=False)
         elif c == '`':
             state.token_start = state.head + 1
-            state.goto_node(QuotedArgListNode(), step_back=False)
+            state.quote_type = None
+            state.escaped = False
+            state.quoted = False
+            state.goto_node(quoted_arg_list_node, step_back=False)
         else:
             raise LexerError('Read unimplemented char', state)
         yield from ()
 
 
-def match_operator(state: LexerState) -> Optional[Tuple[str, str]]:
+def match_operator(state: LexerState[Any]) -> Optional[Tuple[str, str]]:
     allow_arithmetic = state.in_block() or state.get_prev() != 'EXEC_ARG'
     trie = all_operators_trie if allow_arithmetic else non_arithmetic_ps_trie
     if (match := trie.largest_prefix(state.data, state.head)) is not None:
@@ -62,38 +84,39 @@ def match_operator(state: LexerState) -> Optional[Tuple[str, str]]:
 
 
 class OperatorsNode(DFANode):
-    def __init__(self, pattern: str, operator: str):
-        self.pattern = pattern
-        self.operator = operator
+    token_fields = ('operator_pattern', 'operator')
 
-    def step(self, _: str, state: LexerState) -> Iterator[Token]:
-        state.step_forward(len(self.pattern) - 1)
-        if self.operator == 'CURLY_OPEN':
+    def step(self, _: str, state: LexerState[TokenT]) -> Iterator[TokenT]:
+        operator = state.operator
+        state.step_forward(len(state.operator_pattern) - 1)
+        if operator == 'CURLY_OPEN':
             state.curly_depth += 1
-        elif self.operator == 'CURLY_CLOSE':
+        elif operator == 'CURLY_CLOSE':
             state.curly_depth -= 1
-        elif self.operator == 'PAREN_OPEN':
+        elif operator == 'PAREN_OPEN':
             state.paren_depth += 1
-        elif self.operator == 'PAREN_CLOSE':
+        elif operator == 'PAREN_CLOSE':
             state.paren_depth -= 1
-        elif self.operator == 'SQUARE_OPEN':
+        elif operator == 'SQUARE_OPEN':
             state.square_depth += 1
-        elif self.operator == 'SQUARE_CLOSE':
+        elif operator == 'SQUARE_CLOSE':
             state.square_depth -= 1
-        yield state.get_token(self.operator, inclusive=True)
-        state.goto_node(StartNode(), step_back=False)
+        yield state.get_token(operator, inclusive=True)
+        state.goto_node(start_node, step_back=False)
 
 
 class CommentNode(DFANode):
-    def step(self, c: str, state: LexerState) -> Iterator[Token]:
+    in_token = False
+
+    def step(self, c: str, state: LexerState[TokenT]) -> Iterator[TokenT]:
         if c == '\n':
             if state.paren_depth == 0:
-                yield Token('SEMICOLON', '')
-            state.goto_node(StartNode())
+                yield state.make_token('SEMICOLON', '', state.head)
+            state.goto_node(start_node)
 
 
 class IdentifierNode(DFANode):
-    def step(self, c: str, state: LexerState) -> Iterator[Token]:
+    def step(self, c: str, state: LexerState[TokenT]) -> Iterator[TokenT]:
         if c == '.' and state.next_char() != '.':
             if state.token_start == state.head:
                 raise LexerError('Identifier is empty', state)
@@ -105,12 +128,12 @@ class IdentifierNode(DFANode):
             if state.token_start == state.head:
                 raise LexerError('Identifier is empty', state)
             yield self.get_token(state)
-            state.goto_node(StartNode(), step_back=True)
+            state.goto_node(start_node, step_back=True)
         elif c in '@':
             raise LexerError('Read unexpected char', state)
 
     @staticmethod
-    def get_token(state: LexerState) -> Token:
+    def get_token(state: LexerState[TokenT]) -> TokenT:
         src = state.get_token_source(inclusive=False)
         if src == '_':
             token_type = 'IMPLICIT_LAMBDA_PARAM'
@@ -122,46 +145,41 @@ class IdentifierNode(DFANode):
 
 
 class QuotedLiteralNode(DFANode):
-    def __init__(self, quote_type: str):
-        self.quote_type = quote_type
-        self.escaped = False
-
-    def step(self, c: str, state: LexerState) -> Iterator[Token]:
-        if self.escaped or c == '\\':
-            self.escaped = not self.escaped
-        elif c == self.quote_type:
+    token_fields = ('quote_type', 'escaped')
+
+    def step(self, c: str, state: LexerState[TokenT]) -> Iterator[TokenT]:
+        if state.escaped or c == '\\':
+            state.escaped = not state.escaped
+        elif c == state.quote_type:
             if state.get_prev() == 'EXEC_ARG':
                 yield state.get_token('EXEC_ARG', inclusive=False)
             else:
                 yield state.get_token('QUOTED_STRING', inclusive=False)
-            state.goto_node(StartNode(), step_back=False)
+            state.goto_node(start_node, step_back=False)
 
 
 class QuotedArgListNode(DFANode):
-    def __init__(self) -> None:
-        self.escaped = False
-        self.quoted = False
-        self.quote_type: Optional[str] = None
+    token_fields = ('quote_type', 'escaped', 'quoted')
 
-    def step(self, c: str, state: LexerState) -> Iterator[Token]:
-        if self.escaped or c == '\\':
-            self.escaped = not self.escaped
+    def step(self, c: str, state: LexerState[TokenT]) -> Iterator[TokenT]:
+        if state.escaped or c == '\\':
+            state.escaped = not state.escaped
         elif c in ["'", '"']:
-            if not self.quoted:
-                self.quoted = True
-                self.quote_type = c
+            if not state.quoted:
+                state.quoted = True
+                state.quote_type = c
                 state.token_start = state.head + 1
-            elif c == self.quote_type:
-                self.quoted = False
-                self.quote_type = None
+            elif c == state.quote_type:
+                state.quoted = False
+                state.quote_type = None
                 yield state.get_token('EXEC_ARG', inclusive=False)
                 state.token_start = state.head + 1
-        elif self.quoted:
+        elif state.quoted:
             pass
         elif c == '|':
             if state.head != state.token_start:
                 yield state.get_token('EXEC_ARG', inclusive=False)
-            yield Token('PIPE', '|')
+            yield state.make_token('PIPE', '|', state.head)
             state.token_start = state.head + 1
         elif c.isspace():
             if state.head != state.token_start:
@@ -170,7 +188,7 @@ class QuotedArgListNode(DFANode):
         elif c == '`':
             if state.head != state.token_start:
                 yield state.get_token('EXEC_ARG', inclusive=False)
-            state.goto_node(StartNode(), step_back=False)
+            state.goto_node(start_node, step_back=False)
 
 
 tokens_before_names = {
@@ -202,7 +220,7 @@ tokens_before_names = {
 
 
 class UnquotedLiteral(DFANode):
-    def step(self, c: str, state: LexerState) -> Iterator[Token]:
+    def step(self, c: str, state: LexerState[TokenT]) -> Iterator[TokenT]:
         space = False
         if c.isspace() and c != '\n':
             c = state.next_nonwhitespace()
@@ -218,23 +236,30 @@ class UnquotedLiteral(DFANode):
         ):
             if len(source) != 0:
                 yield state.get_token(predicted_token_type, source=source)
-            yield state.get_token('DOT', source='.')
-            state.goto_node(StartNode(), step_back=False)
+            yield state.get_token('DOT', source='.', start=state.head)
+            state.goto_node(start_node, step_back=False)
         elif c in '(:=':
             if source in KEYWORDS:
                 yield state.get_token(predicted_token_type, source=source)
             else:
+                start = state.token_start
                 for i, name_part in enumerate(name_parts := source.split('.')):
                     if len(name_part) != 0:
                         if name_part == '_':
                             yield state.get_token(
-                                'IMPLICIT_LAMBDA_PARAM', source=name_part
+                                'IMPLICIT_LAMBDA_PARAM',
+                                source=name_part,
+                                start=start,
                             )
                         else:
-                            yield state.get_token('NAME', source=name_part)
+                            yield state.get_token(
+                                'NAME', source=name_part, start=start
+                            )
+                    start += len(name_part)
                     if i + 1 < len(name_parts):
-                        yield state.get_token('DOT', source='.')
-            state.goto_node(StartNode(), step_back=True)
+                        yield state.get_token('DOT', source='.', start=start)
+                        start += 1
+            state.goto_node(start_node, step_back=True)
         elif (
             space
             or c in '<>{}[])|;,\n'
@@ -244,14 +269,14 @@ class UnquotedLiteral(DFANode):
             yield state.get_token(predicted_token_type, source=source)
             if c == '\n' and state.paren_depth == 0:
 
-                yield Token('SEMICOLON', '')
-            state.goto_node(StartNode(), step_back=True)
+                yield state.make_token('SEMICOLON', '', state.head)
+            state.goto_node(start_node, step_back=True)
         elif c in '@':
             raise LexerError(
                 'Read unexpected char from unquoted esxpression', state
             )
 
-    def get_token_type(self, source: str, state: LexerState) -> str:
+    def get_token_type(self, source: str, state: LexerState[Any]) -> str:
         if state.get_prev() == 'EXEC_ARG':
             return 'EXEC_ARG'
         if source in KEYWORDS:
@@ -264,21 +289,19 @@ class UnquotedLiteral(DFANode):
 
 
 class NumberNode(DFANode):
-    def __init__(self) -> None:
-        self.has_decimal = False
-        self.first_char = True
+    token_fields = ('has_decimal', 'first_char')
 
-    def step(self, c: str, state: LexerState) -> Iterator[Token]:
+    def step(self, c: str, state: LexerState[TokenT]) -> Iterator[TokenT]:
         if c == '.':
             if state.next_char() == '.':
                 token_type = self.get_token_type(state)
                 yield state.get_token(token_type, inclusive=False)
-                state.goto_node(StartNode(), step_back=True)
-            elif self.has_decimal:
+                state.goto_node(start_node, step_back=True)
+            elif state.has_decimal:
                 raise LexerError('Read unexpected char', state)
             else:
-                self.has_decimal = True
-        elif not (c.isdigit() or self.first_char and c == '-'):
+                state.has_decimal = True
+        elif not (c.isdigit() or state.first_char and c == '-'):
             token_type = self.get_token_type(state)
             if (
                 token_type != 'EXEC_ARG'
@@ -286,14 +309,16 @@ class NumberNode(DFANode):
             ):
                 token_type = f'UNIT_{token_type}'
                 source = state.get_token_source(inclusive=False)
-                yield Token(token_type, f'{source}:{unit}')
+                yield state.make_token(
+                    token_type, f'{source}:{unit}', state.token_start
+                )
                 state.head += len(unit)
             else:
                 yield state.get_token(token_type, inclusive=False)
-            state.goto_node(StartNode(), step_back=True)
-        self.first_char = False
+            state.goto_node(start_node, step_back=True)
+        state.first_char = False
 
-    def get_units(self, c: str, state: LexerState) -> Optional[str]:
+    def get_units(self, c: str, state: LexerState[Any]) -> Optional[str]:
         if not c.isalpha():
             return None
         unit = c.lower()
@@ -306,30 +331,69 @@ class NumberNode(DFANode):
             raise LexerError(f'Number literal has unknown unit: {unit}', state)
         return unit
 
-    def get_token_type(self, state: LexerState) -> str:
+    def get_token_type(self, state: LexerState[Any]) -> str:
         if state.get_prev() == 'EXEC_ARG':
             return 'EXEC_ARG'
-        return 'FLOAT' if self.has_decimal else 'INTEGER'
+        return 'FLOAT' if state.has_decimal else 'INTEGER'
+
+
+start_node = StartNode()
+operators_node = OperatorsNode()
+comment_node = CommentNode()
+identifier_node = IdentifierNode()
+quoted_literal_node = QuotedLiteralNode()
+quoted_arg_list_node = QuotedArgListNode()
+unquoted_literal_node = UnquotedLiteral()
+number_node = NumberNode()
 
 
 class EggLexer:
     def __init__(self) -> None:
-        self.lexer_state: Optional[LexerState] = None
+        self.lexer_state: Optional[LexerState[Any]] = None
 
     def lex(self, data: str) -> Iterator[Token]:
-        self.lexer_state = LexerState(data + ' #', StartNode)
-        while self.lexer_state.has_data():
-            for token in self.step():
+        return self.lex_with(data, make_token)
+
+    def lex_lark(self, data: str) -> Iterator[lark.lexer.Token]:
+        return self.lex_with(data, LarkTokenFactory(data))
+
+    def lex_with(
+        self, data: str, token_factory: TokenFactory[TokenT]
+    ) -> Iterator[TokenT]:
+        lexer_state = LexerState(data, start_node, token_factory)
+        self.lexer_state = lexer_state
+        yield from self.resume(lexer_state, tail_start(data))
+
+        checkpoint = lexer_state.checkpoint()
+        offset = lexer_state.head - len(checkpoint.pending)
+        lexer_state = LexerState.from_checkpoint(
+            checkpoint,
+            data[lexer_state.head :] + SENTINEL,
+            shift_positions(token_factory, offset),
+        )
+        self.lexer_state = lexer_state
+        try:
+            while lexer_state.has_data():
+                for token in self.step(lexer_state):
+                    yield token
+            if lexer_state.state_node is not comment_node:
+                raise LexerError('Read unexpected char', lexer_state)
+        except LexerError as e:
+            e.position += offset
+            raise
+
+    @staticmethod
+    def resume(lexer_state: LexerState[TokenT], stop: int) -> Iterator[TokenT]:
+        while lexer_state.head < stop:
+            for token in EggLexer.step(lexer_state):
                 yield token
-        if self.lexer_state.state_node.__class__ != CommentNode:
-            raise LexerError('Read unexpected char', self.lexer_state)
 
-    def step(self) -> Iterator[Token]:
-        assert self.lexer_state is not None
-        atom = self.lexer_state.read()
-        for token in self.lexer_state.state_node.step(atom, self.lexer_state):
+    @staticmethod
+    def step(lexer_state: LexerState[TokenT]) -> Iterator[TokenT]:
+        atom = lexer_state.read()
+        for token in lexer_state.state_node.step(atom, lexer_state):
             yield token
-        self.lexer_state.head += 1
+        lexer_state.head += 1
 
     def reset(self) -> None:
         self.lexer_state = None
@@ -342,5 +406,4 @@ class EggLexerLark(lark.lexer.Lexer):
     def lex(  # type: ignore[override]
         self, egg_code: str
     ) -> Iterator[lark.lexer.Token]:
-        for token in self.lexer.lex(egg_code):
-            yield token.to_lark()
+        return self.lexer.lex_lark(egg_code)
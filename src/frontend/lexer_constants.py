@@ -1,6 +1,6 @@
 import typing
 
-from .mm_trie import MaxMunchTrie
+from .mm_trie import CompiledMaxMunchTrie
 
 
 def _make_max_munch_safe(d: typing.Dict[str, str]) -> typing.Dict[str, str]:
@@ -50,19 +50,19 @@ NON_ARITHMETIC_OPERATORS = {
     '!': 'NOT',
     '~': 'ASYNC',
 }
-non_arithmetic_ps_trie = MaxMunchTrie(NON_ARITHMETIC_OPERATORS)
+non_arithmetic_ps_trie = CompiledMaxMunchTrie(NON_ARITHMETIC_OPERATORS)
 
-all_operators_trie = MaxMunchTrie(
-    {
-        **NON_ARITHMETIC_OPERATORS,
-        '**': 'POWER',
-        '//': 'INT_DIV',
-        '*': 'TIMES',
-        '/': 'DIVIDE',
-        '+': 'PLUS',
-        '-': 'MINUS',
-        '%': 'MOD',
-    }
+ARITHMETIC_OPERATORS = {
+    '**': 'POWER',
+    '//': 'INT_DIV',
+    '*': 'TIMES',
+    '/': 'DIVIDE',
+    '+': 'PLUS',
+    '-': 'MINUS',
+    '%': 'MOD',
+}
+all_operators_trie = CompiledMaxMunchTrie(
+    {**NON_ARITHMETIC_OPERATORS, **ARITHMETIC_OPERATORS}
 )
 
 KEYWORDS = _make_max_munch_safe(
@@ -123,3 +123,25 @@ UNITS = _make_max_munch_safe(
         'wk': 'time',
     }
 )
+
+# Every token type the lexers emit, in a fixed order so they can be stored
+# as small integer ids.
+TOKEN_TYPES = tuple(
+    sorted(
+        {
+            *NON_ARITHMETIC_OPERATORS.values(),
+            *ARITHMETIC_OPERATORS.values(),
+            *KEYWORDS.values(),
+            'DOT',
+            'EXEC_ARG',
+            'FLOAT',
+            'IMPLICIT_LAMBDA_PARAM',
+            'INTEGER',
+            'NAME',
+            'QUOTED_STRING',
+            'UNIT_FLOAT',
+            'UNIT_INTEGER',
+        }
+    )
+)
+TOKEN_TYPE_IDS = {token_type: i for i, token_type in enumerate(TOKEN_TYPES)}
@@ -1,5 +1,15 @@
 import abc
-from typing import Callable, Iterator, NamedTuple, Optional
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 import lark.lexer
 
@@ -15,8 +25,97 @@ class Token(NamedTuple):
         return f"<{self.token_type}: '{self.source}'>"
 
 
+TokenT = TypeVar('TokenT')
+
+# Builds a token from its type, source text and start offset in the data.
+TokenFactory = Callable[[str, str, int], TokenT]
+
+
+def make_token(token_type: str, source: str, _start: int) -> Token:
+    return Token(token_type, source)
+
+
+class ShiftedFactory(Generic[TokenT]):
+    """Builds tokens with a token factory, as if the data started earlier.
+
+    A class rather than a closure so that lexer states, and the errors that
+    carry them, can be pickled back from worker processes.
+    """
+
+    def __init__(self, token_factory: TokenFactory[TokenT], offset: int):
+        self.token_factory = token_factory
+        self.offset = offset
+
+    def __call__(self, token_type: str, source: str, start: int) -> TokenT:
+        return self.token_factory(token_type, source, start + self.offset)
+
+
+def shift_positions(
+    token_factory: TokenFactory[TokenT], offset: int
+) -> TokenFactory[TokenT]:
+    if not offset:
+        return token_factory
+    return ShiftedFactory(token_factory, offset)
+
+
+# Appended to the data so that the final token ends and the lexer finishes
+# in a comment, without special casing the end of the data.
+SENTINEL = ' #'
+
+
+def tail_start(data: str) -> int:
+    """Start of the last line with anything but whitespace on it.
+
+    Lexing up to here never reads past the end of the data, so only the tail
+    after it has to be copied to append the SENTINEL.
+    """
+    end = len(data)
+    while end > 0 and data[end - 1].isspace():
+        end -= 1
+    return data.rfind('\n', 0, end) + 1
+
+
+class LarkTokenFactory:
+    """Builds lark tokens directly, with start_pos, line and column set.
+
+    Lines are counted incrementally between consecutive tokens, so building
+    a token stream costs a single pass over the data.
+    """
+
+    def __init__(self, data: str):
+        self.data = data
+        self.line = 1
+        self.line_start = 0
+        self.counted_to = 0
+
+    def __call__(
+        self, token_type: str, source: str, start: int
+    ) -> lark.lexer.Token:
+        if start < self.counted_to:
+            self.line, self.line_start, self.counted_to = 1, 0, 0
+        if (newlines := self.data.count('\n', self.counted_to, start)) != 0:
+            self.line += newlines
+            self.line_start = self.data.rfind('\n', 0, start) + 1
+        self.counted_to = start
+        return lark.lexer.Token(
+            token_type, source, start, self.line, start - self.line_start + 1
+        )
+
+
+class LexerCheckpoint(NamedTuple):
+    state_node: 'DFANode'
+    prev_token_type: Optional[str]
+    curly_depth: int
+    paren_depth: int
+    square_depth: int
+    # Values of the state_node's token_fields
+    token_fields: Tuple[Any, ...]
+    # Source of the token in progress, if the checkpoint lands inside one
+    pending: str
+
+
 class LexerError(Exception):
-    def __init__(self, problem: str, lexer_state: 'LexerState'):
+    def __init__(self, problem: str, lexer_state: 'LexerState[Any]'):
         self.problem = problem
         self.position = lexer_state.head
         self.head = lexer_state.read() if lexer_state.has_data() else 'EOF'
@@ -30,17 +129,88 @@ class LexerError(Exception):
         )
 
 
-class LexerState:
-    def __init__(self, data: str, start_node_type: Callable[[], 'DFANode']):
+class LexerState(Generic[TokenT]):
+    # DFA nodes are stateless singletons, so everything a node needs to
+    # remember about the token in progress lives here.
+    __slots__ = (
+        'data',
+        'data_length',
+        'token_start',
+        'head',
+        'state_node',
+        'prev_token_type',
+        'curly_depth',
+        'paren_depth',
+        'square_depth',
+        'operator_pattern',
+        'operator',
+        'quote_type',
+        'escaped',
+        'quoted',
+        'has_decimal',
+        'first_char',
+        'token_factory',
+    )
+
+    def __init__(
+        self,
+        data: str,
+        start_node: 'DFANode',
+        token_factory: TokenFactory[TokenT],
+    ):
         self.data = data
         self.data_length = len(data)
         self.token_start = 0
         self.head = 0
-        self.state_node: DFANode = start_node_type()
+        self.state_node = start_node
         self.prev_token_type: Optional[str] = None
         self.curly_depth = 0
         self.paren_depth = 0
         self.square_depth = 0
+        # OperatorsNode
+        self.operator_pattern = ''
+        self.operator = ''
+        # QuotedLiteralNode and QuotedArgListNode
+        self.quote_type: Optional[str] = None
+        self.escaped = False
+        self.quoted = False
+        # NumberNode
+        self.has_decimal = False
+        self.first_char = False
+        self.token_factory = token_factory
+
+    @classmethod
+    def from_checkpoint(
+        cls: Type['LexerState[TokenT]'],
+        checkpoint: LexerCheckpoint,
+        data: str,
+        token_factory: TokenFactory[TokenT],
+    ) -> 'LexerState[TokenT]':
+        state = cls(
+            checkpoint.pending + data, checkpoint.state_node, token_factory
+        )
+        state.head = len(checkpoint.pending)
+        state.prev_token_type = checkpoint.prev_token_type
+        state.curly_depth = checkpoint.curly_depth
+        state.paren_depth = checkpoint.paren_depth
+        state.square_depth = checkpoint.square_depth
+        for field, value in zip(
+            checkpoint.state_node.token_fields, checkpoint.token_fields
+        ):
+            setattr(state, field, value)
+        return state
+
+    def checkpoint(self) -> LexerCheckpoint:
+        node = self.state_node
+        return LexerCheckpoint(
+            node,
+            self.prev_token_type,
+            self.curly_depth,
+            self.paren_depth,
+            self.square_depth,
+            tuple(getattr(self, field) for field in node.token_fields),
+            self.data[self.token_start : self.head] if node.in_token else '',
+        )
 
     def has_data(self) -> bool:
         return self.head < self.data_length
@@ -62,11 +232,17 @@ class LexerState:
         end: Optional[int] = None,
         inclusive: bool = True,
         source: Optional[str] = None,
-    ) -> Token:
+        start: Optional[int] = None,
+    ) -> TokenT:
         if source is None:
             source = self.get_token_source(end, inclusive)
+        if start is None:
+            start = self.token_start
         self.prev_token_type = token_type
-        return Token(token_type, source)
+        return self.token_factory(token_type, source, start)
+
+    def make_token(self, token_type: str, source: str, start: int) -> TokenT:
+        return self.token_factory(token_type, source, start)
 
     def goto_node(self, state: 'DFANode', step_back: bool = False) -> None:
         self.state_node = state
@@ -104,9 +280,14 @@ class LexerState:
 
 
 class DFANode(abc.ABC):
+    # LexerState fields the node keeps between characters
+    token_fields: Tuple[str, ...] = ()
+    # Whether the node is building a token that begins at token_start
+    in_token = True
+
     def __str__(self) -> str:
-        return f'<{self.__class__.__name__}:  {self.__dict__}>'
+        return f'<{self.__class__.__name__}>'
 
     @abc.abstractmethod
-    def step(self, c: str, state: LexerState) -> Iterator[Token]:
+    def step(self, c: str, state: LexerState[TokenT]) -> Iterator[TokenT]:
         ...
@@ -0,0 +1,110 @@
+from typing import List, Optional, Tuple
+
+import lark
+import pytest
+
+from .lexer import EggLexer
+from .lexer_util import LarkTokenFactory, LexerError, tail_start
+from .parser import get_parser
+from .table_lexer import TableEggLexer
+
+LarkTokenInfo = Tuple[str, str, Optional[int], Optional[int], Optional[int]]
+
+
+def get_lark_tokens(
+    lexer: EggLexer | TableEggLexer, src: str
+) -> List[LarkTokenInfo]:
+    return [
+        (token.type, token.value, token.start_pos, token.line, token.column)
+        for token in lexer.lex_lark(src)
+    ]
+
+
+def test_lark_token_factory() -> None:
+    data = 'ab\ncd\n\nef'
+    factory = LarkTokenFactory(data)
+    tokens = [
+        factory('NAME', 'ab', 0),
+        factory('NAME', 'cd', 3),
+        factory('NAME', 'ef', 7),
+        factory('NAME', 'd', 4),
+    ]
+    assert [(t.start_pos, t.line, t.column) for t in tokens] == [
+        (0, 1, 1),
+        (3, 2, 1),
+        (7, 4, 1),
+        (4, 2, 2),
+    ]
+    assert all(isinstance(t, lark.lexer.Token) for t in tokens)
+
+
+@pytest.mark.parametrize('lexer_type', [EggLexer, TableEggLexer])
+def test_lex_lark_positions(lexer_type: type) -> None:
+    src = 'x := 5mb\nfn f(a) {\n  ret @a.b\n}'
+    assert get_lark_tokens(lexer_type(), src) == [
+        ('NAME', 'x', 0, 1, 1),
+        ('DECLARE', ':=', 2, 1, 3),
+        ('UNIT_INTEGER', '5:mb', 5, 1, 6),
+        ('SEMICOLON', '', 8, 1, 9),
+        ('FN', 'fn', 9, 2, 1),
+        ('NAME', 'f', 12, 2, 4),
+        ('PAREN_OPEN', '(', 13, 2, 5),
+        ('NAME', 'a', 14, 2, 6),
+        ('PAREN_CLOSE', ')', 15, 2, 7),
+        ('CURLY_OPEN', '{', 17, 2, 9),
+        ('SEMICOLON', '', 18, 2, 10),
+        ('RETURN', 'ret', 21, 3, 3),
+        ('NAME', 'a', 26, 3, 8),
+        ('DOT', '.', 27, 3, 9),
+        ('NAME', 'b', 28, 3, 10),
+        ('SEMICOLON', '', 29, 3, 11),
+        ('CURLY_CLOSE', '}', 30, 4, 1),
+    ]
+
+
+@pytest.mark.parametrize('lexer_type', [EggLexer, TableEggLexer])
+def test_lex_lark_matches_lex(lexer_type: type) -> None:
+    src = 'a.b.c := `ls "-l a" | wc`\nsay "hi" ++ \'there\' # done'
+    assert [
+        (token.type, token.value) for token in lexer_type().lex_lark(src)
+    ] == [
+        (token.token_type, token.source) for token in lexer_type().lex(src)
+    ]
+
+
+def test_parse_error_position() -> None:
+    with pytest.raises(lark.exceptions.UnexpectedToken) as e:
+        get_parser().parse('a := 1\nb := ) 2')
+    assert (e.value.line, e.value.column) == (2, 6)
+
+
+@pytest.mark.parametrize(
+    'data, start',
+    [
+        ('', 0),
+        ('a', 0),
+        ('a\nb', 2),
+        ('a\nb\n\n  \n', 2),
+        ('a\n  b  ', 2),
+        ('\n\n', 0),
+    ],
+)
+def test_tail_start(data: str, start: int) -> None:
+    assert tail_start(data) == start
+
+
+@pytest.mark.parametrize('lexer_type', [EggLexer, TableEggLexer])
+def test_unterminated_quote_across_tail(lexer_type: type) -> None:
+    src = 'a := 1\necho `b\nc'
+    tokens: List[LarkTokenInfo] = []
+    with pytest.raises(LexerError) as e:
+        for token in lexer_type().lex_lark(src):
+            tokens.append(
+                (token.type, token.value, token.start_pos, token.line, None)
+            )
+    assert e.value.position == len(src) + 2
+    assert tokens[-3:] == [
+        ('EXEC_ARG', 'echo', 7, 2, None),
+        ('EXEC_ARG', 'b', 13, 2, None),
+        ('EXEC_ARG', 'c', 15, 3, None),
+    ]
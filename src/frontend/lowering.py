@@ -1,14 +1,17 @@
 import typing
 
-from lark import Transformer, Tree
+from lark import Tree
 from lark.lexer import Token
 from lark.tree import Meta
 
+from .iterative_transformer import IterativeTransformer
 from .lexer_constants import UNITS
 
 
 class LoweringTransformer(
-    Transformer[Token, Tree[Token | int | float | str] | int | float | str]
+    IterativeTransformer[
+        Token, Tree[Token | int | float | str] | int | float | str
+    ]
 ):
     @staticmethod
     def exec(items: typing.Iterable[Token]) -> Tree[Token | int | float | str]:
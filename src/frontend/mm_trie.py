@@ -1,5 +1,14 @@
+import re
 from collections import defaultdict
-from typing import DefaultDict, Dict, NamedTuple, Optional, Set
+from typing import (
+    DefaultDict,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+)
 
 
 class TrieResult(NamedTuple):
@@ -37,3 +46,54 @@ class MaxMunchTrie:
                 return node.value
             node = node.children[c]
         return node.value
+
+
+class CompiledMaxMunchTrie:
+    """Longest prefix matching from one generated anchored regex.
+
+    The regex mirrors the trie, with greedy optional groups below nodes that
+    end a pattern, so the whole walk happens inside the regex engine. Unlike
+    MaxMunchTrie, it falls back to the last pattern it passed when a longer
+    walk dead ends. The two only differ when a pattern extends a shorter one
+    through a prefix that is not a pattern, which no operator table does.
+    """
+
+    def __init__(self, named_patterns: Dict[str, str]):
+        self.results = {
+            pattern: TrieResult(name, len(pattern))
+            for pattern, name in named_patterns.items()
+        }
+        root_node = TrieNode(0, named_patterns)
+        self.first_chars: Set[str] = set(root_node.children.keys())
+        self.regex = re.compile(
+            self.node_regex(root_node)
+            if root_node.children or root_node.value is not None
+            else '(?!)'
+        )
+
+    @classmethod
+    def node_regex(cls, node: TrieNode) -> str:
+        if not node.children:
+            return ''
+        alternatives = '|'.join(
+            re.escape(c) + cls.node_regex(child)
+            for c, child in sorted(node.children.items())
+        )
+        return f'(?:{alternatives})' + ('?' if node.value is not None else '')
+
+    def largest_prefix(
+        self, data: str, data_start_from: int
+    ) -> Optional[TrieResult]:
+        if (match := self.regex.match(data, data_start_from)) is not None:
+            return self.results[match.group()]
+        return None
+
+    def largest_prefixes(
+        self, data: str, offsets: Iterable[int]
+    ) -> List[Optional[TrieResult]]:
+        match = self.regex.match
+        results = self.results
+        return [
+            results[m.group()] if (m := match(data, offset)) else None
+            for offset in offsets
+        ]
@@ -1,4 +1,5 @@
-from .mm_trie import MaxMunchTrie, TrieResult
+from .lexer_constants import ARITHMETIC_OPERATORS, NON_ARITHMETIC_OPERATORS
+from .mm_trie import CompiledMaxMunchTrie, MaxMunchTrie, TrieResult
 
 
 def test_ab() -> None:
@@ -23,3 +24,47 @@ def test_ab() -> None:
     assert trie.largest_prefix('xxaabrah', 2) == TrieResult('2', 3)
     assert trie.largest_prefix('xxababrah', 2) == TrieResult('3', 3)
     assert trie.largest_prefix('xxbaabrah', 2) == TrieResult('4', 1)
+
+
+def test_compiled_ab() -> None:
+    patterns = {'a': '1', 'aab': '2', 'aba': '3', 'b': '4'}
+    trie = MaxMunchTrie(patterns)
+    compiled = CompiledMaxMunchTrie(patterns)
+    assert compiled.first_chars == trie.first_chars
+    for data in ['', 'cd', 'ac', 'aab', 'aabrah', 'ababrah', 'baabrah']:
+        for start in range(len(data) + 1):
+            rest = data[start:]
+            if rest.startswith('ab') and not rest.startswith('aba'):
+                continue
+            assert compiled.largest_prefix(data, start) == (
+                trie.largest_prefix(data, start)
+            )
+
+
+def test_compiled_backs_off_to_shorter_match() -> None:
+    # The dict trie stops at the 'ab' node, which ends no pattern, and
+    # misses 'a'. No operator table has a gap like that.
+    patterns = {'a': '1', 'aba': '3'}
+    assert MaxMunchTrie(patterns).largest_prefix('abc', 0) is None
+    assert CompiledMaxMunchTrie(patterns).largest_prefix('abc', 0) == (
+        TrieResult('1', 1)
+    )
+
+
+def test_compiled_operators() -> None:
+    patterns = {**NON_ARITHMETIC_OPERATORS, **ARITHMETIC_OPERATORS}
+    trie = MaxMunchTrie(patterns)
+    compiled = CompiledMaxMunchTrie(patterns)
+    data = ' '.join(patterns) + '.|=&&**=...x'
+    offsets = range(len(data) + 1)
+    assert compiled.largest_prefixes(data, offsets) == [
+        trie.largest_prefix(data, offset) for offset in offsets
+    ]
+
+
+def test_compiled_edge_cases() -> None:
+    assert CompiledMaxMunchTrie({}).largest_prefix('a', 0) is None
+    assert CompiledMaxMunchTrie({'': 'E'}).largest_prefix('a', 0) == (
+        TrieResult('E', 0)
+    )
+    assert CompiledMaxMunchTrie({'a.': 'X'}).largest_prefix('ab', 0) is None
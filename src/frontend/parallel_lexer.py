@@ -0,0 +1,104 @@
+import concurrent.futures
+import itertools
+import os
+from typing import Iterator, List, Optional, Tuple
+
+from .lexer import EggLexer, start_node
+from .lexer_util import LexerError, LexerState, Token, make_token
+
+top_level_checkpoint = LexerState('', start_node, make_token).checkpoint()
+
+
+def split_chunks(data: str, count: int) -> List[str]:
+    """Splits data into about count chunks at likely top level lines.
+
+    A boundary is placed before a line that starts with a letter in the
+    first column, when the line before it has no comment. The guess is
+    checked after lexing, so it only has to be right most of the time.
+    """
+    chunks: List[str] = []
+    chunk_start = 0
+    target = max(1, len(data) // count)
+    while len(chunks) < count - 1:
+        position = chunk_start + target
+        while (position := data.find('\n', position) + 1) > 0:
+            line_start = data.rfind('\n', chunk_start, position - 1) + 1
+            if (
+                data[position : position + 1].isalpha()
+                and '#' not in data[line_start:position]
+            ):
+                break
+            position += 1
+        if position <= 0 or position >= len(data):
+            break
+        chunks.append(data[chunk_start:position])
+        chunk_start = position
+    chunks.append(data[chunk_start:])
+    return chunks
+
+
+def lex_chunk(
+    chunk: str, lookahead: Optional[str]
+) -> Tuple[List[str], List[str], bool]:
+    """Lexes a chunk from a fresh top level state.
+
+    Returns the token types and sources, which pickle much faster than Token
+    tuples, and whether the chunk also ended in the state the next chunk
+    assumed. The last chunk has no lookahead.
+    """
+    if lookahead is None:
+        tokens = list(EggLexer().lex(chunk))
+        clean = True
+    else:
+        state = LexerState(chunk + lookahead, start_node, make_token)
+        tokens = list(EggLexer.resume(state, len(chunk)))
+        clean = (
+            state.head == len(chunk)
+            and state.checkpoint() == top_level_checkpoint
+        )
+    return (
+        [token.token_type for token in tokens],
+        [token.source for token in tokens],
+        clean,
+    )
+
+
+class ParallelEggLexer:
+    """Lexes chunks of a large script in a process pool.
+
+    The output is identical to EggLexer.lex. If any chunk boundary turns out
+    not to be at the top level, or a chunk fails to lex, the whole script is
+    lexed serially instead so that errors are reported as usual.
+    """
+
+    def __init__(
+        self, jobs: Optional[int] = None, min_chunk_size: int = 1 << 16
+    ):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.min_chunk_size = min_chunk_size
+        self.fell_back = False
+
+    def lex(self, data: str) -> Iterator[Token]:
+        self.fell_back = False
+        count = min(self.jobs, len(data) // self.min_chunk_size)
+        if count < 2:
+            return EggLexer().lex(data)
+        chunks = split_chunks(data, count)
+        lookaheads: List[Optional[str]] = [
+            chunk[: chunk.find('\n') + 1] or chunk for chunk in chunks[1:]
+        ]
+        lookaheads.append(None)
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=min(self.jobs, len(chunks))
+            ) as pool:
+                results = list(pool.map(lex_chunk, chunks, lookaheads))
+        except (LexerError, OSError, concurrent.futures.BrokenExecutor):
+            results = []
+        if not results or not all(clean for _, _, clean in results):
+            self.fell_back = True
+            return EggLexer().lex(data)
+        return itertools.chain.from_iterable(
+            map(Token, token_types, sources)
+            for token_types, sources, _ in results
+        )
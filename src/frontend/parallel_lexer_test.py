@@ -0,0 +1,83 @@
+import pathlib
+
+import pytest
+
+from .lexer import EggLexer
+from .lexer_util import LexerError
+from .parallel_lexer import ParallelEggLexer, lex_chunk, split_chunks
+
+benchmark_path = (
+    pathlib.Path(__file__).parents[2] / 'examples' / 'large_benchmark.egg'
+)
+
+
+@pytest.fixture(scope='module')
+def benchmark_prefix() -> str:
+    return '\n'.join(benchmark_path.read_text('utf-8').split('\n')[:3000])
+
+
+def test_split_chunks(benchmark_prefix: str) -> None:
+    chunks = split_chunks(benchmark_prefix, 4)
+    assert len(chunks) == 4
+    assert ''.join(chunks) == benchmark_prefix
+    for chunk in chunks[1:]:
+        assert chunk[0].isalpha()
+
+
+def test_split_chunks_without_boundaries() -> None:
+    assert split_chunks('a\n b\n c', 3) == ['a\n b\n c']
+
+
+def test_lex_chunk_detects_bad_boundary() -> None:
+    assert lex_chunk('f(a,\n', 'b)')[2] is False
+    assert lex_chunk('say "a\n', 'b"')[2] is False
+    assert lex_chunk('ls # x\n', 'y')[2] is False
+    assert lex_chunk('f(a, b)\n', 'c') == (
+        ['NAME', 'PAREN_OPEN', 'NAME', 'COMMA', 'NAME', 'PAREN_CLOSE', 'SEMICOLON'],
+        ['f', '(', 'a', ',', 'b', ')', ''],
+        True,
+    )
+
+
+def test_matches_serial_lexer(benchmark_prefix: str) -> None:
+    lexer = ParallelEggLexer(jobs=3, min_chunk_size=1024)
+    assert list(lexer.lex(benchmark_prefix)) == list(
+        EggLexer().lex(benchmark_prefix)
+    )
+    assert not lexer.fell_back
+
+
+def test_falls_back_on_bad_boundary() -> None:
+    src = 'f(1,\n' + 'a := 1\n' * 300 + ')\n' + 'b := 2\n' * 100
+    lexer = ParallelEggLexer(jobs=2, min_chunk_size=1024)
+    assert list(lexer.lex(src)) == list(EggLexer().lex(src))
+    assert lexer.fell_back
+
+
+def test_lexer_error_reported_serially() -> None:
+    src = 'a := 1\n' * 300 + 'b := 5zb\n' + 'a := 1\n' * 300
+    lexer = ParallelEggLexer(jobs=2, min_chunk_size=1024)
+    with pytest.raises(LexerError) as e:
+        list(lexer.lex(src))
+    with pytest.raises(LexerError) as expected:
+        list(EggLexer().lex(src))
+    assert e.value.position == expected.value.position
+    assert lexer.fell_back
+
+
+def test_lexer_error_in_worker_chunk() -> None:
+    # The error raised in the worker carries its lexer state back with it
+    src = 'a := 1\n' * 20 + 'b := "unterminated\n'
+    lexer = ParallelEggLexer(jobs=4, min_chunk_size=16)
+    with pytest.raises(LexerError) as e:
+        list(lexer.lex(src))
+    with pytest.raises(LexerError) as expected:
+        list(EggLexer().lex(src))
+    assert e.value.position == expected.value.position
+    assert lexer.fell_back
+
+
+def test_small_input_is_lexed_serially() -> None:
+    lexer = ParallelEggLexer(jobs=4)
+    assert list(lexer.lex('a := 1')) == list(EggLexer().lex('a := 1'))
+    assert not lexer.fell_back
@@ -1,25 +1,151 @@
+import hashlib
+import io
+import os
 import pathlib
+import pickle
+import sys
+import tempfile
+import warnings
+from typing import Any, Dict, List, Optional, Type
 
 import lark
+import lark.lexer
 
 from .lexer import EggLexerLark
 from .lowering import LoweringTransformer
+from .table_lexer import TableEggLexerLark
+
+here = pathlib.Path(__file__).parent.resolve()
+
+# Serialized LALR parsers, built when installing by running
+# `python -m src.frontend.parser` and read from next to egg.lark. They are
+# never written at runtime, and without them lark's own cache is used.
+TABLES_PATH = here / 'egg.lark.tables'
+
+PREBUILT_LEXERS: List[Type[lark.lexer.Lexer]] = [
+    EggLexerLark,
+    TableEggLexerLark,
+]
+
+
+def prebuilt_transformers() -> List[Optional[Type[Any]]]:
+    # Imported here since the code generators import the frontend
+    from ..yolk import yolk
+
+    return [
+        None,
+        LoweringTransformer,
+        yolk.FusedYolkGenerator,
+        yolk.FoldingYolkGenerator,
+    ]
 
 
 def get_grammar() -> str:
     """Read the Grammar of Egg from egg.lark."""
-    here = pathlib.Path(__file__).parent.resolve()
     grammar_file = here / 'egg.lark'
     return grammar_file.read_text('utf-8')
 
 
-def get_parser(lowering: bool = True) -> lark.Lark:
-    grammar = get_grammar()
-    transformer = LoweringTransformer if lowering else None
+def grammar_digest(grammar: str) -> str:
+    digest = hashlib.sha256(grammar.encode('utf-8'))
+    digest.update(lark.__version__.encode())
+    return digest.hexdigest()
+
+
+def qualified_name(cls: Optional[type]) -> str:
+    return f'{cls.__module__}.{cls.__qualname__}' if cls else 'None'
+
+
+def parser_key(
+    lexer: Type[lark.lexer.Lexer], transformer: Optional[type]
+) -> str:
+    return f'{qualified_name(lexer)}:{qualified_name(transformer)}'
+
+
+def load_parser_tables(
+    grammar: str, tables_path: pathlib.Path = TABLES_PATH
+) -> Dict[str, bytes]:
+    """Returns the saved parsers, or nothing if they are missing or stale."""
+    try:
+        with open(tables_path, 'rb') as tables_file:
+            tables = pickle.load(tables_file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return {}
+    if tables.get('digest') != grammar_digest(grammar):
+        warnings.warn(
+            f'{tables_path} is stale, rebuild it with '
+            '`python -m src.frontend.parser`'
+        )
+        return {}
+    parsers: Dict[str, bytes] = tables['parsers']
+    return parsers
+
+
+def build_parser(
+    grammar: str,
+    lexer: Type[lark.lexer.Lexer],
+    transformer: Optional[Type[lark.Transformer[Any, Any]]] = None,
+) -> lark.Lark:
     return lark.Lark(
         grammar,
         parser='lalr',
-        lexer=EggLexerLark,
+        lexer=lexer,
         transformer=transformer,
         cache=True,
     )
+
+
+def save_parser(parser: lark.Lark) -> bytes:
+    # The transformer class is saved by name, so loading brings it back
+    saved_parser = io.BytesIO()
+    parser.save(saved_parser)
+    return saved_parser.getvalue()
+
+
+def get_parser(
+    lowering: bool = True,
+    lexer: Type[lark.lexer.Lexer] = EggLexerLark,
+    transformer: Optional[Type[lark.Transformer[Any, Any]]] = None,
+) -> lark.Lark:
+    """Loads the parser, which runs the lowering transformer inline.
+
+    Another transformer, such as a code generator, may be run inline in
+    place of lowering, in which case parse returns its result for the start
+    rule instead of a tree.
+    """
+    grammar = get_grammar()
+    if transformer is None and lowering:
+        transformer = LoweringTransformer
+    parsers = load_parser_tables(grammar, TABLES_PATH)
+    saved = parsers.get(parser_key(lexer, transformer))
+    if saved is not None:
+        try:
+            return lark.Lark.load(io.BytesIO(saved))
+        except (pickle.UnpicklingError, ImportError, AttributeError):
+            pass
+    return build_parser(grammar, lexer, transformer)
+
+
+def build_parser_tables(tables_path: pathlib.Path = TABLES_PATH) -> None:
+    grammar = get_grammar()
+    parsers = {
+        parser_key(lexer, transformer): save_parser(
+            build_parser(grammar, lexer, transformer)
+        )
+        for lexer in PREBUILT_LEXERS
+        for transformer in prebuilt_transformers()
+    }
+    tables = {'digest': grammar_digest(grammar), 'parsers': parsers}
+    fd, temp_path = tempfile.mkstemp(dir=tables_path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            pickle.dump(tables, temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, tables_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+if __name__ == '__main__':
+    build_parser_tables(*map(pathlib.Path, sys.argv[1:2]))
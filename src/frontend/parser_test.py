@@ -1,6 +1,21 @@
+import pathlib
+import pickle
+import subprocess
+import sys
 from typing import Dict
 
-from .parser import get_parser
+import pytest
+
+from . import parser as parser_module
+from .parser import (
+    PREBUILT_LEXERS,
+    build_parser_tables,
+    get_grammar,
+    get_parser,
+    load_parser_tables,
+    parser_key,
+    prebuilt_transformers,
+)
 
 """
 INSTRUCTIONS: To add new test cases:
@@ -29,6 +44,66 @@ def get_ast(src: str) -> str:
     return parser.parse(src).pretty().strip()
 
 
+def test_prebuilt_parser_tables(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    tables_path = tmp_path / 'egg.lark.tables'
+    build_parser_tables(tables_path)
+    parsers = load_parser_tables(get_grammar(), tables_path)
+    assert sorted(parsers) == sorted(
+        parser_key(lexer, transformer)
+        for lexer in PREBUILT_LEXERS
+        for transformer in prebuilt_transformers()
+    )
+
+    lowered = get_parser(lexer=PREBUILT_LEXERS[1]).parse('a | b').pretty()
+    monkeypatch.setattr(parser_module, 'TABLES_PATH', tables_path)
+    monkeypatch.setattr(parser_module, 'build_parser', None)
+    loaded = get_parser(lowering=False)
+    assert loaded.parse('a | b').pretty() == parser.parse('a | b').pretty()
+    loaded = get_parser(lexer=PREBUILT_LEXERS[1])
+    assert loaded.parse('a | b').pretty() == lowered
+
+
+def test_stale_parser_tables_ignored(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    tables_path = tmp_path / 'egg.lark.tables'
+    stale = pickle.dumps({'digest': 'old grammar', 'parsers': {}})
+    tables_path.write_bytes(stale)
+    with pytest.warns(UserWarning, match='stale'):
+        assert load_parser_tables(get_grammar(), tables_path) == {}
+
+    monkeypatch.setattr(parser_module, 'TABLES_PATH', tables_path)
+    with pytest.warns(UserWarning, match='stale'):
+        rebuilt = get_parser(lowering=False)
+    assert rebuilt.parse('a | b').pretty() == parser.parse('a | b').pretty()
+    assert tables_path.read_bytes() == stale
+    assert list(tmp_path.iterdir()) == [tables_path]
+
+
+def test_parser_tables_current() -> None:
+    # Tables left next to egg.lark must be rebuilt whenever it changes
+    if not parser_module.TABLES_PATH.exists():
+        pytest.skip('parser tables are not built')
+    parsers = load_parser_tables(get_grammar())
+    assert len(parsers) == len(PREBUILT_LEXERS) * len(prebuilt_transformers())
+
+
+def test_build_writes_parser_tables(tmp_path: pathlib.Path) -> None:
+    src = pathlib.Path(parser_module.__file__).parents[1]
+    subprocess.run(
+        [sys.executable, 'setup.py', '-q', 'build_py', '-d', str(tmp_path)],
+        cwd=src,
+        check=True,
+    )
+    frontend = tmp_path / 'src' / 'frontend'
+    assert (frontend / 'egg.lark').read_text('utf-8') == get_grammar()
+    parsers = load_parser_tables(get_grammar(), frontend / 'egg.lark.tables')
+    assert len(parsers) == len(PREBUILT_LEXERS) * len(prebuilt_transformers())
+    assert not (tmp_path / 'src' / 'setup.py').exists()
+
+
 def test_pipe2() -> None:
     src = 'a | b'
     expected_ast = 'pipeline' '\n  exec\ta' '\n  exec\tb'
@@ -1,4 +1,8 @@
-from .source import Source, SourceLocation, SourceManager
+import pathlib
+
+import pytest
+
+from .source import Source, SourceLocation, SourceManager, read_source
 
 src_str = (
     "012345678\n"
@@ -24,3 +28,27 @@ def test_source_manager() -> None:
             assert src_man.get_source_for_loc(loc) == src_str[i:j]
             assert src_man.get_start_line_col(loc) == (i // 10, i % 10)
             assert src_man.get_end_line_col(loc) == (j // 10, j % 10)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"",
+        b"say 1\n",
+        b"x := 'caf\xc3\xa9'\nsay x",
+        b"a := 1\r\nb := 2\rc := 3",
+        b"\xef\xbb\xbfsay 1",
+    ],
+)
+def test_read_source(content: bytes, tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "script.egg"
+    path.write_bytes(content)
+    assert read_source(path) == path.read_text("utf-8")
+    assert read_source(str(path)) == path.read_text("utf-8")
+
+
+def test_read_source_invalid_utf8(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "script.egg"
+    path.write_bytes(b"say '\xff'")
+    with pytest.raises(UnicodeDecodeError):
+        read_source(path)
@@ -0,0 +1,138 @@
+from typing import Iterable, Iterator, List, Optional
+
+import lark.lexer
+
+from .lexer import EggLexer, comment_node, start_node
+from .lexer_util import (
+    SENTINEL,
+    LarkTokenFactory,
+    LexerCheckpoint,
+    LexerError,
+    LexerState,
+    make_token,
+)
+
+OPENING = {'PAREN_OPEN', 'CURLY_OPEN', 'SQUARE_OPEN'}
+CLOSING = {'PAREN_CLOSE', 'CURLY_CLOSE', 'SQUARE_CLOSE'}
+
+
+def statement_tokens(
+    tokens: Iterable[lark.lexer.Token],
+) -> Iterator[List[lark.lexer.Token]]:
+    """Yields the tokens of each top-level statement.
+
+    Statements end at a SEMICOLON outside of any brackets, which is left
+    out, and the last one at the end of the tokens. Lines with nothing but
+    whitespace or comments are not statements.
+    """
+    depth = 0
+    statement: List[lark.lexer.Token] = []
+    for token in tokens:
+        if token.type == 'SEMICOLON' and depth == 0:
+            if statement:
+                yield statement
+                statement = []
+            continue
+        if token.type in OPENING:
+            depth += 1
+        elif token.type in CLOSING:
+            depth = max(depth - 1, 0)
+        statement.append(token)
+    if statement:
+        yield statement
+
+
+class StreamTokenFactory(LarkTokenFactory):
+    """Builds lark tokens for a piece of a stream, placed in the stream.
+
+    The piece starts at offset, on the given line of the stream, which
+    started at line_start.
+    """
+
+    def __init__(self, data: str, offset: int, line: int, line_start: int):
+        super().__init__(data)
+        self.offset = offset
+        self.line = line
+        self.line_start = line_start - offset
+
+    def __call__(
+        self, token_type: str, source: str, start: int
+    ) -> lark.lexer.Token:
+        token = super().__call__(token_type, source, start)
+        token.start_pos = start + self.offset
+        return token
+
+
+class StreamLexer:
+    """Lexes a stream a piece at a time, resuming from a checkpoint."""
+
+    def __init__(self) -> None:
+        self.checkpoint: LexerCheckpoint = LexerState(
+            '', start_node, make_token
+        ).checkpoint()
+        # Where in the stream the checkpoint's pending source starts
+        self.offset = 0
+        self.line = 1
+        self.line_start = 0
+        # Characters lexed, counting pending sources each time
+        self.lexed = 0
+
+    def lex(
+        self, data: str, lookahead: Optional[str]
+    ) -> Iterator[lark.lexer.Token]:
+        """Lexes data, with lookahead set to None at the end of the stream.
+
+        Otherwise lookahead must start with what follows data in the stream,
+        which is read but not lexed.
+        """
+        pending = self.checkpoint.pending
+        source = pending + data
+        state = LexerState.from_checkpoint(
+            self.checkpoint,
+            data + (SENTINEL if lookahead is None else lookahead),
+            StreamTokenFactory(
+                source, self.offset, self.line, self.line_start
+            ),
+        )
+        stop = state.data_length if lookahead is None else len(source)
+        self.lexed += stop
+        try:
+            yield from EggLexer.resume(state, stop)
+            if lookahead is None and state.state_node is not comment_node:
+                raise LexerError('Read unexpected char', state)
+        except LexerError as e:
+            e.position += self.offset
+            raise
+        self.checkpoint = state.checkpoint()
+        done = len(source) - len(self.checkpoint.pending)
+        if (newlines := source.count('\n', 0, done)) != 0:
+            self.line += newlines
+            self.line_start = self.offset + source.rfind('\n', 0, done) + 1
+        self.offset += done
+
+
+def stream_tokens(
+    lines: Iterable[str], lexer: Optional[StreamLexer] = None
+) -> Iterator[lark.lexer.Token]:
+    """Yields the tokens of lines as soon as the lines after them are read.
+
+    The lexer looks ahead across blank lines to the first character of the
+    next line with something on it, so a line is only lexed once that line
+    is read. Each line is lexed once, along with the source of any token it
+    ends that started on the lines before it.
+    """
+    lexer = lexer or StreamLexer()
+    held = ''
+    for line in lines:
+        if held and line.strip():
+            yield from lexer.lex(held, line)
+            held = ''
+        held += line
+    yield from lexer.lex(held, None)
+
+
+def stream_statements(
+    lines: Iterable[str],
+) -> Iterator[List[lark.lexer.Token]]:
+    """Yields the tokens of each top-level statement as soon as it ends."""
+    return statement_tokens(stream_tokens(lines))
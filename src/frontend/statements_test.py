@@ -0,0 +1,101 @@
+from typing import Any, Iterable, Iterator, List, Tuple
+
+import lark.lexer
+import pytest
+
+from .lexer import EggLexer
+from .lexer_util import SENTINEL, LexerError
+from .statements import (
+    StreamLexer,
+    statement_tokens,
+    stream_statements,
+    stream_tokens,
+)
+from .table_lexer import TableEggLexer
+
+
+def split(src: str) -> List[str]:
+    """The text of each statement, between the tokens around it."""
+    tokens = list(EggLexer().lex_lark(src))
+    assert placed(tokens) == placed(TableEggLexer().lex_lark(src))
+    bounds = [0] + [t.start_pos or 0 for t in tokens] + [len(src)]
+    ends = [0] + [(t.start_pos or 0) + len(t) for t in tokens]
+    index = {id(token): i for i, token in enumerate(tokens)}
+    return [
+        src[ends[index[id(s[0])]] : bounds[index[id(s[-1])] + 2]].strip()
+        for s in statement_tokens(tokens)
+    ]
+
+
+def placed(tokens: Iterable[lark.lexer.Token]) -> List[Tuple[Any, ...]]:
+    return [
+        (token.type, token.value, token.start_pos, token.line, token.column)
+        for token in tokens
+    ]
+
+
+def test_split_statements() -> None:
+    assert split('1 + 1') == ['1 + 1']
+    assert split('a := 1; say a\n  b | c  \n') == ['a := 1', 'say a', 'b | c']
+    assert split('\n\n# only a comment\n\n') == []
+    assert split(';;1;;2;;') == ['1', '2']
+
+
+def test_brackets_hold_statements_together() -> None:
+    src = 'while(a == b) {\n  x()\n  y()\n}\n[1,\n2]\n(1 +\n 2)\nsay 3'
+    assert split(src) == [
+        'while(a == b) {\n  x()\n  y()\n}',
+        '[1,\n2]',
+        '(1 +\n 2)',
+        'say 3',
+    ]
+
+
+def test_stream_statements() -> None:
+    src = (
+        'say "a\nb"\n'
+        'while(a == b) {\n  x()\n}\n'
+        '\n\n'
+        'a | b\n'
+        '# a comment\n'
+        '1; 2\n'
+        # Whether foo is a name depends on the next line it is followed by
+        'foo \n\n(1)\n'
+        'x \n  "a\nb"\n'
+        'say 3'
+    )
+    read: List[str] = []
+
+    def lines() -> Iterator[str]:
+        for line in src.splitlines(keepends=True):
+            read.append(line)
+            yield line
+
+    statements = stream_statements(lines())
+    expected = list(statement_tokens(EggLexer().lex_lark(src)))
+    assert placed(next(statements)) == placed(expected[0])
+    # The first statement is known to have ended once the next is started
+    assert len(read) == 3
+    # Tokens are the same as lexing the whole source, positions included
+    assert list(map(placed, statements)) == list(map(placed, expected[1:]))
+    assert 'foo' in split(src) and '"a\nb"' in split(src)
+
+
+def test_stream_lexes_each_line_once() -> None:
+    body = '  say "a"\n  x := 1 + 2\n' * 1000
+    src = f'if true {{\n{body}}}\nsay 1\n'
+    lexer = StreamLexer()
+    statements = list(
+        statement_tokens(stream_tokens(src.splitlines(True), lexer))
+    )
+    assert len(statements) == 2
+    assert lexer.lexed <= len(src) + len(SENTINEL)
+
+
+def test_stream_lexer_error() -> None:
+    src = 'a := 1\nb := "unterminated\n'
+    with pytest.raises(LexerError) as e:
+        list(stream_statements(src.splitlines(keepends=True)))
+    with pytest.raises(LexerError) as expected:
+        list(EggLexer().lex(src))
+    assert e.value.position == expected.value.position
@@ -0,0 +1,506 @@
+import re
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+import lark.lexer
+
+from .lexer import (
+    comment_node,
+    identifier_node,
+    match_operator,
+    number_node,
+    quoted_arg_list_node,
+    quoted_literal_node,
+    start_node,
+    tokens_before_names,
+    unquoted_literal_node,
+)
+from .lexer_constants import KEYWORDS, UNITS, all_operators_trie
+from .lexer_util import (
+    SENTINEL,
+    DFANode,
+    LarkTokenFactory,
+    LexerError,
+    LexerState,
+    Token,
+    TokenFactory,
+    TokenT,
+    make_token,
+    shift_positions,
+    tail_start,
+)
+
+# Character classes used by the start state. Operator characters carry the
+# _OPERATOR flag on top of the class they fall back to when no operator
+# matches at their position.
+_NEWLINE = 0
+_SPACE = 1
+_DIGIT = 2
+_SIGN = 3
+_LITERAL = 4
+_COMMENT = 5
+_AT = 6
+_QUOTE = 7
+_BACKTICK = 8
+_UNIMPLEMENTED = 9
+_OPERATOR = 16
+
+
+def _classify(c: str) -> int:
+    if c == '\n':
+        return _NEWLINE
+    if c.isspace():
+        return _SPACE
+    if c.isdigit():
+        char_class = _DIGIT
+    elif c == '-':
+        char_class = _SIGN
+    elif c.isalpha() or c in './*+-%_':
+        char_class = _LITERAL
+    elif c == '#':
+        char_class = _COMMENT
+    elif c == '@':
+        char_class = _AT
+    elif c in ('"', "'"):
+        char_class = _QUOTE
+    elif c == '`':
+        char_class = _BACKTICK
+    else:
+        char_class = _UNIMPLEMENTED
+    if c in all_operators_trie.first_chars:
+        char_class |= _OPERATOR
+    return char_class
+
+
+_CHAR_CLASSES: Dict[str, int] = {chr(i): _classify(chr(i)) for i in range(128)}
+
+_DEPTH_CHANGES = {
+    'CURLY_OPEN': ('curly_depth', 1),
+    'CURLY_CLOSE': ('curly_depth', -1),
+    'PAREN_OPEN': ('paren_depth', 1),
+    'PAREN_CLOSE': ('paren_depth', -1),
+    'SQUARE_OPEN': ('square_depth', 1),
+    'SQUARE_CLOSE': ('square_depth', -1),
+}
+
+# Bulk scanners: each consumes the run of characters that cannot cause a
+# transition out of (or a token from) the corresponding DFA state.
+_SPACE_RUN = re.compile(r'[^\S\n]+')
+_ASCII_DIGITS = re.compile(r'[0-9]*')
+_IDENTIFIER_BODY = re.compile(r'[^\s:=+\-*%/\[\]{}()<>.,;@]*')
+_UNQUOTED_BODY = re.compile(r'[^\s.(:=<>{}\[\])|;,@]*')
+_QUOTED_BODY = {
+    '"': re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL),
+    "'": re.compile(r"[^'\\]*(?:\\.[^'\\]*)*", re.DOTALL),
+}
+_ARG_LIST_BODY = re.compile(r'[^\\\'"|`\s]*')
+_QUOTED_ARG_BODY = {
+    '"': re.compile(r'[^"\\]*'),
+    "'": re.compile(r"[^'\\]*"),
+}
+
+
+def _scan(pattern: re.Pattern[str], data: str, head: int) -> int:
+    match = pattern.match(data, head)
+    assert match is not None
+    return match.end()
+
+
+class TableEggLexer:
+    """Produces the same tokens as EggLexer using character-class tables.
+
+    Instead of stepping a DFA node once per character, each state scans the
+    longest run of characters it would ignore with a precompiled regex and
+    only inspects the characters that can end a token.
+    """
+
+    def __init__(self) -> None:
+        self.lexer_state: Optional[LexerState[Any]] = None
+        self.tokens: List[Any] = []
+        self.start_actions: List[Callable[[LexerState[Any], int], int]] = [
+            self.lex_newline,
+            self.lex_space,
+            self.lex_number,
+            self.lex_sign,
+            self.lex_literal,
+            self.lex_comment,
+            self.lex_at,
+            self.lex_quoted_literal,
+            self.lex_quoted_arg_list,
+            self.lex_unimplemented,
+        ]
+
+    def lex(self, data: str) -> Iterator[Token]:
+        return self.lex_with(data, make_token)
+
+    def lex_lark(self, data: str) -> Iterator[lark.lexer.Token]:
+        return self.lex_with(data, LarkTokenFactory(data))
+
+    def lex_with(
+        self, data: str, token_factory: TokenFactory[TokenT]
+    ) -> Iterator[TokenT]:
+        state = LexerState(data, start_node, token_factory)
+        self.lexer_state = state
+        tokens: List[TokenT] = []
+        self.tokens = tokens
+        head = yield from self.lex_span(
+            state, 0, tail_start(data), in_place=True
+        )
+
+        tail = LexerState(
+            data[head:] + SENTINEL,
+            start_node,
+            shift_positions(token_factory, head),
+        )
+        tail.prev_token_type = state.prev_token_type
+        tail.curly_depth = state.curly_depth
+        tail.paren_depth = state.paren_depth
+        tail.square_depth = state.square_depth
+        self.lexer_state = tail
+        try:
+            yield from self.lex_span(tail, 0, tail.data_length, in_place=False)
+            if tail.state_node is not comment_node:
+                tail.head = tail.data_length
+                raise LexerError('Read unexpected char', tail)
+        except LexerError as e:
+            e.position += head
+            raise
+
+    def lex_span(
+        self,
+        state: LexerState[TokenT],
+        head: int,
+        end: int,
+        in_place: bool,
+    ) -> Generator[TokenT, None, int]:
+        """Lexes tokens starting before end and returns where they stop.
+
+        In place, without the SENTINEL, only an unterminated quote can run
+        into the end of the data. Its tokens are then dropped and its
+        position returned, so that it is lexed again with the SENTINEL.
+        """
+        tokens = self.tokens
+        source = state.data
+        char_classes = _CHAR_CLASSES
+        actions = self.start_actions
+        quote: Tuple[int, int, Optional[str]] = (-1, 0, None)
+        try:
+            while head < end:
+                c = source[head]
+                char_class = char_classes.get(c)
+                if char_class is None:
+                    char_class = char_classes[c] = _classify(c)
+                if char_class & _OPERATOR:
+                    state.head = head
+                    if (match := match_operator(state)) is not None:
+                        head = self.emit_operator(state, head, *match)
+                        continue
+                    char_class ^= _OPERATOR
+                if char_class in (_QUOTE, _BACKTICK):
+                    quote = (head, len(tokens), state.prev_token_type)
+                head = actions[char_class](state, head)
+                if len(tokens) > 256:
+                    yield from tokens
+                    tokens.clear()
+        except LexerError:
+            if in_place and quote[0] == head:
+                del tokens[quote[1] :]
+                state.prev_token_type = quote[2]
+                yield from tokens
+                tokens.clear()
+                return head
+            yield from tokens
+            tokens.clear()
+            raise
+        yield from tokens
+        tokens.clear()
+        return head
+
+    def reset(self) -> None:
+        self.lexer_state = None
+        self.tokens = []
+
+    def emit(
+        self, state: LexerState[Any], token_type: str, source: str, start: int
+    ) -> None:
+        self.tokens.append(state.token_factory(token_type, source, start))
+        state.prev_token_type = token_type
+
+    @staticmethod
+    def fail(
+        problem: str, state: LexerState[Any], head: int, node: DFANode
+    ) -> LexerError:
+        state.head = head
+        state.state_node = node
+        return LexerError(problem, state)
+
+    def emit_operator(
+        self, state: LexerState[Any], head: int, pattern: str, operator: str
+    ) -> int:
+        if (depth_change := _DEPTH_CHANGES.get(operator)) is not None:
+            attribute, delta = depth_change
+            setattr(state, attribute, getattr(state, attribute) + delta)
+        self.tokens.append(state.token_factory(operator, pattern, head))
+        state.prev_token_type = operator
+        return head + len(pattern)
+
+    def lex_newline(self, state: LexerState[Any], head: int) -> int:
+        if state.paren_depth == 0:
+            self.tokens.append(state.token_factory('SEMICOLON', '', head))
+        state.prev_token_type = None
+        return head + 1
+
+    def lex_space(self, state: LexerState[Any], head: int) -> int:
+        return _scan(_SPACE_RUN, state.data, head)
+
+    def lex_sign(self, state: LexerState[Any], head: int) -> int:
+        if state.data[head + 1].isdigit():
+            return self.lex_number(state, head)
+        return self.lex_literal(state, head)
+
+    def lex_number(self, state: LexerState[Any], head: int) -> int:
+        data = state.data
+        start = head
+        has_decimal = False
+        head += 1
+        while True:
+            head = _scan(_ASCII_DIGITS, data, head)
+            c = data[head]
+            if c == '.':
+                if data[head + 1] == '.':
+                    break
+                if has_decimal:
+                    raise self.fail(
+                        'Read unexpected char', state, head, number_node
+                    )
+                has_decimal = True
+                head += 1
+            elif c.isdigit():
+                head += 1
+            else:
+                break
+        if state.prev_token_type == 'EXEC_ARG':
+            token_type = 'EXEC_ARG'
+        else:
+            token_type = 'FLOAT' if has_decimal else 'INTEGER'
+        c = data[head]
+        if token_type != 'EXEC_ARG' and c.isalpha():
+            unit_end = head + 1
+            while data[unit_end].isalpha():
+                unit_end += 1
+            unit = ''.join(u.lower() for u in data[head:unit_end])
+            if unit not in UNITS:
+                raise self.fail(
+                    f'Number literal has unknown unit: {unit}',
+                    state,
+                    head,
+                    number_node,
+                )
+            self.tokens.append(
+                state.token_factory(
+                    f'UNIT_{token_type}', f'{data[start:head]}:{unit}', start
+                )
+            )
+            return unit_end
+        self.emit(state, token_type, data[start:head], start)
+        return head
+
+    def lex_literal(self, state: LexerState[Any], head: int) -> int:
+        if state.in_block():
+            return self.lex_identifier(state, head, head)
+        return self.lex_unquoted_literal(state, head)
+
+    def lex_at(self, state: LexerState[Any], head: int) -> int:
+        return self.lex_identifier(state, head + 1, head + 1)
+
+    def lex_identifier(
+        self, state: LexerState[Any], start: int, head: int
+    ) -> int:
+        data = state.data
+        while True:
+            head = _scan(_IDENTIFIER_BODY, data, head)
+            c = data[head]
+            if c == '@':
+                raise self.fail(
+                    'Read unexpected char', state, head, identifier_node
+                )
+            if start == head:
+                raise self.fail(
+                    'Identifier is empty', state, head, identifier_node
+                )
+            source = data[start:head]
+            if source == '_':
+                token_type = 'IMPLICIT_LAMBDA_PARAM'
+            else:
+                token_type = KEYWORDS.get(source, 'NAME')
+            self.emit(state, token_type, source, start)
+            if c == '.' and data[head + 1] != '.':
+                self.emit(state, 'DOT', '.', head)
+                head += 1
+                start = head
+            else:
+                return head
+
+    def lex_unquoted_literal(self, state: LexerState[Any], head: int) -> int:
+        data = state.data
+        start = head
+        while True:
+            head = _scan(_UNQUOTED_BODY, data, head)
+            c = data[head]
+            space = False
+            if c != '\n' and c.isspace():
+                state.head = head
+                c = state.next_nonwhitespace()
+                space = True
+            source = data[start:head]
+            token_type = self.unquoted_token_type(state, source)
+            if (
+                c == '.'
+                and data[head + 1] != '.'
+                and token_type in ('NAME', 'IMPLICIT_LAMBDA_PARAM')
+            ):
+                if source:
+                    self.emit(state, token_type, source, start)
+                self.emit(state, 'DOT', '.', head)
+                return head + 1
+            elif c in '(:=':
+                if source in KEYWORDS:
+                    self.emit(state, token_type, source, start)
+                else:
+                    name_parts = source.split('.')
+                    for i, name_part in enumerate(name_parts):
+                        if name_part == '_':
+                            self.emit(
+                                state, 'IMPLICIT_LAMBDA_PARAM', '_', start
+                            )
+                        elif name_part:
+                            self.emit(state, 'NAME', name_part, start)
+                        start += len(name_part)
+                        if i + 1 < len(name_parts):
+                            self.emit(state, 'DOT', '.', start)
+                            start += 1
+                return head
+            elif (
+                space
+                or c in '<>{}[])|;,\n'
+                or c == '.'
+                and data[head + 1] == '.'
+            ):
+                self.emit(state, token_type, source, start)
+                if c == '\n' and state.paren_depth == 0:
+                    self.tokens.append(
+                        state.token_factory('SEMICOLON', '', head)
+                    )
+                return head
+            elif c == '@':
+                raise self.fail(
+                    'Read unexpected char from unquoted esxpression',
+                    state,
+                    head,
+                    unquoted_literal_node,
+                )
+            head += 1
+
+    @staticmethod
+    def unquoted_token_type(state: LexerState[Any], source: str) -> str:
+        if state.prev_token_type == 'EXEC_ARG':
+            return 'EXEC_ARG'
+        if source in KEYWORDS:
+            return KEYWORDS[source]
+        if source == '_' or source.startswith('_.'):
+            return 'IMPLICIT_LAMBDA_PARAM'
+        if state.in_block() or state.prev_token_type in tokens_before_names:
+            return 'NAME'
+        return 'EXEC_ARG'
+
+    def lex_comment(self, state: LexerState[Any], head: int) -> int:
+        newline = state.data.find('\n', head + 1)
+        if newline == -1:
+            state.state_node = comment_node
+            return state.data_length
+        if state.paren_depth == 0:
+            self.tokens.append(state.token_factory('SEMICOLON', '', newline))
+        return newline + 1
+
+    def lex_quoted_literal(self, state: LexerState[Any], head: int) -> int:
+        data = state.data
+        quote_type = state.quote_type = data[head]
+        start = head + 1
+        head = _scan(_QUOTED_BODY[quote_type], data, start)
+        if head >= state.data_length or data[head] != quote_type:
+            raise self.fail(
+                'Read unexpected char',
+                state,
+                state.data_length,
+                quoted_literal_node,
+            )
+        if state.prev_token_type == 'EXEC_ARG':
+            self.emit(state, 'EXEC_ARG', data[start:head], start)
+        else:
+            self.emit(state, 'QUOTED_STRING', data[start:head], start)
+        return head + 1
+
+    def lex_quoted_arg_list(self, state: LexerState[Any], head: int) -> int:
+        data = state.data
+        end = state.data_length
+        head += 1
+        start = head
+        quote_type: Optional[str] = None
+        while True:
+            if quote_type is None:
+                body = _ARG_LIST_BODY
+            else:
+                body = _QUOTED_ARG_BODY[quote_type]
+            head = _scan(body, data, head)
+            if head >= end:
+                break
+            c = data[head]
+            if c == '\\':
+                head += 2
+                continue
+            if c in ('"', "'"):
+                if quote_type is None:
+                    quote_type = c
+                    start = head + 1
+                elif c == quote_type:
+                    quote_type = None
+                    self.emit(state, 'EXEC_ARG', data[start:head], start)
+                    start = head + 1
+            elif c == '|':
+                if head != start:
+                    self.emit(state, 'EXEC_ARG', data[start:head], start)
+                self.tokens.append(state.token_factory('PIPE', '|', head))
+                start = head + 1
+            elif c == '`':
+                if head != start:
+                    self.emit(state, 'EXEC_ARG', data[start:head], start)
+                return head + 1
+            else:
+                if head != start:
+                    self.emit(state, 'EXEC_ARG', data[start:head], start)
+                start = head + 1
+            head += 1
+        raise self.fail(
+            'Read unexpected char', state, end, quoted_arg_list_node
+        )
+
+    def lex_unimplemented(self, state: LexerState[Any], head: int) -> int:
+        raise self.fail('Read unimplemented char', state, head, start_node)
+
+
+class TableEggLexerLark(lark.lexer.Lexer):
+    def __init__(self, _) -> None:   # type: ignore[no-untyped-def]
+        self.lexer = TableEggLexer()
+
+    def lex(  # type: ignore[override]
+        self, egg_code: str
+    ) -> Iterator[lark.lexer.Token]:
+        return self.lexer.lex_lark(egg_code)
@@ -0,0 +1,83 @@
+import pathlib
+from typing import Callable, List, Optional, Tuple
+
+import pytest
+
+from . import lexer_test
+from .lexer import EggLexer
+from .lexer_util import LexerError
+from .parser import get_parser
+from .table_lexer import TableEggLexer, TableEggLexerLark
+
+lexer_test_cases = [
+    test_case
+    for name, test_case in vars(lexer_test).items()
+    if name.startswith('test_') and name != 'test_no_new_test_cases'
+]
+
+benchmark_path = (
+    pathlib.Path(__file__).parents[2] / 'examples' / 'large_benchmark.egg'
+)
+
+
+def lex_or_error(
+    lexer: EggLexer | TableEggLexer, src: str
+) -> Tuple[List[Tuple[str, str]], Optional[Tuple[str, int]]]:
+    tokens: List[Tuple[str, str]] = []
+    try:
+        for token in lexer.lex(src):
+            tokens.append((token.token_type, token.source))
+    except LexerError as e:
+        return tokens, (e.problem, e.position)
+    return tokens, None
+
+
+@pytest.mark.parametrize(
+    'test_case', lexer_test_cases, ids=lambda f: f.__name__
+)
+def test_lexer_test_cases(
+    test_case: Callable[[], None], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(lexer_test, 'lexer', TableEggLexer())
+    test_case()
+
+
+def test_benchmark_prefix_matches_dfa_lexer() -> None:
+    src = '\n'.join(benchmark_path.read_text('utf-8').split('\n')[:2000])
+    assert lex_or_error(TableEggLexer(), src) == lex_or_error(EggLexer(), src)
+
+
+@pytest.mark.parametrize(
+    'src',
+    [
+        'a $',
+        'say "unterminated',
+        '`unterminated',
+        '1.2.3',
+        '5 + 3zb',
+        'do { @ }',
+        'a@b',
+        '?',
+        'x := 1 ; y := 2 ; say -3.5kb',
+        'a .b',
+        'a\nb',
+        'echo `a"b c"d` | e',
+        '"\\"" ++ \'\\\'\'',
+        'f(a, b)\n  # comment\n  g(c)',
+        'say "a\nb',
+        'echo `a\nb c',
+        'say "a\nb" ++\n"c"\n\n  \n',
+        'x := 1\n\t\n',
+        'a #',
+        'f(a,\n b)',
+    ],
+)
+def test_edge_cases_match_dfa_lexer(src: str) -> None:
+    assert lex_or_error(TableEggLexer(), src) == lex_or_error(EggLexer(), src)
+
+
+def test_parses_with_table_lexer() -> None:
+    parser = get_parser(lexer=TableEggLexerLark)
+    reference = get_parser()
+    for src in ['a | b c', '1 + 2 * -3 < 4', 'fn f(a: int) { ret a }']:
+        assert parser.parse(src) == reference.parse(src)
@@ -0,0 +1,67 @@
+from array import array
+from typing import Dict, Iterator, Protocol
+
+from .lexer_constants import TOKEN_TYPE_IDS, TOKEN_TYPES
+from .lexer_util import Token, TokenFactory
+
+
+class StreamingLexer(Protocol):
+    def lex_with(
+        self, data: str, token_factory: TokenFactory[int]
+    ) -> Iterator[int]:
+        ...
+
+
+class TokenStream:
+    """Compact storage for the tokens of one source string.
+
+    Token types are kept as ids into TOKEN_TYPES and token text as start and
+    end offsets into the source, so no substrings are built until a token's
+    text is asked for. A few tokens have text that is not a slice of the
+    source, such as '5:mb' for '5mb', and those are stored as overrides.
+    """
+
+    def __init__(self, data: str):
+        self.data = data
+        self.type_ids = array('H')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.overrides: Dict[int, str] = {}
+
+    @classmethod
+    def lex(cls, lexer: StreamingLexer, data: str) -> 'TokenStream':
+        stream = cls(data)
+        for _ in lexer.lex_with(data, stream.append):
+            pass
+        return stream
+
+    def append(self, token_type: str, source: str, start: int) -> int:
+        index = len(self.type_ids)
+        end = start + len(source)
+        if not self.data.startswith(source, start):
+            self.overrides[index] = source
+            end = start
+        self.type_ids.append(TOKEN_TYPE_IDS[token_type])
+        self.starts.append(start)
+        self.ends.append(end)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.type_ids)
+
+    def __iter__(self) -> Iterator[Token]:
+        for i in range(len(self.type_ids)):
+            yield self[i]
+
+    def __getitem__(self, index: int) -> Token:
+        return Token(self.token_type(index), self.text(index))
+
+    def token_type(self, index: int) -> str:
+        return TOKEN_TYPES[self.type_ids[index]]
+
+    def text(self, index: int) -> str:
+        if index < 0:
+            index += len(self.type_ids)
+        if (override := self.overrides.get(index)) is not None:
+            return override
+        return self.data[self.starts[index] : self.ends[index]]
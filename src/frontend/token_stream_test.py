@@ -0,0 +1,50 @@
+import pathlib
+
+import pytest
+
+from .lexer import EggLexer
+from .lexer_constants import TOKEN_TYPES
+from .table_lexer import TableEggLexer
+from .token_stream import TokenStream
+
+benchmark_path = (
+    pathlib.Path(__file__).parents[2] / 'examples' / 'large_benchmark.egg'
+)
+
+
+@pytest.mark.parametrize('lexer_type', [EggLexer, TableEggLexer])
+def test_iteration_matches_lex(lexer_type: type) -> None:
+    src = '\n'.join(benchmark_path.read_text('utf-8').split('\n')[:2000])
+    stream = TokenStream.lex(lexer_type(), src)
+    assert list(stream) == list(EggLexer().lex(src))
+
+
+def test_offsets_point_into_source() -> None:
+    src = 'x := "hi"\nls -l | wc'
+    stream = TokenStream.lex(EggLexer(), src)
+    assert [
+        (stream.token_type(i), stream.starts[i], stream.ends[i])
+        for i in range(len(stream))
+    ] == [
+        ('NAME', 0, 1),
+        ('DECLARE', 2, 4),
+        ('QUOTED_STRING', 6, 8),
+        ('SEMICOLON', 9, 9),
+        ('EXEC_ARG', 10, 12),
+        ('EXEC_ARG', 13, 15),
+        ('PIPE', 16, 17),
+        ('EXEC_ARG', 18, 20),
+    ]
+    assert not stream.overrides
+
+
+def test_synthesized_text() -> None:
+    stream = TokenStream.lex(EggLexer(), 'say 5mb')
+    assert stream[1] == ('UNIT_INTEGER', '5:mb')
+    assert stream[-1] == ('UNIT_INTEGER', '5:mb')
+    assert stream.overrides == {1: '5:mb'}
+
+
+def test_type_ids_fit_in_array() -> None:
+    assert len(TOKEN_TYPES) == len(set(TOKEN_TYPES))
+    assert len(TOKEN_TYPES) < 1 << 16
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 import argparse
+import sys
 
 import src.cli.cli as cli
+from src.cli.compile_cache import CompileCache
+from src.cli.vm_channel import MAX_CAPTURE
 
 
 def get_args() -> argparse.Namespace:
@@ -32,6 +35,81 @@ def get_args() -> argparse.Namespace:
         action='store_true',
     )
 
+    arg_parser.add_argument(
+        '--lexer',
+        help='Lexer engine to use: the reference DFA or the table-driven one.',
+        choices=[engine.name for engine in cli.LexerEngine],
+        default=cli.LexerEngine.dfa.name,
+    )
+
+    arg_parser.add_argument(
+        '--lex-jobs',
+        help='Lex large scripts in this many processes with the DFA lexer.',
+        type=int,
+        default=1,
+    )
+
+    arg_parser.add_argument(
+        '--no-cache',
+        help='Compile the script even if its code is in the cache.',
+        action='store_true',
+    )
+
+    arg_parser.add_argument(
+        '--clear-cache',
+        help='Delete the cached code of the script before running it.',
+        action='store_true',
+    )
+
+    arg_parser.add_argument(
+        '--no-fold',
+        help='Generate code for constant expressions instead of folding '
+        'them, for debugging.',
+        action='store_true',
+    )
+
+    arg_parser.add_argument(
+        '--no-peephole',
+        help='Skip the peephole optimization of generated code.',
+        action='store_true',
+    )
+
+    arg_parser.add_argument(
+        '--peephole-stats',
+        help='Print how often each peephole rule applied when done.',
+        action='store_true',
+    )
+
+    arg_parser.add_argument(
+        '--in-process',
+        help='Run programs on a VM in this process instead of the Yolk VM.',
+        action='store_true',
+    )
+
+    arg_parser.add_argument(
+        '--max-capture',
+        help='Most bytes of stdout and of stderr kept from one program run '
+        'by the VM.',
+        type=int,
+        default=MAX_CAPTURE,
+    )
+
+    arg_parser.add_argument(
+        '--statement-cache-size',
+        help='Keep the code generated for this many recent top-level '
+        'statements in memory, so they are not compiled again.',
+        type=int,
+        default=1024,
+    )
+
+    arg_parser.add_argument(
+        '--stream',
+        help='Run a script a statement at a time, each as soon as it is '
+        'read, rather than compiling all of it first. Lexes with the DFA '
+        'lexer.',
+        action='store_true',
+    )
+
     arg_parser.add_argument(
         '--profiler',
         help='Run a profiler to analyze performance bottlenecks.',
@@ -46,7 +124,16 @@ def get_args() -> argparse.Namespace:
         required=False,
     )
 
-    return arg_parser.parse_args()
+    args = arg_parser.parse_args()
+    if args.lex_jobs > 1 and args.lexer != cli.LexerEngine.dfa.name:
+        arg_parser.error('--lex-jobs only works with --lexer dfa')
+    if args.stream and (
+        args.lexer != cli.LexerEngine.dfa.name or args.lex_jobs > 1
+    ):
+        arg_parser.error(
+            '--stream only works with --lexer dfa and one --lex-jobs'
+        )
+    return args
 
 
 def main() -> None:
@@ -63,14 +150,33 @@ def main() -> None:
     else:
         mode = cli.ExecutionMode.execute
 
-    cli_mode = cli.CLIMode(mode)
+    cli_mode = cli.CLIMode(
+        mode,
+        cli.LexerEngine[args.lexer],
+        lex_jobs=args.lex_jobs,
+        use_compile_cache=not args.no_cache,
+        constant_folding=not args.no_fold,
+        peephole=not args.no_peephole,
+        in_process=args.in_process,
+        max_capture=args.max_capture,
+        statement_cache_size=args.statement_cache_size,
+        streaming=args.stream,
+    )
 
     egg_cli = cli.EggCLI(cli_mode, use_profiler=args.profiler)
 
-    if args.script:
-        egg_cli.consume_script(args.script)
-    else:
-        egg_cli.interactive_mode()
+    try:
+        if args.script:
+            if args.clear_cache:
+                CompileCache.clear(args.script)
+            egg_cli.consume_script(args.script)
+        else:
+            egg_cli.interactive_mode()
+    finally:
+        egg_cli.stop_vm()
+
+    if args.peephole_stats:
+        print(egg_cli.peephole_optimizer.report(), file=sys.stderr)
 
 
 if __name__ == '__main__':
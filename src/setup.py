@@ -0,0 +1,32 @@
+import pathlib
+import subprocess
+import sys
+from typing import List, Tuple
+
+from setuptools import setup  # type: ignore[import-untyped]
+from setuptools.command.build_py import (  # type: ignore[import-untyped]
+    build_py,
+)
+
+
+class BuildPyWithParserTables(build_py):  # type: ignore[misc]
+    """Builds the parser tables into the package, for the lark it uses."""
+
+    def find_package_modules(
+        self, package: str, package_dir: str
+    ) -> List[Tuple[str, str, str]]:
+        modules = super().find_package_modules(package, package_dir)
+        return [module for module in modules if module[:2] != ('src', 'setup')]
+
+    def run(self) -> None:
+        super().run()
+        build_lib = pathlib.Path(self.build_lib).resolve()
+        tables_path = build_lib / 'src' / 'frontend' / 'egg.lark.tables'
+        subprocess.run(
+            [sys.executable, '-m', 'src.frontend.parser', str(tables_path)],
+            cwd=build_lib,
+            check=True,
+        )
+
+
+setup(cmdclass={'build_py': BuildPyWithParserTables})
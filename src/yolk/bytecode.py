@@ -0,0 +1,136 @@
+from typing import IO, Tuple
+
+from .ir import CONSTANT_OPCODES, OPERAND_NAMES, Opcode, YolkProgram
+
+# A program is MAGIC, the VERSION byte, the string table and then the
+# instructions. The table is a count followed by length prefixed UTF-8
+# strings, and the instructions are a count followed by one byte opcodes,
+# each with a varint operand if the opcode takes one.
+MAGIC = b'YOLK'
+VERSION = 1
+
+# The line a VM prints for -capabilities when it accepts this format
+CAPABILITY = f'bytecode {VERSION}'
+
+OPCODES = frozenset(Opcode)
+OPERAND_OPCODES = frozenset([*CONSTANT_OPCODES, *OPERAND_NAMES, Opcode.EXEC])
+
+
+class BytecodeError(ValueError):
+    pass
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    # Little endian groups of 7 bits, with the high bit set on all but the
+    # last byte
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data: bytes, position: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if position >= len(data):
+            raise BytecodeError('truncated varint')
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def encode(program: YolkProgram) -> bytes:
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    encode_varint(len(program.constants), out)
+    for constant in program.constants:
+        encoded = constant.encode('utf-8')
+        encode_varint(len(encoded), out)
+        out += encoded
+    encode_varint(len(program), out)
+    for opcode, operand in zip(program.opcodes, program.operands):
+        out.append(opcode)
+        if opcode in OPERAND_OPCODES:
+            encode_varint(operand, out)
+    return bytes(out)
+
+
+def decode(data: bytes) -> YolkProgram:
+    if data[: len(MAGIC)] != MAGIC:
+        raise BytecodeError('not a Yolk bytecode program')
+    position = len(MAGIC)
+    if position >= len(data) or data[position] != VERSION:
+        raise BytecodeError('unsupported bytecode version')
+    position += 1
+
+    # Fills the program's arrays directly, since the operands are already
+    # indexes into the string table
+    program = YolkProgram()
+    count, position = decode_varint(data, position)
+    for _ in range(count):
+        length, position = decode_varint(data, position)
+        if position + length > len(data):
+            raise BytecodeError('truncated string table')
+        constant = data[position : position + length].decode('utf-8')
+        program.constant_ids[constant] = len(program.constants)
+        program.constants.append(constant)
+        position += length
+
+    count, position = decode_varint(data, position)
+    for _ in range(count):
+        if position >= len(data):
+            raise BytecodeError('truncated instructions')
+        opcode = data[position]
+        position += 1
+        if opcode not in OPCODES:
+            raise BytecodeError(f'unknown opcode {opcode}')
+        operand = 0
+        if opcode in OPERAND_OPCODES:
+            # Most operands fit in one byte
+            if position < len(data) and data[position] < 0x80:
+                operand = data[position]
+                position += 1
+            else:
+                operand, position = decode_varint(data, position)
+            if opcode in CONSTANT_OPCODES:
+                if operand >= len(program.constants):
+                    raise BytecodeError(f'no string {operand} in the table')
+            elif opcode in OPERAND_NAMES:
+                if operand >= len(OPERAND_NAMES[Opcode(opcode)]):
+                    raise BytecodeError(f'bad operand {operand}')
+        program.opcodes.append(opcode)
+        program.operands.append(operand)
+    if position != len(data):
+        raise BytecodeError('trailing data after the instructions')
+    return program
+
+
+def write_frame(stream: IO[bytes], data: bytes) -> None:
+    """Writes data prefixed with its length, for the interactive channel."""
+    length = bytearray()
+    encode_varint(len(data), length)
+    stream.write(length + data)
+
+
+def read_frame(stream: IO[bytes]) -> bytes | None:
+    """Reads a frame written by write_frame, or None at end of stream."""
+    length = 0
+    shift = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            if shift:
+                raise BytecodeError('truncated frame length')
+            return None
+        length |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            break
+        shift += 7
+    data = stream.read(length)
+    if len(data) != length:
+        raise BytecodeError('truncated frame')
+    return data
@@ -0,0 +1,92 @@
+import io
+
+import pytest
+
+from .bytecode import (
+    MAGIC,
+    VERSION,
+    BytecodeError,
+    decode,
+    decode_varint,
+    encode,
+    encode_varint,
+    read_frame,
+    write_frame,
+)
+from .ir import Instruction, Opcode, YolkProgram
+
+code = '\n'.join(
+    [
+        'PIPELINE begin',
+        'PUSH_STR "ls"',
+        'PUSH_STR "-l \\"é\\""',
+        'EXEC 2',
+        'PIPELINE end',
+        'PUSH_INT 300',
+        'PUSH_NUM 1.5',
+        'PUSH_STR "ls"',
+        'BINOP concat',
+        'PUSH_BOOL true',
+        'NOT',
+        'COMPARE_CHAIN lte',
+        'PRINT',
+    ]
+)
+
+
+def test_varints() -> None:
+    for value in [0, 1, 127, 128, 300, 2**32 - 1]:
+        out = bytearray(b'x')
+        encode_varint(value, out)
+        assert decode_varint(bytes(out), 1) == (value, len(out))
+    out = bytearray()
+    encode_varint(300, out)
+    assert out == b'\xac\x02'
+    with pytest.raises(BytecodeError):
+        decode_varint(b'\x80', 0)
+
+
+def test_round_trip() -> None:
+    program = YolkProgram.from_text(code)
+    data = encode(program)
+    assert data.startswith(MAGIC + bytes([VERSION]))
+    assert decode(data) == program
+    assert decode(data).to_text() == code
+    assert len(data) < len(code.encode('utf-8')) / 2
+    assert decode(encode(YolkProgram())) == YolkProgram()
+
+
+def test_strings_stored_once() -> None:
+    program = YolkProgram()
+    for _ in range(100):
+        program.append(Instruction(Opcode.PUSH_STR, 'a long string'))
+    assert encode(program).count(b'a long string') == 1
+
+
+def test_bad_programs() -> None:
+    data = encode(YolkProgram.from_text(code))
+    for bad in [
+        b'',
+        b'ELF' + data[3:],
+        MAGIC + bytes([VERSION + 1]) + data[5:],
+        data[:-1],
+        data + b'\x00',
+        MAGIC + bytes([VERSION, 0, 1, 99]),
+        MAGIC + bytes([VERSION, 0, 1, Opcode.PUSH_INT, 0]),
+        MAGIC + bytes([VERSION, 0, 1, Opcode.PUSH_BOOL, 2]),
+    ]:
+        with pytest.raises(BytecodeError):
+            decode(bad)
+
+
+def test_frames() -> None:
+    stream = io.BytesIO()
+    for data in [b'first', b'', b'x' * 1000]:
+        write_frame(stream, data)
+    stream.seek(0)
+    assert read_frame(stream) == b'first'
+    assert read_frame(stream) == b''
+    assert read_frame(stream) == b'x' * 1000
+    assert read_frame(stream) is None
+    with pytest.raises(BytecodeError):
+        read_frame(io.BytesIO(b'\x05abc'))
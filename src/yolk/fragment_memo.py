@@ -0,0 +1,66 @@
+import collections
+from typing import Any, Callable, List, OrderedDict, Tuple
+
+from lark import Tree
+
+from .ir import Fragment
+
+FragmentKey = Tuple[Any, ...]
+
+
+def child_key(child: Any) -> Any:
+    # Fragments and trees were interned first, or are kept alive by their
+    # entry, so their identity is enough. Leaves go by type and text, so 1,
+    # 1.0 and True are distinct, as are 0.0 and -0.0
+    if isinstance(child, (list, Tree)):
+        return id(child)
+    return type(child), getattr(child, 'type', None), str(child)
+
+
+class FragmentMemo:
+    """Hash-conses the fragments generated for each rule.
+
+    A rule's fragment is looked up by the rule's callback and its children,
+    so structurally identical subtrees are generated once and share one
+    fragment, and the parents of shared fragments hit the memo in turn.
+    Entries keep their children alive, so the ids in their keys are not
+    reused, and the least recently used one is dropped once there are
+    `max_size`. Fragments must not be modified.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.entries: OrderedDict[
+            FragmentKey, Tuple[List[Any], Fragment]
+        ] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        callback: Callable[[List[Any]], Fragment],
+        children: List[Any],
+    ) -> Fragment:
+        key = (callback, *map(child_key, children))
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        fragment = callback(children)
+        if self.max_size > 0:
+            self.entries[key] = (children, fragment)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return fragment
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def report(self) -> str:
+        return (
+            f'fragment memo: {self.hits} hits, {self.misses} misses, '
+            f'{len(self.entries)} of {self.max_size} entries'
+        )
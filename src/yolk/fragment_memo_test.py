@@ -0,0 +1,81 @@
+from typing import Any, List
+
+import pytest
+from lark import Token
+
+from ..cli.cli import CLIMode, EggCLI, ExecutionMode
+from . import yolk
+from .fragment_memo import FragmentMemo, child_key
+from .ir import Fragment, Instruction, Opcode
+
+
+def push(children: List[Any]) -> Fragment:
+    return [Instruction(Opcode.PUSH_STR, str(children[0]))]
+
+
+def test_least_recently_used_is_dropped() -> None:
+    memo = FragmentMemo(max_size=2)
+    fragments = [memo.get(push, [name]) for name in ['a', 'b', 'a', 'c']]
+    assert fragments[0] is fragments[2]
+    assert (memo.hits, memo.misses) == (1, 3)
+    assert [key[1][2] for key in memo.entries] == ['a', 'c']
+    assert memo.report() == 'fragment memo: 1 hits, 3 misses, 2 of 2 entries'
+    assert memo.get(push, ['b']) is not fragments[1]
+
+    disabled = FragmentMemo(max_size=0)
+    assert disabled.get(push, ['a']) is not disabled.get(push, ['a'])
+    assert disabled.misses == 2 and not disabled.entries
+
+
+def test_leaves_keyed_by_type_and_text() -> None:
+    leaves = [1, 1.0, True, 0.0, -0.0, '1', Token('INT', '1')]
+    assert len({child_key(leaf) for leaf in leaves}) == len(leaves)
+    assert child_key(Token('INT', '1')) == child_key(Token('INT', '1'))
+    assert child_key(Token('INT', '1')) != child_key(Token('NAME', '1'))
+
+
+@pytest.fixture
+def fragment_memo(monkeypatch: pytest.MonkeyPatch) -> FragmentMemo:
+    memo = FragmentMemo()
+    monkeypatch.setattr(yolk, 'fragment_memo', memo)
+    return memo
+
+
+def test_cli_shares_repeated_subtrees(fragment_memo: FragmentMemo) -> None:
+    egg_cli = EggCLI(
+        CLIMode(ExecutionMode.codegen, constant_folding=False),
+        use_profiler=False,
+    )
+    first, second = (
+        egg_cli.compile_statement(statement)
+        for statement in egg_cli.statements('say 1 + 2\nsay (1 + 2) * 3')
+    )
+    assert egg_cli.get_codegen('say (1 + 2) * 3') == (
+        'PUSH_INT 1\n'
+        'PUSH_INT 2\n'
+        'BINOP add\n'
+        'PUSH_INT 3\n'
+        'BINOP multiply\n'
+        'PRINT'
+    )
+    addition = first[0]
+    assert second[0][0] is addition
+    assert fragment_memo.hits > 0
+
+
+def test_cli_output_unchanged_by_eviction(
+    fragment_memo: FragmentMemo,
+) -> None:
+    src = 'say 1 + 2 * -3\na 1 "b" | c\n1 < 2 <= 3 == 4\nsay 1 + 2 * -3'
+    fragment_memo.max_size = 0
+    expected = EggCLI(
+        CLIMode(ExecutionMode.codegen, statement_cache_size=0),
+        use_profiler=False,
+    ).get_codegen(src)
+    fragment_memo.max_size = 2
+    egg_cli = EggCLI(
+        CLIMode(ExecutionMode.codegen, statement_cache_size=0),
+        use_profiler=False,
+    )
+    assert egg_cli.get_codegen(src) == expected
+    assert len(fragment_memo.entries) == 2
@@ -0,0 +1,173 @@
+from array import array
+from enum import IntEnum
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+from .string_utilities import repr_double_quoted, unrepr_double_quoted
+
+
+class Opcode(IntEnum):
+    PUSH_INT = 1
+    PUSH_NUM = 2
+    PUSH_STR = 3
+    PUSH_BOOL = 4
+    NEGATE = 5
+    NOT = 6
+    BINOP = 7
+    COMPARE = 8
+    COMPARE_CHAIN = 9
+    PRINT = 10
+    ASSERT = 11
+    EXEC = 12
+    PIPELINE = 13
+
+
+# Opcodes whose operand is an index into the constant pool. Numbers are kept
+# as written, since the VM parses them from text
+CONSTANT_OPCODES = frozenset(
+    [Opcode.PUSH_INT, Opcode.PUSH_NUM, Opcode.PUSH_STR]
+)
+
+COMPARISONS = ('equal', 'unequal', 'greater', 'gte', 'less', 'lte')
+
+# Opcodes whose operand is an index into a fixed list of names
+OPERAND_NAMES: Dict[Opcode, Tuple[str, ...]] = {
+    Opcode.PUSH_BOOL: ('false', 'true'),
+    Opcode.BINOP: (
+        'add',
+        'subtract',
+        'multiply',
+        'divide',
+        'int_divide',
+        'modulus',
+        'power',
+        'concat',
+        'and',
+        'or',
+    ),
+    Opcode.COMPARE: COMPARISONS,
+    Opcode.COMPARE_CHAIN: COMPARISONS,
+    Opcode.PIPELINE: ('begin', 'next', 'end'),
+}
+
+
+class Instruction(NamedTuple):
+    """One instruction, with constants held by value until interned."""
+
+    opcode: Opcode
+    operand: int | str = 0
+
+    @classmethod
+    def named(cls, opcode: Opcode, name: str) -> 'Instruction':
+        return cls(opcode, OPERAND_NAMES[opcode].index(name))
+
+    @property
+    def operand_name(self) -> str:
+        assert isinstance(self.operand, int)
+        return OPERAND_NAMES[self.opcode][self.operand]
+
+    def text(self) -> str:
+        if self.opcode == Opcode.PUSH_STR:
+            assert isinstance(self.operand, str)
+            return f'PUSH_STR {repr_double_quoted(self.operand)}'
+        if self.opcode in CONSTANT_OPCODES or self.opcode == Opcode.EXEC:
+            return f'{self.opcode.name} {self.operand}'
+        if self.opcode in OPERAND_NAMES:
+            return f'{self.opcode.name} {self.operand_name}'
+        return self.opcode.name
+
+    @classmethod
+    def from_text(cls, line: str) -> 'Instruction':
+        name, _, operand = line.partition(' ')
+        opcode = Opcode[name]
+        if opcode == Opcode.PUSH_STR:
+            return cls(opcode, unrepr_double_quoted(operand))
+        if opcode in CONSTANT_OPCODES:
+            return cls(opcode, operand)
+        if opcode == Opcode.EXEC:
+            return cls(opcode, int(operand))
+        if opcode in OPERAND_NAMES:
+            return cls.named(opcode, operand)
+        return cls(opcode)
+
+
+class YolkProgram:
+    """An instruction stream stored as parallel opcode and operand arrays.
+
+    Constant operands are indexes into a pool of distinct strings, so the
+    program holds no per-instruction objects until it is serialized.
+    """
+
+    def __init__(self) -> None:
+        self.opcodes = array('B')
+        self.operands = array('I')
+        self.constants: List[str] = []
+        self.constant_ids: Dict[str, int] = {}
+
+    def constant(self, value: str) -> int:
+        if (index := self.constant_ids.get(value)) is None:
+            index = self.constant_ids[value] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def append(self, instruction: Instruction) -> None:
+        opcode, operand = instruction
+        self.opcodes.append(opcode)
+        if isinstance(operand, str):
+            self.operands.append(self.constant(operand))
+        else:
+            self.operands.append(operand)
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+    def __getitem__(self, index: int) -> Instruction:
+        opcode = Opcode(self.opcodes[index])
+        operand = self.operands[index]
+        if opcode in CONSTANT_OPCODES:
+            return Instruction(opcode, self.constants[operand])
+        return Instruction(opcode, operand)
+
+    def __iter__(self) -> Iterator[Instruction]:
+        for i in range(len(self.opcodes)):
+            yield self[i]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, YolkProgram):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def text_lines(self) -> Iterator[str]:
+        for instruction in self:
+            yield instruction.text()
+
+    def to_text(self) -> str:
+        """Serializes the program to the VM's line based text format."""
+        return '\n'.join(self.text_lines())
+
+    @classmethod
+    def from_text(cls, text: str) -> 'YolkProgram':
+        program = cls()
+        for line in text.splitlines():
+            if line:
+                program.append(Instruction.from_text(line))
+        return program
+
+
+# Code is built as nested lists of instructions, so each node only costs as
+# much as its number of children, and flattened once at the end
+Fragment = List['Instruction | Fragment']
+
+
+def flatten(fragment: Fragment) -> YolkProgram:
+    program = YolkProgram()
+    stack: List[Iterator[Instruction | Fragment]] = [iter(fragment)]
+    while stack:
+        for part in stack[-1]:
+            if isinstance(part, Instruction):
+                program.append(part)
+            else:
+                stack.append(iter(part))
+                break
+        else:
+            stack.pop()
+    return program
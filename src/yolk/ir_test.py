@@ -0,0 +1,77 @@
+from .ir import (
+    CONSTANT_OPCODES,
+    OPERAND_NAMES,
+    Fragment,
+    Instruction,
+    Opcode,
+    YolkProgram,
+    flatten,
+)
+
+
+def test_instruction_text() -> None:
+    assert Instruction(Opcode.PUSH_INT, '007').text() == 'PUSH_INT 007'
+    assert Instruction(Opcode.PUSH_NUM, '1.50').text() == 'PUSH_NUM 1.50'
+    assert Instruction(Opcode.PUSH_STR, 'a"b').text() == 'PUSH_STR "a\\"b"'
+    assert Instruction(Opcode.EXEC, 3).text() == 'EXEC 3'
+    assert Instruction(Opcode.NEGATE).text() == 'NEGATE'
+    assert (
+        Instruction.named(Opcode.PUSH_BOOL, 'true').text() == 'PUSH_BOOL true'
+    )
+    assert (
+        Instruction.named(Opcode.COMPARE_CHAIN, 'lte').text()
+        == 'COMPARE_CHAIN lte'
+    )
+    for opcode, names in OPERAND_NAMES.items():
+        for name in names:
+            instruction = Instruction.named(opcode, name)
+            assert instruction.operand_name == name
+            assert instruction.text() == f'{opcode.name} {name}'
+
+
+def test_constant_pool() -> None:
+    program = YolkProgram()
+    program.append(Instruction(Opcode.PUSH_STR, '1'))
+    program.append(Instruction(Opcode.PUSH_INT, '1'))
+    program.append(Instruction(Opcode.PUSH_INT, '2'))
+    program.append(Instruction(Opcode.EXEC, 2))
+    assert program.constants == ['1', '2']
+    assert list(program.opcodes) == [
+        Opcode.PUSH_STR,
+        Opcode.PUSH_INT,
+        Opcode.PUSH_INT,
+        Opcode.EXEC,
+    ]
+    assert list(program.operands) == [0, 0, 1, 2]
+    assert program[1] == Instruction(Opcode.PUSH_INT, '1')
+    assert program[3] == Instruction(Opcode.EXEC, 2)
+    assert program.to_text() == 'PUSH_STR "1"\nPUSH_INT 1\nPUSH_INT 2\nEXEC 2'
+
+
+def test_every_opcode_round_trips() -> None:
+    instructions = []
+    for opcode in Opcode:
+        if opcode in CONSTANT_OPCODES:
+            instructions.append(Instruction(opcode, 'x'))
+        elif opcode in OPERAND_NAMES:
+            instructions.append(Instruction(opcode, 1))
+        else:
+            instructions.append(Instruction(opcode, 0))
+    program = YolkProgram()
+    for instruction in instructions:
+        program.append(instruction)
+    assert list(program) == instructions
+    assert list(program.text_lines()) == [i.text() for i in instructions]
+    assert YolkProgram.from_text(program.to_text()) == program
+
+
+def test_flatten() -> None:
+    push = Instruction(Opcode.PUSH_INT, '1')
+    shared: Fragment = [push, []]
+    add = Instruction.named(Opcode.BINOP, 'add')
+    fragment: Fragment = [shared, [[shared, add]], Instruction(Opcode.PRINT)]
+    expected = YolkProgram()
+    for instruction in [push, push, add, Instruction(Opcode.PRINT)]:
+        expected.append(instruction)
+    assert flatten(fragment) == expected
+    assert flatten([]) == YolkProgram()
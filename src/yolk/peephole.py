@@ -0,0 +1,103 @@
+import collections
+from typing import Callable, Iterable, List, NamedTuple, Sequence
+
+from ..frontend.folding import fold_unary
+from .ir import Instruction, Opcode, YolkProgram
+
+# Rewrites a window of instructions, or returns None to leave it alone
+Rewrite = Callable[[Sequence[Instruction]], List[Instruction] | None]
+
+
+class PeepholeRule(NamedTuple):
+    name: str
+    width: int
+    rewrite: Rewrite
+
+
+# Instructions that always leave a boolean on top of the stack
+BOOLEAN_RESULTS = frozenset(
+    [Opcode.PUSH_BOOL, Opcode.NOT, Opcode.COMPARE, Opcode.COMPARE_CHAIN]
+)
+
+
+def negate_literal(window: Sequence[Instruction]) -> List[Instruction] | None:
+    push, negate = window
+    if negate.opcode != Opcode.NEGATE:
+        return None
+    if push.opcode == Opcode.PUSH_INT:
+        value: int | float = int(push.operand)
+    elif push.opcode == Opcode.PUSH_NUM:
+        value = float(push.operand)
+    else:
+        return None
+    negated = fold_unary('unary_negate', value)
+    if negated is None:
+        return None
+    text = repr(negated) if push.opcode == Opcode.PUSH_NUM else str(negated)
+    return [Instruction(push.opcode, text)]
+
+
+def not_literal(window: Sequence[Instruction]) -> List[Instruction] | None:
+    push, not_ = window
+    if push.opcode != Opcode.PUSH_BOOL or not_.opcode != Opcode.NOT:
+        return None
+    return [Instruction(Opcode.PUSH_BOOL, 1 - int(push.operand))]
+
+
+def double_not(window: Sequence[Instruction]) -> List[Instruction] | None:
+    # Only a no-op when the operand is known to be a boolean
+    producer, first, second = window
+    if (
+        producer.opcode in BOOLEAN_RESULTS
+        and first.opcode == Opcode.NOT
+        and second.opcode == Opcode.NOT
+    ):
+        return [producer]
+    return None
+
+
+DEFAULT_RULES = [
+    PeepholeRule('negate_literal', 2, negate_literal),
+    PeepholeRule('not_literal', 2, not_literal),
+    PeepholeRule('double_not', 3, double_not),
+]
+
+
+class PeepholeOptimizer:
+    """Rewrites short windows of instructions with a list of rules.
+
+    Each instruction is appended to the output and the rules are tried on
+    the end of the output until none applies, so a rewrite can enable
+    another one on the instructions before it.
+    """
+
+    def __init__(self, rules: Iterable[PeepholeRule] = DEFAULT_RULES):
+        self.rules = list(rules)
+        self.hits: collections.Counter[str] = collections.Counter()
+
+    def optimize(self, program: YolkProgram) -> YolkProgram:
+        output: List[Instruction] = []
+        for instruction in program:
+            output.append(instruction)
+            while self.rewrite_end(output):
+                pass
+        optimized = YolkProgram()
+        for instruction in output:
+            optimized.append(instruction)
+        return optimized
+
+    def rewrite_end(self, output: List[Instruction]) -> bool:
+        for rule in self.rules:
+            if len(output) < rule.width:
+                continue
+            replacement = rule.rewrite(output[-rule.width :])
+            if replacement is not None:
+                output[-rule.width :] = replacement
+                self.hits[rule.name] += 1
+                return True
+        return False
+
+    def report(self) -> str:
+        return '\n'.join(
+            f'{rule.name}: {self.hits[rule.name]}' for rule in self.rules
+        )
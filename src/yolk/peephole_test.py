@@ -0,0 +1,77 @@
+from typing import List, Sequence
+
+from ..frontend.parser import get_parser
+from .ir import Instruction, Opcode, YolkProgram, flatten
+from .peephole import PeepholeOptimizer, PeepholeRule
+from .yolk import YolkGenerator
+
+parser = get_parser()
+
+
+def generate(src: str) -> YolkProgram:
+    return flatten(YolkGenerator().transform(parser.parse(src)))   # type: ignore
+
+
+def optimize(src: str, optimizer: PeepholeOptimizer) -> List[str]:
+    return list(optimizer.optimize(generate(src)).text_lines())
+
+
+def test_negate_literal() -> None:
+    optimizer = PeepholeOptimizer()
+    assert optimize('say -1 + -2.50', optimizer) == [
+        'PUSH_INT -1',
+        'PUSH_NUM -2.5',
+        'BINOP add',
+        'PRINT',
+    ]
+    assert optimize('say -(-1)', optimizer) == ['PUSH_INT 1', 'PRINT']
+    assert optimizer.hits['negate_literal'] == 4
+
+
+def test_negate_left_to_the_vm() -> None:
+    optimizer = PeepholeOptimizer()
+    assert optimize('say -"a"', optimizer) == [
+        'PUSH_STR "a"',
+        'NEGATE',
+        'PRINT',
+    ]
+    assert optimize('say -(1 + 2)', optimizer)[-2:] == ['NEGATE', 'PRINT']
+    assert optimizer.hits['negate_literal'] == 0
+
+
+def test_not() -> None:
+    optimizer = PeepholeOptimizer()
+    assert optimize('assert not (not (not true))', optimizer) == [
+        'PUSH_BOOL false',
+        'ASSERT',
+    ]
+    assert optimize('assert not (not (1 < 2.0))', optimizer) == [
+        'PUSH_INT 1',
+        'PUSH_NUM 2.0',
+        'COMPARE less',
+        'ASSERT',
+    ]
+    # Not a no-op if the operand is not a boolean
+    assert optimize('assert not (not 1)', optimizer) == [
+        'PUSH_INT 1',
+        'NOT',
+        'NOT',
+        'ASSERT',
+    ]
+    assert optimizer.hits['not_literal'] == 3
+    assert optimizer.hits['double_not'] == 1
+    assert optimizer.report() == (
+        'negate_literal: 0\nnot_literal: 3\ndouble_not: 1'
+    )
+
+
+def test_custom_rules() -> None:
+    def drop_print(window: Sequence[Instruction]) -> List[Instruction] | None:
+        return [] if window[0].opcode == Opcode.PRINT else None
+
+    optimizer = PeepholeOptimizer([PeepholeRule('drop_print', 1, drop_print)])
+    assert optimize('say -1', optimizer) == ['PUSH_INT 1', 'NEGATE']
+    assert optimizer.report() == 'drop_print: 1'
+    assert PeepholeOptimizer([]).optimize(generate('say -1')) == generate(
+        'say -1'
+    )
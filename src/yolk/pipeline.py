@@ -0,0 +1,126 @@
+import os
+import selectors
+import subprocess
+from typing import IO, Any, List, NamedTuple, Sequence
+
+# Size of each read from the pipeline's output and write to its input
+CHUNK_SIZE = 1 << 16
+
+
+class StageStatus(NamedTuple):
+    args: Sequence[str]
+    returncode: int
+
+
+class PipelineResult(NamedTuple):
+    output: bytes
+    errors: bytes
+    statuses: List[StageStatus]
+
+    @property
+    def returncode(self) -> int:
+        # Like /bin/sh, a pipeline's status is the status of its last stage
+        return self.statuses[-1].returncode
+
+
+def start_stages(
+    commands: Sequence[Sequence[str]], feed_input: bool, stderr: int
+) -> List['subprocess.Popen[bytes]']:
+    """Starts every stage at once, each reading the one before it."""
+    procs: List[subprocess.Popen[bytes]] = []
+    stdin: Any = subprocess.PIPE if feed_input else subprocess.DEVNULL
+    try:
+        for args in commands:
+            proc = subprocess.Popen(
+                args, stdin=stdin, stdout=subprocess.PIPE, stderr=stderr
+            )
+            if procs:
+                # Only the child keeps the read end, so the stage before it
+                # gets SIGPIPE if this one exits early
+                assert procs[-1].stdout is not None
+                procs[-1].stdout.close()
+            procs.append(proc)
+            stdin = proc.stdout
+    except OSError:
+        for proc in procs:
+            proc.kill()
+            proc.wait()
+        raise
+    return procs
+
+
+def run_pipeline(
+    commands: Sequence[Sequence[str]], input_data: bytes | None = None
+) -> PipelineResult:
+    """Runs commands connected by OS pipes, like `a | b | c` in a shell.
+
+    Data between stages never passes through this process. Only the input
+    of the first stage, the output of the last and the stderr of all stages
+    are handled here, with a selector so none of them can fill up and stall
+    the others. Stages are reaped as they exit.
+    """
+    if not commands:
+        raise ValueError('a pipeline needs at least one command')
+    errors_read, errors_write = os.pipe()
+    try:
+        procs = start_stages(commands, input_data is not None, errors_write)
+    except OSError:
+        os.close(errors_read)
+        raise
+    finally:
+        os.close(errors_write)
+
+    output = bytearray()
+    errors = bytearray()
+    returncodes: List[int | None] = [None] * len(procs)
+    selector = selectors.DefaultSelector()
+    last_stdout = procs[-1].stdout
+    assert last_stdout is not None
+    selector.register(last_stdout, selectors.EVENT_READ, output)
+    selector.register(errors_read, selectors.EVENT_READ, errors)
+    first_stdin: IO[bytes] | None = procs[0].stdin
+    remaining = memoryview(input_data or b'')
+    if first_stdin is not None:
+        if remaining:
+            os.set_blocking(first_stdin.fileno(), False)
+            selector.register(first_stdin, selectors.EVENT_WRITE)
+        else:
+            first_stdin.close()
+
+    try:
+        while selector.get_map():
+            for key, _ in selector.select():
+                if key.fileobj is first_stdin:
+                    assert first_stdin is not None
+                    try:
+                        written = os.write(
+                            first_stdin.fileno(), remaining[:CHUNK_SIZE]
+                        )
+                    except BrokenPipeError:
+                        written = len(remaining)
+                    remaining = remaining[written:]
+                    if not remaining:
+                        selector.unregister(first_stdin)
+                        first_stdin.close()
+                    continue
+                fd = key.fd
+                chunk = os.read(fd, CHUNK_SIZE)
+                if chunk:
+                    key.data.extend(chunk)
+                else:
+                    selector.unregister(key.fileobj)
+            for i, proc in enumerate(procs):
+                if returncodes[i] is None:
+                    returncodes[i] = proc.poll()
+    finally:
+        selector.close()
+        os.close(errors_read)
+        last_stdout.close()
+        if first_stdin is not None and not first_stdin.closed:
+            first_stdin.close()
+
+    statuses = [
+        StageStatus(args, proc.wait() if code is None else code)
+        for args, proc, code in zip(commands, procs, returncodes)
+    ]
+    return PipelineResult(bytes(output), bytes(errors), statuses)
@@ -0,0 +1,76 @@
+import pathlib
+import shlex
+from typing import List
+
+import pytest
+
+from .pipeline import StageStatus, run_pipeline
+
+
+def test_pipes_stages_together() -> None:
+    result = run_pipeline([['echo', 'hello'], ['tr', 'a-z', 'A-Z'], ['rev']])
+    assert result.output == b'OLLEH\n'
+    assert result.errors == b''
+    assert result.returncode == 0
+
+
+def test_feeds_input() -> None:
+    assert run_pipeline([['cat']], b'abc').output == b'abc'
+    assert run_pipeline([['cat']], b'').output == b''
+    # More than fits in any pipe buffer, in and out at once
+    data = b'0123456789abcdef\n' * (1 << 18)
+    assert run_pipeline([['cat'], ['cat']], data).output == data
+    assert run_pipeline([['cat'], ['wc', '-c']], data).output.strip() == (
+        str(len(data)).encode()
+    )
+
+
+def test_reports_every_stage() -> None:
+    result = run_pipeline(
+        [['sh', '-c', 'echo oops >&2; exit 3'], ['cat'], ['true']]
+    )
+    assert result.statuses == [
+        StageStatus(['sh', '-c', 'echo oops >&2; exit 3'], 3),
+        StageStatus(['cat'], 0),
+        StageStatus(['true'], 0),
+    ]
+    assert result.errors == b'oops\n'
+    # Like /bin/sh, only the last stage decides the pipeline's status
+    assert result.returncode == 0
+    assert run_pipeline([['true'], ['false']]).returncode == 1
+
+
+def test_stages_run_concurrently(tmp_path: pathlib.Path) -> None:
+    # Run one after another, `yes` would never finish
+    result = run_pipeline([['yes'], ['head', '-n', '1']])
+    assert result.output == b'y\n'
+    assert result.statuses[-1].returncode == 0
+
+    # Each stage waits for the other's file, which only works if both run
+    # at once, and gives up after a while otherwise
+    def handshake(mine: str, theirs: str) -> List[str]:
+        mine, theirs = shlex.quote(mine), shlex.quote(theirs)
+        return [
+            'sh',
+            '-c',
+            f'touch {mine}; i=0; '
+            f'while [ ! -e {theirs} ] && [ $i -lt 1000 ]; do '
+            'sleep 0.01; i=$((i + 1)); done; '
+            f'[ -e {theirs} ]',
+        ]
+
+    a, b = str(tmp_path / 'a'), str(tmp_path / 'b')
+    result = run_pipeline([handshake(a, b), handshake(b, a)])
+    assert [status.returncode for status in result.statuses] == [0, 0]
+
+
+def test_ignores_unread_input() -> None:
+    result = run_pipeline([['true']], b'x' * (1 << 20))
+    assert result.returncode == 0
+
+
+def test_missing_command() -> None:
+    with pytest.raises(FileNotFoundError):
+        run_pipeline([['echo', 'hello'], ['nonexistent-command']])
+    with pytest.raises(ValueError):
+        run_pipeline([])
@@ -0,0 +1,45 @@
+from typing import Tuple
+
+from .bytecode import BytecodeError, decode_varint, encode_varint
+
+# The line a VM prints for -capabilities when it accepts framed requests.
+# With -framed, each program is sent as a request frame holding an id and
+# the program, and the VM answers each one with a response frame holding
+# the id and everything the program wrote to stdout and stderr.
+FRAMES_VERSION = 1
+FRAMES_CAPABILITY = f'frames {FRAMES_VERSION}'
+
+
+def encode_request(request_id: int, program: bytes) -> bytes:
+    out = bytearray()
+    encode_varint(request_id, out)
+    return bytes(out + program)
+
+
+def decode_request(frame: bytes) -> Tuple[int, bytes]:
+    request_id, position = decode_varint(frame, 0)
+    return request_id, frame[position:]
+
+
+def encode_response(request_id: int, out: bytes, err: bytes) -> bytes:
+    response = bytearray()
+    encode_varint(request_id, response)
+    for stream in (out, err):
+        encode_varint(len(stream), response)
+        response += stream
+    return bytes(response)
+
+
+def decode_response(frame: bytes) -> Tuple[int, bytes, bytes]:
+    request_id, position = decode_varint(frame, 0)
+    streams = []
+    for _ in range(2):
+        length, position = decode_varint(frame, position)
+        if position + length > len(frame):
+            raise BytecodeError('truncated response')
+        streams.append(frame[position : position + length])
+        position += length
+    if position != len(frame):
+        raise BytecodeError('trailing data after the response')
+    out, err = streams
+    return request_id, out, err
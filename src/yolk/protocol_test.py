@@ -0,0 +1,24 @@
+import pytest
+
+from .bytecode import BytecodeError
+from .protocol import (
+    decode_request,
+    decode_response,
+    encode_request,
+    encode_response,
+)
+
+
+def test_requests() -> None:
+    for request_id in [0, 1, 200, 2**40]:
+        frame = encode_request(request_id, b'PUSH_INT 1\n')
+        assert decode_request(frame) == (request_id, b'PUSH_INT 1\n')
+
+
+def test_responses() -> None:
+    frame = encode_response(300, b'1\n2\n', b'error\n')
+    assert decode_response(frame) == (300, b'1\n2\n', b'error\n')
+    assert decode_response(encode_response(0, b'', b'')) == (0, b'', b'')
+    for bad in [frame[:-1], frame + b'x']:
+        with pytest.raises(BytecodeError):
+            decode_response(bad)
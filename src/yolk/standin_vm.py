@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""A stand-in for the Yolk VM, used to test the CLI's channel to it.
+
+Like the VM it runs instructions read in -interactive mode, as text lines or
+as bytecode frames if it was asked to, and writes each value popped by PRINT
+on its own line. With -framed, programs come in request frames and their
+output goes back in response frames. It only knows the SUPPORTED opcodes:
+literals, operators, comparisons and PRINT.
+"""
+import argparse
+import io
+import operator
+import sys
+import time
+from typing import IO, Any, Callable, Dict, Iterable, List
+
+from .bytecode import CAPABILITY, decode, read_frame, write_frame
+from .ir import Instruction, Opcode
+from .protocol import FRAMES_CAPABILITY, decode_request, encode_response
+from .vm import YolkRuntimeError
+
+BINOPS: Dict[str, Callable[[Any, Any], Any]] = {
+    'add': operator.add,
+    'subtract': operator.sub,
+    'multiply': operator.mul,
+    'divide': operator.truediv,
+    'int_divide': operator.floordiv,
+    'modulus': operator.mod,
+    'power': operator.pow,
+    'concat': lambda a, b: f'{show(a)}{show(b)}',
+    'and': lambda a, b: a and b,
+    'or': lambda a, b: a or b,
+}
+
+COMPARES: Dict[str, Callable[[Any, Any], bool]] = {
+    'equal': operator.eq,
+    'unequal': operator.ne,
+    'greater': operator.gt,
+    'gte': operator.ge,
+    'less': operator.lt,
+    'lte': operator.le,
+}
+
+
+SUPPORTED = frozenset(
+    [
+        Opcode.PUSH_INT,
+        Opcode.PUSH_NUM,
+        Opcode.PUSH_STR,
+        Opcode.PUSH_BOOL,
+        Opcode.NEGATE,
+        Opcode.NOT,
+        Opcode.BINOP,
+        Opcode.COMPARE,
+        Opcode.COMPARE_CHAIN,
+        Opcode.PRINT,
+    ]
+)
+
+
+class UnsupportedInstruction(YolkRuntimeError):
+    def __init__(self, opcode: Opcode):
+        supported = ', '.join(sorted(o.name for o in SUPPORTED))
+        super().__init__(
+            f'the stand-in VM cannot run {opcode.name}, only {supported}'
+        )
+        self.opcode = opcode
+
+
+def show(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def run(
+    instructions: Iterable[Instruction],
+    stack: List[Any],
+    out: IO[bytes],
+    delay: float = 0,
+) -> None:
+    for instruction in instructions:
+        opcode, operand = instruction
+        if opcode not in SUPPORTED:
+            raise UnsupportedInstruction(opcode)
+        if opcode == Opcode.PUSH_INT:
+            stack.append(int(operand))
+        elif opcode == Opcode.PUSH_NUM:
+            stack.append(float(operand))
+        elif opcode == Opcode.PUSH_STR:
+            stack.append(operand)
+        elif opcode == Opcode.PUSH_BOOL:
+            stack.append(operand == 1)
+        elif opcode == Opcode.NEGATE:
+            stack.append(-stack.pop())
+        elif opcode == Opcode.NOT:
+            stack.append(not stack.pop())
+        elif opcode == Opcode.BINOP:
+            b = stack.pop()
+            stack.append(BINOPS[instruction.operand_name](stack.pop(), b))
+        elif opcode in (Opcode.COMPARE, Opcode.COMPARE_CHAIN):
+            b = stack.pop()
+            stack.append(COMPARES[instruction.operand_name](stack.pop(), b))
+            # A chained comparison keeps its right side for the next one
+            if opcode == Opcode.COMPARE_CHAIN:
+                stack.append(b)
+        elif opcode == Opcode.PRINT:
+            # Stands in for the time real programs take to run
+            if delay:
+                time.sleep(delay)
+            if stack:
+                out.write(f'{show(stack.pop())}\n'.encode('utf-8'))
+                out.flush()
+
+
+def parse_program(data: bytes, bytecode: bool) -> Iterable[Instruction]:
+    if bytecode:
+        return decode(data)
+    lines = data.decode('utf-8').splitlines()
+    return [Instruction.from_text(line) for line in lines if line]
+
+
+def serve_requests(
+    bytecode: bool, stdin: IO[bytes], stdout: IO[bytes], delay: float = 0
+) -> None:
+    stack: List[Any] = []
+    while (frame := read_frame(stdin)) is not None:
+        request_id, data = decode_request(frame)
+        out = io.BytesIO()
+        err = b''
+        try:
+            run(parse_program(data, bytecode), stack, out, delay)
+        except Exception as e:
+            err = f'error: {e!r}\n'.encode('utf-8')
+            stack.clear()
+        write_frame(stdout, encode_response(request_id, out.getvalue(), err))
+        stdout.flush()
+
+
+def interactive(
+    bytecode: bool, stdin: IO[bytes], stdout: IO[bytes], delay: float = 0
+) -> None:
+    stack: List[Any] = []
+    if bytecode:
+        while (frame := read_frame(stdin)) is not None:
+            run(decode(frame), stack, stdout, delay)
+    else:
+        for line in stdin:
+            if text := line.decode('utf-8').rstrip('\n'):
+                run([Instruction.from_text(text)], stack, stdout, delay)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser('standin_vm')
+    arg_parser.add_argument('-capabilities', action='store_true')
+    arg_parser.add_argument('-interactive', action='store_true')
+    arg_parser.add_argument(
+        '-bytecode',
+        help='Read bytecode frames instead of text in interactive mode.',
+        action='store_true',
+    )
+    arg_parser.add_argument(
+        '-framed',
+        help='Read request frames and answer with response frames.',
+        action='store_true',
+    )
+    arg_parser.add_argument(
+        '-text-only',
+        help='Act like a VM that does not know the bytecode format.',
+        action='store_true',
+    )
+    arg_parser.add_argument(
+        '-unframed',
+        help='Act like a VM that does not know framed requests.',
+        action='store_true',
+    )
+    arg_parser.add_argument(
+        '-delay',
+        help='Seconds to wait before each PRINT, to act like a slower VM.',
+        type=float,
+        default=0,
+    )
+    args = arg_parser.parse_args()
+
+    if args.capabilities:
+        if not args.text_only:
+            print(CAPABILITY)
+        if not args.unframed:
+            print(FRAMES_CAPABILITY)
+    elif args.interactive and args.framed:
+        serve_requests(
+            args.bytecode, sys.stdin.buffer, sys.stdout.buffer, args.delay
+        )
+    elif args.interactive:
+        interactive(
+            args.bytecode, sys.stdin.buffer, sys.stdout.buffer, args.delay
+        )
+
+
+if __name__ == '__main__':
+    main()
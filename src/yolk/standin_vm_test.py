@@ -0,0 +1,31 @@
+import io
+from typing import Any, List
+
+import pytest
+
+from .ir import Instruction, Opcode
+from .standin_vm import SUPPORTED, UnsupportedInstruction, run
+from .vm import YolkRuntimeError
+
+
+def test_runs_supported_opcodes() -> None:
+    out = io.BytesIO()
+    stack: List[Any] = []
+    program = [
+        Instruction(Opcode.PUSH_INT, 2),
+        Instruction(Opcode.PUSH_INT, 3),
+        Instruction.named(Opcode.BINOP, 'add'),
+        Instruction(Opcode.PRINT),
+    ]
+    run(program, stack, out)
+    assert out.getvalue() == b'5\n'
+
+
+def test_unsupported_opcode() -> None:
+    assert Opcode.EXEC not in SUPPORTED
+    with pytest.raises(YolkRuntimeError) as e:
+        run([Instruction(Opcode.EXEC, 1)], [], io.BytesIO())
+    assert isinstance(e.value, UnsupportedInstruction)
+    assert e.value.opcode == Opcode.EXEC
+    assert 'cannot run EXEC' in str(e.value)
+    assert 'PUSH_INT' in str(e.value)
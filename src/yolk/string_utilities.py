@@ -3,3 +3,10 @@
 def repr_double_quoted(text: str) -> str:
     inner = ''.join('\\"' if c == '"' else c for c in text)
     return f'"{inner}"'
+
+
+# Inverse of repr_double_quoted.
+def unrepr_double_quoted(text: str) -> str:
+    if len(text) < 2 or text[0] != '"' or text[-1] != '"':
+        raise ValueError(f'not a double quoted string: {text}')
+    return text[1:-1].replace('\\"', '"')
@@ -1,4 +1,6 @@
-from .string_utilities import repr_double_quoted
+import pytest
+
+from .string_utilities import repr_double_quoted, unrepr_double_quoted
 
 
 def test_repr_double_quoted() -> None:
@@ -13,3 +15,10 @@ def test_repr_double_quoted() -> None:
 
     for test_case, expected in test_cases.items():
         assert repr_double_quoted(test_case) == expected
+
+
+def test_unrepr_double_quoted() -> None:
+    for text in ['foo', 'h"i', '"foo"', 'a\\"b\\', '']:
+        assert unrepr_double_quoted(repr_double_quoted(text)) == text
+    with pytest.raises(ValueError):
+        unrepr_double_quoted('foo')
@@ -0,0 +1,313 @@
+import io
+import math
+import operator
+import sys
+from typing import IO, Any, Callable, Dict, List, NamedTuple, Tuple
+
+from .ir import OPERAND_NAMES, Opcode, YolkProgram
+from .pipeline import StageStatus, run_pipeline
+
+INT_MIN = -(2**63)
+INT_MAX = 2**63 - 1
+
+
+class YolkRuntimeError(Exception):
+    pass
+
+
+class Command(NamedTuple):
+    """An EXEC inside a pipeline, run when the pipeline ends."""
+
+    args: Tuple[str, ...]
+
+
+def show(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def type_name(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'bool'
+    return {int: 'int', float: 'float', str: 'string'}.get(
+        type(value), type(value).__name__
+    )
+
+
+def is_number(value: Any) -> bool:
+    return type(value) in (int, float)
+
+
+def checked(value: Any) -> Any:
+    if type(value) is int and not INT_MIN <= value <= INT_MAX:
+        raise YolkRuntimeError('integer overflow')
+    return value
+
+
+def arithmetic(
+    name: str, function: Callable[[Any, Any], Any]
+) -> Callable[[Any, Any], Any]:
+    def _inner(a: Any, b: Any) -> Any:
+        if not (is_number(a) and is_number(b)):
+            raise YolkRuntimeError(
+                f'cannot {name} {type_name(a)} and {type_name(b)}'
+            )
+        try:
+            return checked(function(a, b))
+        except ZeroDivisionError:
+            raise YolkRuntimeError('division by zero') from None
+        except OverflowError:
+            raise YolkRuntimeError('float overflow') from None
+        except ValueError:
+            raise YolkRuntimeError(f'cannot {name} {a} and {b}') from None
+
+    return _inner
+
+
+def logical(
+    name: str, function: Callable[[bool, bool], bool]
+) -> Callable[[Any, Any], Any]:
+    def _inner(a: Any, b: Any) -> Any:
+        if type(a) is not bool or type(b) is not bool:
+            raise YolkRuntimeError(
+                f'cannot {name} {type_name(a)} and {type_name(b)}'
+            )
+        return function(a, b)
+
+    return _inner
+
+
+def ordering(
+    function: Callable[[Any, Any], bool]
+) -> Callable[[Any, Any], Any]:
+    def _inner(a: Any, b: Any) -> Any:
+        if is_number(a) and is_number(b) or type(a) is type(b) is str:
+            return function(a, b)
+        raise YolkRuntimeError(
+            f'cannot order {type_name(a)} and {type_name(b)}'
+        )
+
+    return _inner
+
+
+def equality(equal: bool) -> Callable[[Any, Any], Any]:
+    def _inner(a: Any, b: Any) -> Any:
+        # Numbers compare by value, anything else only to its own type
+        same = is_number(a) and is_number(b) or type(a) is type(b)
+        return (same and a == b) == equal
+
+    return _inner
+
+
+def power(a: Any, b: Any) -> Any:
+    if type(a) is int and type(b) is int and b >= 0:
+        # Checked before computing, since the result can be enormous
+        if abs(a) > 1 and b >= 64:
+            raise YolkRuntimeError('integer overflow')
+        return a**b
+    return math.pow(a, b)
+
+
+BINOPS: Dict[str, Callable[[Any, Any], Any]] = {
+    'add': arithmetic('add', operator.add),
+    'subtract': arithmetic('subtract', operator.sub),
+    'multiply': arithmetic('multiply', operator.mul),
+    'divide': arithmetic('divide', operator.truediv),
+    'int_divide': arithmetic('int_divide', operator.floordiv),
+    'modulus': arithmetic('modulus', operator.mod),
+    'power': arithmetic('power', power),
+    'concat': lambda a, b: show(a) + show(b),
+    'and': logical('and', operator.and_),
+    'or': logical('or', operator.or_),
+}
+
+COMPARISONS: Dict[str, Callable[[Any, Any], Any]] = {
+    'equal': equality(True),
+    'unequal': equality(False),
+    'greater': ordering(operator.gt),
+    'gte': ordering(operator.ge),
+    'less': ordering(operator.lt),
+    'lte': ordering(operator.le),
+}
+
+
+class YolkVM:
+    """Runs Yolk programs in this process.
+
+    Instructions are dispatched through a table indexed by opcode, and
+    operators through tables indexed by operand. The stack persists between
+    programs, like the interactive mode of the external VM. EXEC runs a
+    command and pushes its output; inside a pipeline the commands are
+    collected and started together when it ends, connected by OS pipes.
+    """
+
+    def __init__(self, out: IO[str] | None = None, err: IO[str] | None = None):
+        self.out = out or sys.stdout
+        self.err = err or sys.stderr
+        self.stack: List[Any] = []
+        # Positions in the stack where each open pipeline starts
+        self.pipelines: List[int] = []
+        self.constants: List[str] = []
+        # Exit status of each stage of the last commands run
+        self.statuses: List[StageStatus] = []
+        handlers: Dict[Opcode, Callable[[int], None]] = {
+            Opcode.PUSH_INT: self.push_int,
+            Opcode.PUSH_NUM: self.push_num,
+            Opcode.PUSH_STR: self.push_str,
+            Opcode.PUSH_BOOL: self.push_bool,
+            Opcode.NEGATE: self.negate,
+            Opcode.NOT: self.not_,
+            Opcode.BINOP: self.binop,
+            Opcode.COMPARE: self.compare,
+            Opcode.COMPARE_CHAIN: self.compare_chain,
+            Opcode.PRINT: self.print,
+            Opcode.ASSERT: self.assertion,
+            Opcode.EXEC: self.exec,
+            Opcode.PIPELINE: self.pipeline,
+        }
+        self.dispatch: List[Callable[[int], None]] = [self.unknown] * (
+            max(Opcode) + 1
+        )
+        for opcode, handler in handlers.items():
+            self.dispatch[opcode] = handler
+        self.binops = [BINOPS[name] for name in OPERAND_NAMES[Opcode.BINOP]]
+        self.comparisons = [
+            COMPARISONS[name] for name in OPERAND_NAMES[Opcode.COMPARE]
+        ]
+
+    def run(self, program: YolkProgram) -> None:
+        self.constants = program.constants
+        dispatch = self.dispatch
+        try:
+            for opcode, operand in zip(program.opcodes, program.operands):
+                dispatch[opcode](operand)
+        except YolkRuntimeError:
+            self.stack.clear()
+            self.pipelines.clear()
+            raise
+
+    def pop(self) -> Any:
+        if not self.stack:
+            raise YolkRuntimeError('stack underflow')
+        return self.stack.pop()
+
+    def unknown(self, operand: int) -> None:
+        raise YolkRuntimeError('unknown opcode')
+
+    def push_int(self, operand: int) -> None:
+        self.stack.append(checked(int(self.constants[operand])))
+
+    def push_num(self, operand: int) -> None:
+        self.stack.append(float(self.constants[operand]))
+
+    def push_str(self, operand: int) -> None:
+        self.stack.append(self.constants[operand])
+
+    def push_bool(self, operand: int) -> None:
+        self.stack.append(operand == 1)
+
+    def negate(self, operand: int) -> None:
+        value = self.pop()
+        if not is_number(value):
+            raise YolkRuntimeError(f'cannot negate {type_name(value)}')
+        self.stack.append(checked(-value))
+
+    def not_(self, operand: int) -> None:
+        value = self.pop()
+        if type(value) is not bool:
+            raise YolkRuntimeError(f'cannot negate {type_name(value)}')
+        self.stack.append(not value)
+
+    def binop(self, operand: int) -> None:
+        b = self.pop()
+        self.stack.append(self.binops[operand](self.pop(), b))
+
+    def compare(self, operand: int) -> None:
+        b = self.pop()
+        self.stack.append(self.comparisons[operand](self.pop(), b))
+
+    def compare_chain(self, operand: int) -> None:
+        # Keeps the right side for the next comparison in the chain
+        b = self.pop()
+        self.stack.append(self.comparisons[operand](self.pop(), b))
+        self.stack.append(b)
+
+    def print(self, operand: int) -> None:
+        # The CLI ends every program with PRINT, which statements that
+        # leave nothing on the stack ignore
+        if self.stack:
+            self.out.write(f'{show(self.stack.pop())}\n')
+
+    def assertion(self, operand: int) -> None:
+        value = self.pop()
+        if type(value) is not bool:
+            raise YolkRuntimeError(f'cannot assert {type_name(value)}')
+        if not value:
+            raise YolkRuntimeError('assertion failed')
+
+    def exec(self, operand: int) -> None:
+        if len(self.stack) < operand:
+            raise YolkRuntimeError('stack underflow')
+        args = tuple(show(arg) for arg in self.stack[-operand:])
+        del self.stack[-operand:]
+        if self.pipelines:
+            self.stack.append(Command(args))
+        else:
+            self.stack.append(self.run_commands([Command(args)], None))
+
+    def pipeline(self, operand: int) -> None:
+        if operand == 0:   # begin
+            self.pipelines.append(len(self.stack))
+            return
+        if operand == 1:   # next
+            return
+        if not self.pipelines:
+            raise YolkRuntimeError('pipeline end without a beginning')
+        start = self.pipelines.pop()
+        stages = self.stack[start:]
+        del self.stack[start:]
+
+        # Values that are not commands are fed to the next command
+        input_text: str | None = None
+        commands: List[Command] = []
+        for stage in stages:
+            if isinstance(stage, Command):
+                commands.append(stage)
+                continue
+            if commands:
+                input_text = self.run_commands(commands, input_text)
+                commands = []
+            input_text = show(stage)
+        if commands:
+            input_text = self.run_commands(commands, input_text)
+        self.stack.append(input_text or '')
+
+    def run_commands(
+        self, commands: List[Command], input_text: str | None
+    ) -> str:
+        """Runs commands at once, piping each into the next."""
+        data = None if input_text is None else input_text.encode('utf-8')
+        try:
+            result = run_pipeline([c.args for c in commands], data)
+        except OSError as e:
+            raise YolkRuntimeError(
+                f'cannot run {e.filename}: {e.strerror}'
+            ) from None
+        self.statuses = result.statuses
+        if result.errors:
+            self.err.write(result.errors.decode('utf-8', 'replace'))
+        if result.returncode != 0:
+            args, returncode = result.statuses[-1]
+            raise YolkRuntimeError(f'{args[0]} exited with {returncode}')
+        return result.output.decode('utf-8', 'replace').removesuffix('\n')
+
+    def execute(self, program: YolkProgram) -> Tuple[str, str]:
+        """Runs a program, returning what it wrote to stdout and stderr."""
+        out, err = io.StringIO(), io.StringIO()
+        self.out, self.err = out, err
+        try:
+            self.run(program)
+        except YolkRuntimeError as e:
+            err.write(f'error: {e}\n')
+        return out.getvalue(), err.getvalue()
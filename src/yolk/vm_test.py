@@ -0,0 +1,102 @@
+from typing import Tuple
+
+import pytest
+
+from ..cli import cli
+from .ir import Instruction, Opcode, YolkProgram
+from .vm import YolkVM
+
+# Folding is off, so the VM does the arithmetic
+egg_cli = cli.EggCLI(
+    cli.CLIMode(
+        cli.ExecutionMode.execute, constant_folding=False, in_process=True
+    ),
+    use_profiler=False,
+)
+
+
+def run(src: str) -> Tuple[str, str]:
+    return egg_cli.execute(src)
+
+
+def value(src: str) -> str:
+    out, err = run(src)
+    assert err == ''
+    return out.removesuffix('\n')
+
+
+def error(src: str) -> str:
+    out, err = run(src)
+    assert out == ''
+    return err.removeprefix('error: ').removesuffix('\n')
+
+
+def test_arithmetic() -> None:
+    assert value('1 + 2 * 3 - 4') == '3'
+    assert value('7 // 2 + 7 % 2') == '4'
+    assert value('-7 // 2') == '-4'
+    assert value('1 / 4') == '0.25'
+    assert value('2 ** 10') == '1024'
+    assert value('2 ** -1') == '0.5'
+    assert value('1 + 0.5') == '1.5'
+    assert value('-(2.5)') == '-2.5'
+
+
+def test_strings_and_booleans() -> None:
+    assert value('"a" ++ 1 ++ true') == 'a1true'
+    assert value('not true or false') == 'false'
+    assert value('true and not false') == 'true'
+
+
+def test_comparisons() -> None:
+    assert value('1 < 2 <= 2.0 != 3') == 'true'
+    assert value('1 < 2 > 3') == 'false'
+    assert value('"a" < "b"') == 'true'
+    assert value('1 == "1"') == 'false'
+    assert value('1 == 1.0') == 'true'
+
+
+def test_errors() -> None:
+    assert error('1 / 0') == 'division by zero'
+    assert error('"a" - 1') == 'cannot subtract string and int'
+    assert error('-"a"') == 'cannot negate string'
+    assert error('1 < "a"') == 'cannot order int and string'
+    assert error('true and 1') == 'cannot and bool and int'
+    assert error('9223372036854775807 + 1') == 'integer overflow'
+    assert error('3 ** 64') == 'integer overflow'
+    assert error('assert 1 > 2') == 'assertion failed'
+    assert error('assert 1') == 'cannot assert int'
+    # The stack is cleared after an error, and the VM can go on
+    assert value('1 + 1') == '2'
+
+
+def test_statements() -> None:
+    assert run('assert 1 < 2') == ('', '')
+    assert run('say "hi"') == ('hi\n', '')
+
+
+def test_commands() -> None:
+    assert value('echo hello world') == 'hello world'
+    assert value('echo hello | tr a-z A-Z | rev') == 'OLLEH'
+    assert value('"piped text" | tr a-z A-Z') == 'PIPED TEXT'
+    assert error('sh -c "exit 3"') == 'sh exited with 3'
+    assert error('nonexistent-command').startswith(
+        'cannot run nonexistent-command'
+    )
+    out, err = run('ls /nonexistent/directory')
+    assert out == ''
+    assert 'nonexistent' in err and err.endswith('ls exited with 2\n')
+
+
+def test_stack_underflow() -> None:
+    program = YolkProgram()
+    program.append(Instruction.named(Opcode.BINOP, 'add'))
+    assert YolkVM().execute(program) == ('', 'error: stack underflow\n')
+
+
+def test_dispatch_covers_every_opcode() -> None:
+    vm = YolkVM()
+    for opcode in Opcode:
+        assert vm.dispatch[opcode] != vm.unknown
+    with pytest.raises(IndexError):
+        vm.dispatch[max(Opcode) + 1]
@@ -1,10 +1,26 @@
 from typing import Any, Callable, Iterable, List
 
 import lark.tree
-from lark import Transformer, Tree
+from lark import Tree
 from lark.lexer import Token
 
-from .string_utilities import repr_double_quoted
+from ..frontend.folding import ConstantFolder, literal_value, make_literal
+from ..frontend.iterative_transformer import IterativeTransformer
+from ..frontend.lowering import LoweringTransformer
+from .fragment_memo import FragmentMemo
+from .ir import Fragment, Instruction, Opcode
+
+# Shared by every generator, since their callbacks are static
+fragment_memo = FragmentMemo()
+
+
+def memoized(
+    callback: Callable[[List[Any]], Fragment]
+) -> Callable[[Iterable[Any]], Fragment]:
+    def _inner(children: Iterable[Any]) -> Fragment:
+        return fragment_memo.get(callback, list(children))
+
+    return _inner
 
 
 class FeatureUnimplemented(Exception):
@@ -15,101 +31,114 @@ class FeatureUnimplemented(Exception):
         return f'This feature has not yet been implemented:\n\t{self.feature}'
 
 
-class YolkGenerator(Transformer[Token | int | float | str, List[str]]):
+class YolkGenerator(IterativeTransformer[Token | int | float | str, Fragment]):
     @staticmethod
     def append_instruction(
-        instruction: str,
-    ) -> Callable[[Iterable[Any]], List[str]]:
+        opcode: Opcode, operand_name: str | None = None
+    ) -> Callable[[Iterable[Any]], Fragment]:
+        instruction = (
+            Instruction(opcode)
+            if operand_name is None
+            else Instruction.named(opcode, operand_name)
+        )
+
         @staticmethod   # type: ignore[misc]
-        def _inner(children: Iterable[Iterable[str]]) -> List[str]:
-            program = [
-                instruction for child in children for instruction in child
-            ]
-            program.append(instruction)
-            return program
+        @memoized
+        def _inner(children: Iterable[Fragment]) -> Fragment:
+            return [*children, instruction]
 
         return _inner
 
     # Literals
     @staticmethod
-    def integer_literal(items: List[Any]) -> List[str]:
-        return [f'PUSH_INT {items[0]}']
+    @memoized
+    def integer_literal(items: List[Any]) -> Fragment:
+        return [Instruction(Opcode.PUSH_INT, str(items[0]))]
 
     @staticmethod
-    def float_literal(items: List[Any]) -> List[str]:
-        return [f'PUSH_NUM {items[0]}']
+    @memoized
+    def float_literal(items: List[Any]) -> Fragment:
+        return [Instruction(Opcode.PUSH_NUM, str(items[0]))]
 
     @staticmethod
-    def string_literal(items: List[lark.Token]) -> List[str]:
-        return [f'PUSH_STR {repr_double_quoted(items[0].value)}']
+    @memoized
+    def string_literal(items: List[lark.Token]) -> Fragment:
+        return [Instruction(Opcode.PUSH_STR, items[0].value)]
 
     @staticmethod
-    def boolean_literal(items: List[lark.Token]) -> List[str]:
-        return [f'PUSH_BOOL {items[0]}']
+    @memoized
+    def boolean_literal(items: List[lark.Token]) -> Fragment:
+        return [Instruction.named(Opcode.PUSH_BOOL, str(items[0]))]
 
     # Unary Opertors
-    unary_negate = append_instruction('NEGATE')
-    unary_not = append_instruction('NOT')
+    unary_negate = append_instruction(Opcode.NEGATE)
+    unary_not = append_instruction(Opcode.NOT)
 
     # Binary Operators
-    addition = append_instruction('BINOP add')
-    subtraction = append_instruction('BINOP subtract')
-    multiply = append_instruction('BINOP multiply')
-    divide = append_instruction('BINOP divide')
-    int_divide = append_instruction('BINOP int_divide')
-    modulus = append_instruction('BINOP modulus')
-    raise_power = append_instruction('BINOP power')
-    concatenate = append_instruction('BINOP concat')
-    and_expr = append_instruction('BINOP and')
-    or_expr = append_instruction('BINOP or')
+    addition = append_instruction(Opcode.BINOP, 'add')
+    subtraction = append_instruction(Opcode.BINOP, 'subtract')
+    multiply = append_instruction(Opcode.BINOP, 'multiply')
+    divide = append_instruction(Opcode.BINOP, 'divide')
+    int_divide = append_instruction(Opcode.BINOP, 'int_divide')
+    modulus = append_instruction(Opcode.BINOP, 'modulus')
+    raise_power = append_instruction(Opcode.BINOP, 'power')
+    concatenate = append_instruction(Opcode.BINOP, 'concat')
+    and_expr = append_instruction(Opcode.BINOP, 'and')
+    or_expr = append_instruction(Opcode.BINOP, 'or')
 
     # Builtins
-    say = append_instruction('PRINT')
-    assertion = append_instruction('ASSERT')
+    say = append_instruction(Opcode.PRINT)
+    assertion = append_instruction(Opcode.ASSERT)
 
     # Comparisons
-    equal_to = append_instruction('equal')
-    greater_than = append_instruction('greater')
-    greater_than_or_equal_to = append_instruction('gte')
-    less_than = append_instruction('less')
-    less_than_or_equal_to = append_instruction('lte')
-    not_equal_to = append_instruction('unequal')
+    equal_to = append_instruction(Opcode.COMPARE, 'equal')
+    greater_than = append_instruction(Opcode.COMPARE, 'greater')
+    greater_than_or_equal_to = append_instruction(Opcode.COMPARE, 'gte')
+    less_than = append_instruction(Opcode.COMPARE, 'less')
+    less_than_or_equal_to = append_instruction(Opcode.COMPARE, 'lte')
+    not_equal_to = append_instruction(Opcode.COMPARE, 'unequal')
 
     @staticmethod
-    def comparison_chain(items: List[Any]) -> List[str]:
-        instrutions = []
+    @memoized
+    def comparison_chain(items: List[Any]) -> Fragment:
+        instrutions: Fragment = []
         for i in range(len(items)):
             if i == 0:
-                instrutions.extend(items[i])
+                instrutions.append(items[i])
             elif (i - 1) % 2 == 0:
-                instrutions.extend(items[i + 1])
+                instrutions.append(items[i + 1])
             elif (i - 1) % 2 == 1:
+                comparison = items[i - 1][0].operand
                 if i == len(items) - 1:
-                    instrutions.append(f'COMPARE {items[i-1][0]}')
+                    instrutions.append(Instruction(Opcode.COMPARE, comparison))
                 else:
-                    instrutions.append(f'COMPARE_CHAIN {items[i-1][0]}')
+                    instrutions.append(
+                        Instruction(Opcode.COMPARE_CHAIN, comparison)
+                    )
         if len(items) > 3:
             for i in range((len(items) - 3) // 2):
-                instrutions.append('BINOP and')
+                instrutions.append(Instruction.named(Opcode.BINOP, 'and'))
         return instrutions
 
     # Pipelines and Executions
     @staticmethod
-    def exec(items: List[Any]) -> List[str]:
-        instructions = []
+    @memoized
+    def exec(items: List[Any]) -> Fragment:
+        instructions: Fragment = []
         for item in items:
-            instructions.append(f'PUSH_STR {repr_double_quoted(item)}')
-        instructions.append(f'EXEC {len(items)}')
+            instructions.append(Instruction(Opcode.PUSH_STR, item))
+        instructions.append(Instruction(Opcode.EXEC, len(items)))
         return instructions
 
     @staticmethod
-    def pipeline(execs: List[str]) -> List[str]:
-        instructions = ['PIPELINE begin']
+    @memoized
+    def pipeline(execs: List[Fragment]) -> Fragment:
+        instructions: Fragment = [Instruction.named(Opcode.PIPELINE, 'begin')]
         for i, exec in enumerate(execs):
             if i != 0:
-                instructions.append('PIPELINE next')
-            instructions.extend(exec)
-        instructions.append('PIPELINE end')
+                instructions.append(Instruction.named(Opcode.PIPELINE, 'next'))
+            instructions.append(exec)
+        instructions.append(Instruction.named(Opcode.PIPELINE, 'end'))
         return instructions
 
     # Default
@@ -122,3 +151,156 @@ class YolkGenerator(Transformer[Token | int | float | str, List[str]]):
         meta: lark.tree.Meta,
     ) -> Tree[Token | int | float | str]:
         raise FeatureUnimplemented(data)
+
+
+class FusedYolkGenerator(YolkGenerator):
+    """Lowers and generates Yolk inside the parser's reduction callbacks.
+
+    Passed to get_parser as the inline transformer, so every rule becomes
+    code as soon as it is reduced and no tree is built. The few trees that
+    lowering rewrites produce are generated on the spot.
+    """
+
+    @staticmethod
+    def __default__(
+        data: str,
+        children: List[
+            Tree[Token | int | float | str] | Token | int | float | str
+        ],
+        meta: lark.tree.Meta,
+    ) -> Tree[Token | int | float | str]:
+        # Lark's helper rules for repetition are inlined into their parent,
+        # which expects them to be trees
+        if data.startswith('_'):
+            return Tree(data, children)
+        raise FeatureUnimplemented(data)
+
+    @staticmethod
+    def generate(node: Any) -> Any:
+        if not isinstance(node, Tree):
+            return node
+        children = [FusedYolkGenerator.generate(c) for c in node.children]
+        callback = getattr(YolkGenerator, node.data, None)
+        if callback is None:
+            raise FeatureUnimplemented(node.data)
+        return callback(children)
+
+    @staticmethod
+    def lowered(
+        lowering: Callable[[Any], Tree[Any]],
+    ) -> Callable[[Iterable[Any]], Fragment]:
+        @staticmethod   # type: ignore[misc]
+        @memoized
+        def _inner(children: Iterable[Any]) -> Fragment:
+            code: Fragment = FusedYolkGenerator.generate(lowering(children))
+            return code
+
+        return _inner
+
+    exec = lowered(LoweringTransformer.exec)   # type: ignore[assignment]
+    unit_integer_literal = lowered(LoweringTransformer.unit_integer_literal)
+    unit_float_literal = lowered(LoweringTransformer.unit_float_literal)
+    plus_assign = lowered(LoweringTransformer.plus_assign)
+    minus_assign = lowered(LoweringTransformer.minus_assign)
+    times_assign = lowered(LoweringTransformer.times_assign)
+    divide_assign = lowered(LoweringTransformer.divide_assign)
+    int_div_assign = lowered(LoweringTransformer.int_div_assign)
+    mod_assign = lowered(LoweringTransformer.mod_assign)
+    power_assign = lowered(LoweringTransformer.power_assign)
+    pipe_assign = lowered(LoweringTransformer.pipe_assign)
+    concat_assign = lowered(LoweringTransformer.concat_assign)
+    seq_and_assign = lowered(LoweringTransformer.seq_and_assign)
+    seq_or_assign = lowered(LoweringTransformer.seq_or_assign)
+    always_loop = lowered(LoweringTransformer.always_loop)
+    selection_lambda_shorthand = lowered(
+        LoweringTransformer.selection_lambda_shorthand
+    )
+    implicit_lambda_param = lowered(LoweringTransformer.implicit_lambda_param)
+
+
+class FoldingYolkGenerator(FusedYolkGenerator):
+    """A FusedYolkGenerator that also folds constants as they are reduced.
+
+    Children that were generated as a lone push of a literal are turned
+    back into literal trees and folded with ConstantFolder's rules.
+    """
+
+    # Yolk's comparison names back to the rules that generate them
+    comparison_rules = {
+        'equal': 'equal_to',
+        'greater': 'greater_than',
+        'gte': 'greater_than_or_equal_to',
+        'less': 'less_than',
+        'lte': 'less_than_or_equal_to',
+        'unequal': 'not_equal_to',
+    }
+
+    @staticmethod
+    def as_tree(fragment: Any) -> Tree[Any] | None:
+        if not (
+            isinstance(fragment, list)
+            and len(fragment) == 1
+            and isinstance(fragment[0], Instruction)
+        ):
+            return None
+        opcode, operand = fragment[0]
+        if opcode == Opcode.PUSH_INT:
+            return make_literal(int(operand))
+        if opcode == Opcode.PUSH_NUM:
+            return make_literal(float(operand))
+        if opcode == Opcode.PUSH_STR:
+            return make_literal(str(operand))
+        if opcode == Opcode.PUSH_BOOL:
+            return make_literal(operand == 1)
+        if opcode == Opcode.COMPARE:
+            name = fragment[0].operand_name
+            return Tree(FoldingYolkGenerator.comparison_rules[name], [])
+        return None
+
+    @staticmethod
+    def folded(rule: str) -> Callable[[Iterable[Any]], Fragment]:
+        fold = getattr(ConstantFolder, rule)
+        generate_rule = getattr(FusedYolkGenerator, rule)
+
+        @staticmethod   # type: ignore[misc]
+        @memoized
+        def _inner(children: Iterable[Any]) -> Fragment:
+            children = list(children)
+            trees = [FoldingYolkGenerator.as_tree(c) for c in children]
+            if all(tree is not None for tree in trees):
+                folded = fold(trees)
+                if literal_value(folded) is not None:
+                    code: Fragment = FusedYolkGenerator.generate(folded)
+                    return code
+            code = generate_rule(children)
+            return code
+
+        return _inner
+
+    @staticmethod
+    def lowered_and_folded(
+        lowering: Callable[[Any], Tree[Any]],
+    ) -> Callable[[Iterable[Any]], Fragment]:
+        return FusedYolkGenerator.lowered(
+            lambda children: ConstantFolder().transform(lowering(children))
+        )
+
+    unary_negate = folded('unary_negate')
+    unary_not = folded('unary_not')
+    addition = folded('addition')
+    subtraction = folded('subtraction')
+    multiply = folded('multiply')
+    divide = folded('divide')
+    int_divide = folded('int_divide')
+    modulus = folded('modulus')
+    raise_power = folded('raise_power')
+    concatenate = folded('concatenate')
+    and_expr = folded('and_expr')
+    or_expr = folded('or_expr')
+    comparison_chain = folded('comparison_chain')   # type: ignore[assignment]
+    unit_integer_literal = lowered_and_folded(
+        LoweringTransformer.unit_integer_literal
+    )
+    unit_float_literal = lowered_and_folded(
+        LoweringTransformer.unit_float_literal
+    )
@@ -1,6 +1,12 @@
 from typing import Dict
 
+from lark import Token, Tree
+
 from ..cli import cli
+from ..frontend.folding import ConstantFolder
+from ..frontend.parser import get_parser
+from .ir import flatten
+from .yolk import YolkGenerator
 
 """
 INSTRUCTIONS: To add new test cases:
@@ -22,13 +28,82 @@ def test_no_new_test_cases() -> None:
     assert len(new_test_cases) == 0
 
 
-egg_cli = cli.EggCLI(cli.CLIMode(cli.ExecutionMode.codegen), use_profiler=False)
+# Optimizations are off, so the expected code shows each operation being
+# generated
+egg_cli = cli.EggCLI(
+    cli.CLIMode(
+        cli.ExecutionMode.codegen, constant_folding=False, peephole=False
+    ),
+    use_profiler=False,
+)
 
 
 def get_gen_code(src: str) -> str:
     return egg_cli.get_codegen(src)
 
 
+def test_fused_matches_tree_codegen() -> None:
+    parser = get_parser()
+    for src in [
+        'say 1 + 2 * -3',
+        'a 1 "b" | c | d -e',
+        '1 < 2 <= 3 == 4',
+        'assert not true or false',
+        '"a" ++ "b" // 2 % 3 ** 4',
+    ]:
+        ast = parser.parse(src)
+        expected = flatten(YolkGenerator().transform(ast)).to_text()   # type: ignore
+        assert get_gen_code(src) == expected
+
+
+def test_fused_folding_matches_tree_folding() -> None:
+    parser = get_parser()
+    folding_cli = cli.EggCLI(
+        cli.CLIMode(cli.ExecutionMode.codegen, peephole=False),
+        use_profiler=False,
+    )
+    for src in [
+        'say 1 + 2 * -3',
+        'say 1 + 2 / 3 * 4 + 5',
+        '1 < 2 <= 3 == 4',
+        'assert not true or false',
+        '"a" ++ "b" ++ 1 == "ab1"',
+        'say 1.5 * 2.0 - 7 // 2 % 3 ** 4',
+        'say 10mb + 1kib',
+        'say 1.5sec',
+    ]:
+        ast = ConstantFolder().transform(parser.parse(src))
+        expected = flatten(YolkGenerator().transform(ast)).to_text()
+        assert folding_cli.get_codegen(src) == expected
+    assert folding_cli.get_codegen('say 2 ** 10 * 1kib') == (
+        'PUSH_INT 1048576\nPRINT'
+    )
+
+
+def test_fused_deep_expression() -> None:
+    # Deeper than the recursion limit, which walking a tree would exceed
+    src = 'say ' + ' + '.join(['1'] * 10000)
+    code = get_gen_code(src).split('\n')
+    assert code.count('PUSH_INT 1') == 10000
+    assert code.count('BINOP add') == 9999
+    assert code[-1] == 'PRINT'
+
+
+def test_deep_tree() -> None:
+    # Lark's recursive Transformer would run out of stack long before this
+    depth = 100000
+    one: Tree[Token | int | float | str] = Tree(
+        'integer_literal', [Token('INTEGER', '1')]
+    )
+    tree = one
+    for _ in range(depth):
+        tree = Tree('subtraction', [tree, Tree('unary_negate', [one])])
+    code = list(flatten(YolkGenerator().transform(tree)).text_lines())
+    assert len(code) == 3 * depth + 1
+    assert code[:4] == ['PUSH_INT 1', 'PUSH_INT 1', 'NEGATE', 'BINOP subtract']
+    assert code[-3:] == ['PUSH_INT 1', 'NEGATE', 'BINOP subtract']
+
+
 def test_integer() -> None:
     src = '1'
     expected_gen_code = 'PUSH_INT 1'